@@ -1,16 +1,43 @@
-import google.generativeai as genai
 import json
-from json_repair import repair_json
-import pandas as pd
 import asyncio
-import streamlit as st
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from utils import clean_response
+from analysis_cache import get_analysis_cache, make_cache_key
+from stream_parser import AnalysisStreamParser
+from results_model import FIELD_COLUMNS
+import llm_client
+from instrumentation import timed
+from text_normalization import estimate_tokens, normalize_text
 
-# --- Load API Key from Secrets ---
-api_key = st.secrets["api_keys"]["GOOGLE_API_KEY"]
-genai.configure(api_key=api_key)
+# Bump PROMPT_VERSION whenever generate_prompt changes so cached analyses are not reused.
+PROMPT_VERSION = "3"
+IMPROVE_CONCURRENCY = 6
 
-def generate_prompt(text):
+def generate_prompt(text, count=True):
+    """Builds the analysis prompt: normalized brief text plus a one-line-per-category schema outline.
+
+    The full JSON schema is enforced through ANALYSIS_GENERATION_CONFIG, so the
+    prompt only names the fields instead of spelling out an indented template.
+    Pass ``count=False`` for prompts that are measured but never sent, so they
+    stay out of prompt_token_stats.
+    """
+    prompt = f"""## Marketing Brief Analysis Request
+Analyze the marketing brief. Reply with JSON only. Scores are integers out of 100; lists hold short strings taken from or suggested for the brief.
+Fields:
+{schema_outline()}
+Brief:
+```
+{normalize_text(text)}
+```"""
+    if count:
+        _count_prompt_tokens(prompt)
+    return prompt
+
+def generate_verbose_prompt(text):
+    """The pre-compaction analysis prompt, kept only for text_normalization.compaction_report."""
     return f"""
     ## Marketing Brief Analysis Request
 
@@ -77,67 +104,424 @@ async def analyze_text_async(text):
     result = await loop.run_in_executor(None, analyze_text, text)
     return result
 
-def analyze_text(text):
-    model = genai.GenerativeModel(model_name="gemini-1.5-flash")
-    prompt = generate_prompt(text)
+def analyze_text(text, use_cache=True):
+    response_data = load_analysis(text, use_cache)
+    if response_data is None:
+        return None, None, None, []
+    return build_results(response_data)
 
-    try:
-        response = model.generate_content(prompt)
-        response_text = response.text
+@timed("analyze")
+def load_analysis(text, use_cache=True):
+    """Returns the parsed analysis response for the brief, from the cache when possible.
 
-        # --- Clean up the response ---
-        response_text = clean_response(response_text)
+    Responses answered or completed by the local pre-score are not cached, so a
+    change of BRIEFLY_PRESCORE or its thresholds takes effect immediately.
+    """
+    from model_router import model_cache_tag
 
-        # --- Repair potentially malformed JSON ---
-        try:
-            response_text = repair_json(response_text)
-        except Exception as e:
-            print(f"Warning: json_repair could not fix the JSON: {e}")
+    cache_key = make_cache_key(text, PROMPT_VERSION, model_cache_tag())
+    response_data = get_analysis_cache().get(cache_key) if use_cache else None
+
+    if response_data is None:
+        response_data = request_analysis(text)
+        if response_data is not None and use_cache and not is_pre_scored(response_data):
+            get_analysis_cache().set(cache_key, response_data)
+
+    return response_data
+
+# --- Response Parsing ---
+_parse_stats = {"fast": 0, "cleaned": 0, "repaired": 0, "failed": 0}
+_parse_stats_lock = threading.Lock()
 
-        # Directly try to parse as JSON
+def _count_parse(outcome):
+    with _parse_stats_lock:
+        _parse_stats[outcome] += 1
+
+def parse_stats():
+    """Counts of how responses were parsed: as-is, after cleaning, after json_repair, or not at all."""
+    with _parse_stats_lock:
+        return dict(_parse_stats)
+
+# --- Prompt Size ---
+_prompt_token_stats = {"analyze": 0}
+
+def _count_prompt_tokens(prompt):
+    with _parse_stats_lock:
+        _prompt_token_stats["analyze"] += estimate_tokens(prompt)
+
+def prompt_token_stats():
+    """Estimated input tokens of the analysis prompts built so far, by prompt kind."""
+    with _parse_stats_lock:
+        return dict(_prompt_token_stats)
+
+@timed("analyze.parse")
+def parse_response_outcome(response_text):
+    """Parses a JSON model response, cleaning and repairing it only when needed.
+
+    Returns ``(response_data, outcome)``; outcome is "fast", "cleaned", "repaired"
+    or "failed" (with ``response_data`` None).
+    """
+    # --- Fast path: JSON response mode usually returns valid JSON ---
+    try:
         response_data = json.loads(response_text)
+        _count_parse("fast")
+        return response_data, "fast"
+    except json.JSONDecodeError:
+        pass
+
+    # --- Clean up the response ---
+    cleaned_text = clean_response(response_text)
+    try:
+        response_data = json.loads(cleaned_text)
+        _count_parse("cleaned")
+        return response_data, "cleaned"
+    except json.JSONDecodeError:
+        pass
+
+    # --- Repair potentially malformed JSON ---
+    from json_repair import repair_json
 
-        # Extract data for DataFrame (corrected structure)
-        data = {}
-
-        for category, details in response_data['breakdown'].items():
-            category_title = category.replace('_', ' ').title()
-            
-            # Store all details for the category in a dictionary
-            data[category_title] = {
-                'Score': int(details['score']),
-                'Feedback': details['feedback'],
-                'Extracted Objectives': details.get('extracted_objectives', []),
-                'Keywords': details.get('keywords', []),
-                'Alignment Issues': details.get('alignment_issues', []),
-                'Extracted Demographics': details.get('extracted_demographics', []),
-                'Target Audience Examples': details.get('target_audience_examples', []),
-                'Competitors Mentioned': details.get('competitors_mentioned', []),
-                'Competitive Advantages': details.get('competitive_advantages', []),
-                'Recommended Channels': details.get('recommended_channels', []),
-                'Channel Justifications': details.get('channel_justifications', []),
-                'Extracted KPIs': details.get('extracted_kpis', []),
-                'KPI Suggestions': details.get('kpi_suggestions', []),
-                'Target Locations': details.get('target_locations', [])
-            } 
-
-        df_results = pd.DataFrame.from_dict(data, orient='index')
-        overall_score = int(response_data['overall_score'])
-
-        # Extract gap analysis results
-        gap_analysis_results = response_data.get('gap_analysis', [])
-
-        # Extract competitors mentioned
-        competitors_mentioned = data['Competitive Analysis']['Competitors Mentioned']
-
-        return df_results, overall_score, gap_analysis_results, competitors_mentioned 
+    try:
+        cleaned_text = repair_json(cleaned_text)
+    except Exception as e:
+        print(f"Warning: json_repair could not fix the JSON: {e}")
+
+    try:
+        response_data = json.loads(cleaned_text)
+        _count_parse("repaired")
+        return response_data, "repaired"
     except json.JSONDecodeError as e:
+        _count_parse("failed")
         print(f"Error decoding JSON: {e}")
-        print(f"Raw response: {response.text}")
-        return None, None, None, []
+        print(f"Raw response: {response_text}")
+        return None, "failed"
+
+def parse_response(response_text):
+    """Parses a JSON model response, cleaning and repairing it only when needed. Returns None on failure."""
+    return parse_response_outcome(response_text)[0]
+
+# --- Quality Gates ---
+def validate_analysis(response_data, categories=None, include_summary=True):
+    """Returns why a parsed response does not match the analysis schema, or None if it does."""
+    if not isinstance(response_data, dict) or not isinstance(response_data.get('breakdown'), dict):
+        return "missing breakdown"
+    for category in categories or CATEGORY_FIELDS:
+        details = response_data['breakdown'].get(category)
+        if not isinstance(details, dict):
+            return f"missing {category}"
+        try:
+            score = int(details.get('score'))
+        except (TypeError, ValueError):
+            return f"invalid score for {category}"
+        if not 0 <= score <= 100:
+            return f"invalid score for {category}"
+        if not str(details.get('feedback') or "").strip():
+            return f"empty feedback for {category}"
+    if include_summary:
+        try:
+            int(response_data.get('overall_score'))
+        except (TypeError, ValueError):
+            return "invalid overall_score"
+    return None
+
+def analysis_confidence_issue(response_data, provisional=None, max_disagreement=None):
+    """Returns why a valid analysis looks unreliable, or None.
+
+    Identical scores across every category are a typical degenerate answer. When
+    the local pre-score is given, a large mean difference from its provisional
+    category scores is treated as low confidence too.
+    """
+    scores = {category: int(details['score']) for category, details in response_data['breakdown'].items()}
+    if len(scores) > 2 and len(set(scores.values())) == 1:
+        return "flat scores"
+    if provisional and max_disagreement is not None:
+        differences = [
+            abs(score - int(provisional[category]['score'])) for category, score in scores.items() if category in provisional
+        ]
+        if differences and sum(differences) / len(differences) > max_disagreement:
+            return "disagrees with pre-score"
+    return None
+
+def analysis_gates(categories=None, include_summary=True, provisional=None):
+    """Router ``check`` and ``confidence`` gates for an analysis response."""
+    from model_router import get_router
+
+    max_disagreement = get_router().rules.max_prescore_disagreement
+    return {
+        "check": lambda response_data: validate_analysis(response_data, categories, include_summary),
+        "confidence": lambda response_data: analysis_confidence_issue(response_data, provisional, max_disagreement),
+    }
+
+def request_analysis(text):
+    """Sends the brief to Gemini and returns the parsed JSON response, or None.
+
+    The local pre-score answers briefs it can judge on its own, or narrows the
+    request to the categories it is unsure of. Briefs over the chunk token
+    budget are analyzed in parts and merged. Otherwise the model router picks
+    the model and escalates responses that fail validation.
+    """
+    from chunking import needs_chunking, request_chunked_analysis
+    from model_router import get_router
+
+    routed, provisional = _pre_route(text)
+    if routed is not None:
+        return routed
+    if needs_chunking(text):
+        return request_chunked_analysis(text)
+    try:
+        response_data, model_name = get_router().call(
+            "analyze", generate_prompt(text), parse=parse_response_outcome,
+            generation_config=ANALYSIS_GENERATION_CONFIG, **analysis_gates(provisional=provisional),
+        )
+    except Exception as e:
+        print(f"Error requesting analysis: {e}")
+        return None
+    return dict(response_data, model=model_name)
+
+def analysis_model(response_data):
+    """The model(s) that produced an analysis, as recorded in its "model" entry."""
+    return response_data.get("model") or llm_client.get_settings().model_name
+
+def is_pre_scored(response_data):
+    """True for responses the local pre-score answered or completed; these are not cached, stored or indexed."""
+    return "pre_score" in response_data
+
+def _pre_route(text):
+    """Runs the pre-score once: returns its routed response (or None) and its provisional breakdown."""
+    from pre_scorer import PRESCORE_MODE, pre_score, route_analysis
+
+    if PRESCORE_MODE == "off":
+        return None, None
+    result = pre_score(text)
+    return route_analysis(text, result), result.response_data['breakdown']
+
+def replay_analysis(response_data):
+    """Yields the events stream_analysis would produce for an already parsed response."""
+    yield ("overall_score", None, response_data['overall_score'])
+    for category, details in response_data['breakdown'].items():
+        yield ("category", category, details)
+    yield ("gap_analysis", None, response_data.get('gap_analysis', []))
+    yield ("complete", None, response_data)
 
-def improve_section(original_text, user_input, section):
+def stream_analysis(text, use_cache=True):
+    """Streams the analysis of a brief, yielding events as each part of the response completes.
+
+    Yields ``("overall_score", None, score)``, ``("category", name, details)`` and
+    ``("gap_analysis", None, items)`` events, followed by a final
+    ``("complete", None, response_data)`` event (``response_data`` is None if the
+    full response could not be parsed). Cached analyses are replayed immediately.
+
+    If the streamed response fails the quality gates and is escalated to another
+    model, a ``("reset", None, None)`` event tells consumers to discard the events
+    so far; the escalated analysis is then replayed in full.
+    """
+    from model_router import get_router, model_cache_tag
+
+    cache_key = make_cache_key(text, PROMPT_VERSION, model_cache_tag())
+    response_data = get_analysis_cache().get(cache_key) if use_cache else None
+
+    if response_data is not None:
+        yield from replay_analysis(response_data)
+        return
+
+    from chunking import needs_chunking, request_chunked_analysis
+
+    routed, provisional = _pre_route(text)
+    if routed is not None:
+        yield from replay_analysis(routed)
+        return
+
+    if needs_chunking(text):
+        # Long briefs are analyzed in concurrent parts, so there is no single stream to follow.
+        response_data = request_chunked_analysis(text, use_cache=use_cache)
+        if response_data is None:
+            yield ("complete", None, None)
+            return
+        if use_cache:
+            get_analysis_cache().set(cache_key, response_data)
+        yield from replay_analysis(response_data)
+        return
+
+    # Stream from the first model of the plan; if its response fails the quality
+    # gates, the rest of the cascade runs unstreamed and its result is replayed.
+    router = get_router()
+    prompt = generate_prompt(text)
+    prompt_tokens = estimate_tokens(prompt)
+    models = router.plan("analyze", prompt_tokens)
+    gates = analysis_gates(provisional=provisional)
+    parser = AnalysisStreamParser()
+    started = time.perf_counter()
+    accepted = None
+    try:
+        for chunk in llm_client.generate_stream(
+            prompt, model_name=models[0], generation_config=ANALYSIS_GENERATION_CONFIG, operation="analyze"
+        ):
+            yield from parser.feed(chunk)
+    except Exception:
+        router.record("analyze", models[0], time.perf_counter() - started, prompt_tokens, parser.text, "error", escalated=len(models) > 1)
+        if len(models) == 1:
+            raise
+        response_data, reason = None, "error"
+    else:
+        parsed, parse_outcome = parse_response_outcome(parser.text)
+        reason, failed, valid = router.assess(parsed, parse_outcome, **gates)
+        router.record(
+            "analyze", models[0], time.perf_counter() - started, prompt_tokens, parser.text, reason or "ok",
+            failed=failed, escalated=reason is not None and len(models) > 1,
+        )
+        # A response that fails schema validation is never returned or cached.
+        accepted = dict(parsed, model=models[0]) if valid else None
+    response_data = accepted
+    escalating = reason is not None and len(models) > 1
+    if escalating:
+        # The streamed events belong to a response that is about to be replaced.
+        yield ("reset", None, None)
+        try:
+            escalated, model_name = router.call(
+                "analyze", prompt, parse=parse_response_outcome,
+                generation_config=ANALYSIS_GENERATION_CONFIG, models=models[1:], **gates,
+            )
+            response_data = dict(escalated, model=model_name)
+        except Exception as e:
+            print(f"Error requesting analysis: {e}")
+
+    if response_data is not None and use_cache:
+        get_analysis_cache().set(cache_key, response_data)
+    if escalating and response_data is not None:
+        yield from replay_analysis(response_data)
+    else:
+        yield ("complete", None, response_data)
+
+# --- Per-Category Scoring ---
+CATEGORY_FIELDS = {
+    "clarity_of_objectives": {
+        "extracted_objectives": "list of extracted objectives from the text",
+        "keywords": "list of relevant keywords",
+    },
+    "strategic_alignment": {
+        "alignment_issues": "list of potential misalignments with business goals (if any)",
+    },
+    "target_audience_definition": {
+        "extracted_demographics": "age, location, interests, other relevant demographics",
+        "target_audience_examples": "specific examples of the target audience mentioned in the text",
+    },
+    "competitive_analysis": {
+        "competitors_mentioned": "list of competitor brands mentioned",
+        "competitive_advantages": "list of mentioned or implied competitive advantages",
+    },
+    "channel_strategy": {
+        "recommended_channels": "list of potentially effective channels based on the brief",
+        "channel_justifications": "reasons for recommending each channel",
+    },
+    "key_performance_indicators": {
+        "extracted_kpis": "list of KPIs mentioned in the brief",
+        "kpi_suggestions": "suggestions for additional relevant KPIs",
+    },
+}
+
+# --- Structured Output ---
+def response_schema(categories=None, include_summary=True):
+    """Gemini response schema for the breakdown of ``categories`` (all by default)."""
+    breakdown = {}
+    for category in categories or CATEGORY_FIELDS:
+        properties = {"score": {"type": "INTEGER"}, "feedback": {"type": "STRING"}}
+        properties.update({field: {"type": "ARRAY", "items": {"type": "STRING"}} for field in CATEGORY_FIELDS[category]})
+        breakdown[category] = {"type": "OBJECT", "properties": properties, "required": ["score", "feedback"]}
+
+    properties = {"breakdown": {"type": "OBJECT", "properties": breakdown, "required": list(breakdown)}}
+    required = ["breakdown"]
+    if include_summary:
+        properties["overall_score"] = {"type": "INTEGER"}
+        properties["gap_analysis"] = {"type": "ARRAY", "items": {"type": "STRING"}}
+        required = ["overall_score", "breakdown", "gap_analysis"]
+    return {"type": "OBJECT", "properties": properties, "required": required}
+
+def schema_outline(categories=None, include_summary=True):
+    """Compact field list for prompts: one ``category: score, feedback, field[]...`` line per category."""
+    lines = ["overall_score", "breakdown:"] if include_summary else ["breakdown:"]
+    for category in categories or CATEGORY_FIELDS:
+        lines.append(f"  {category}: score, feedback, " + ", ".join(f"{field}[]" for field in CATEGORY_FIELDS[category]))
+    if include_summary:
+        lines.append("gap_analysis[]: elements the brief is missing")
+    return "\n".join(lines)
+
+def json_generation_config(schema):
+    return {"response_mime_type": "application/json", "response_schema": schema}
+
+ANALYSIS_GENERATION_CONFIG = json_generation_config(response_schema())
+
+def generate_category_prompt(category_texts):
+    """Builds a prompt that scores only the given categories, each against its own excerpt."""
+    excerpts = "\n".join(
+        f"### {category.replace('_', ' ').title()}\n```\n{normalize_text(excerpt)}\n```"
+        for category, excerpt in category_texts.items()
+    )
+    return f"""## Marketing Brief Category Scoring Request
+Score only the categories below, each against the excerpt of the marketing brief it depends on. Reply with JSON only. Scores are integers out of 100.
+Fields:
+{schema_outline(list(category_texts), include_summary=False)}
+{excerpts}"""
+
+def request_category_analysis(category_texts):
+    """Scores a subset of breakdown categories. Returns a breakdown dict, or None on failure."""
+    from model_router import get_router
+
+    categories = list(category_texts)
+    try:
+        response_data, _ = get_router().call(
+            "rescore", generate_category_prompt(category_texts), parse=parse_response_outcome,
+            check=lambda data: validate_analysis(data, categories, include_summary=False),
+            generation_config=json_generation_config(response_schema(categories, include_summary=False)),
+        )
+    except Exception as e:
+        print(f"Error requesting category scores: {e}")
+        return None
+    if not isinstance(response_data, dict):
+        return None
+    return response_data.get('breakdown')
+
+@timed("analyze.build_results")
+def build_results(response_data):
+    """Turns a parsed analysis response into the tuple returned by analyze_text."""
+    import pandas as pd
+
+    # Extract data for DataFrame (corrected structure)
+    data = {}
+
+    for category, details in response_data['breakdown'].items():
+        category_title = category.replace('_', ' ').title()
+        
+        # Store all details for the category in a dictionary
+        data[category_title] = {'Score': int(details['score']), 'Feedback': details['feedback']}
+        data[category_title].update({column: details.get(field, []) for field, column in FIELD_COLUMNS.items()})
+
+    df_results = pd.DataFrame.from_dict(data, orient='index')
+    overall_score = int(response_data['overall_score'])
+
+    # Extract gap analysis results
+    gap_analysis_results = response_data.get('gap_analysis', [])
+
+    # Extract competitors mentioned
+    competitors_mentioned = data['Competitive Analysis']['Competitors Mentioned']
+
+    return df_results, overall_score, gap_analysis_results, competitors_mentioned 
+
+def improvement_cache_key(section, original_text, user_input):
+    """Cache key for an improvement: (section, original text hash, user input hash)."""
+    parts = [section, hashlib.sha256(original_text.encode("utf-8")).hexdigest(),
+             hashlib.sha256(user_input.encode("utf-8")).hexdigest()]
+    from model_router import model_cache_tag
+
+    return make_cache_key("\x00".join(["improve"] + parts), PROMPT_VERSION, model_cache_tag())
+
+def improve_section(original_text, user_input, section, use_cache=True):
     """Generates an improved section using Google Gemini."""
+    cache_key = improvement_cache_key(section, original_text, user_input)
+    if use_cache:
+        cached_text = get_analysis_cache().get(cache_key)
+        if cached_text is not None:
+            return cached_text
+
     prompt = f"""
     ## Improve {section.title()}
 
@@ -154,7 +538,40 @@ def improve_section(original_text, user_input, section):
     Please provide an enhanced version incorporating both the original and user suggestions.
     """
     
-    model = genai.GenerativeModel(model_name="gemini-1.5-flash")
-    response = model.generate_content(prompt)
-    
-    return response.text
+    from model_router import get_router
+
+    # A reply much shorter than the original is usually cut off, so it is escalated.
+    min_length = get_router().rules.min_improvement_ratio * len(original_text.strip())
+    improved_text, _ = get_router().call(
+        "improve", prompt, check=lambda text: "truncated" if len(text.strip()) < min_length else None
+    )
+
+    if use_cache:
+        get_analysis_cache().set(cache_key, improved_text)
+    return improved_text
+
+async def improve_sections_async(section_requests, concurrency=IMPROVE_CONCURRENCY):
+    """Improves many sections concurrently with at most ``concurrency`` requests in flight.
+
+    ``section_requests`` is a list of ``(section, original_text, user_input)`` tuples.
+    Returns a dict mapping each section to its improved text, or None if its request failed.
+    """
+    loop = asyncio.get_running_loop()
+
+    def run(section, original_text, user_input):
+        try:
+            return improve_section(original_text, user_input, section)
+        except Exception as e:
+            print(f"Warning: improving {section} failed: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="improve") as executor:
+        results = await asyncio.gather(*(
+            loop.run_in_executor(executor, run, section, original_text, user_input)
+            for section, original_text, user_input in section_requests
+        ))
+    return {section: result for (section, _, _), result in zip(section_requests, results)}
+
+def improve_all_sections(section_requests, concurrency=IMPROVE_CONCURRENCY):
+    """Synchronous wrapper around improve_sections_async."""
+    return asyncio.run(improve_sections_async(section_requests, concurrency))
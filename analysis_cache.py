@@ -0,0 +1,164 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# --- Cache Settings ---
+CACHE_DIR = os.environ.get("BRIEFLY_CACHE_DIR", ".briefly_cache")
+DEFAULT_CACHE_PATH = os.path.join(CACHE_DIR, "analysis_cache.sqlite")
+DEFAULT_MEMORY_ENTRIES = 128
+DEFAULT_DISK_ENTRIES = 2000
+DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+
+
+def make_cache_key(text, prompt_version, model_name):
+    """Builds a content-addressed key from the brief text, prompt version and model."""
+    digest = hashlib.sha256()
+    for part in (prompt_version, model_name, text):
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """Two-level cache of parsed analysis responses.
+
+    Values are kept in an in-memory LRU and mirrored to SQLite so they survive
+    restarts. Both levels honour the same TTL; the disk level is capped by entry
+    count and evicts the least recently used rows first.
+    """
+
+    def __init__(
+        self,
+        path=DEFAULT_CACHE_PATH,
+        max_memory_entries=DEFAULT_MEMORY_ENTRIES,
+        max_disk_entries=DEFAULT_DISK_ENTRIES,
+        ttl_seconds=DEFAULT_TTL_SECONDS,
+    ):
+        self.path = path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+
+    # --- Disk Level ---
+    def _connection(self):
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS analysis_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_analysis_cache_accessed ON analysis_cache (accessed_at)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _is_expired(self, created_at, now):
+        return self.ttl_seconds is not None and now - created_at > self.ttl_seconds
+
+    def _remember(self, key, value, created_at):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    # --- Public API ---
+    def get(self, key):
+        """Returns the cached value for ``key`` or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created_at = entry
+                if not self._is_expired(created_at, now):
+                    self._memory.move_to_end(key)
+                    return value
+                del self._memory[key]
+
+            try:
+                conn = self._connection()
+                row = conn.execute(
+                    "SELECT value, created_at FROM analysis_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                if self._is_expired(row[1], now):
+                    conn.execute("DELETE FROM analysis_cache WHERE key = ?", (key,))
+                    conn.commit()
+                    return None
+                conn.execute("UPDATE analysis_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"Warning: analysis cache read failed: {e}")
+                return None
+
+            value = json.loads(row[0])
+            self._remember(key, value, row[1])
+            return value
+
+    def set(self, key, value):
+        """Stores a JSON-serialisable value under ``key`` in memory and on disk."""
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            try:
+                conn = self._connection()
+                conn.execute(
+                    "INSERT OR REPLACE INTO analysis_cache (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now),
+                )
+                self._prune(conn, now)
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"Warning: analysis cache write failed: {e}")
+
+    def _prune(self, conn, now):
+        if self.ttl_seconds is not None:
+            conn.execute("DELETE FROM analysis_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+        conn.execute(
+            """
+            DELETE FROM analysis_cache WHERE key IN (
+                SELECT key FROM analysis_cache ORDER BY accessed_at DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_disk_entries,),
+        )
+
+    def clear(self):
+        """Drops every cached entry from both levels."""
+        with self._lock:
+            self._memory.clear()
+            try:
+                conn = self._connection()
+                conn.execute("DELETE FROM analysis_cache")
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"Warning: analysis cache clear failed: {e}")
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_analysis_cache():
+    """Returns the process-wide analysis cache, creating it on first use."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = AnalysisCache()
+        return _default_cache
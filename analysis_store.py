@@ -0,0 +1,292 @@
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from analysis_cache import CACHE_DIR
+
+DEFAULT_STORE_PATH = os.path.join(CACHE_DIR, "analysis_store.sqlite")
+# strftime formats used to bucket analyses by time.
+PERIOD_FORMATS = {
+    "day": "%Y-%m-%d",
+    "week": "%Y-W%W",
+    "month": "%Y-%m",
+    "year": "%Y",
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS briefs (
+    content_hash TEXT PRIMARY KEY,
+    file_name TEXT,
+    model_name TEXT,
+    analyzed_at REAL NOT NULL,
+    overall_score INTEGER,
+    gap_analysis TEXT NOT NULL,
+    response TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS category_scores (
+    content_hash TEXT NOT NULL REFERENCES briefs (content_hash) ON DELETE CASCADE,
+    category TEXT NOT NULL,
+    score INTEGER,
+    feedback TEXT,
+    -- Copied from briefs so per-period aggregations need no join.
+    analyzed_at REAL NOT NULL,
+    PRIMARY KEY (content_hash, category)
+);
+CREATE TABLE IF NOT EXISTS extracted_items (
+    content_hash TEXT NOT NULL REFERENCES briefs (content_hash) ON DELETE CASCADE,
+    category TEXT NOT NULL,
+    field TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    value_key TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_briefs_analyzed_at ON briefs (analyzed_at);
+CREATE INDEX IF NOT EXISTS idx_briefs_overall_score ON briefs (overall_score);
+CREATE INDEX IF NOT EXISTS idx_category_scores_category_score ON category_scores (category, score);
+CREATE INDEX IF NOT EXISTS idx_category_scores_period ON category_scores (category, analyzed_at, score);
+CREATE INDEX IF NOT EXISTS idx_extracted_items_field_value ON extracted_items (field, value_key);
+CREATE INDEX IF NOT EXISTS idx_extracted_items_hash ON extracted_items (content_hash);
+"""
+
+
+def content_hash(file_bytes):
+    """Identifies a brief by the SHA-256 of its uploaded bytes."""
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+def _value_key(value):
+    return " ".join(str(value).lower().split())
+
+
+class AnalysisStore:
+    """Persistent history of every analysed brief, queryable without calling Gemini again.
+
+    Each analysis is stored whole (for ``get``) and flattened into indexed
+    tables of per-category scores and extracted list items, so aggregations
+    over thousands of briefs run as single indexed SQL queries.
+    """
+
+    def __init__(self, path=DEFAULT_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute("PRAGMA foreign_keys = ON")
+            if self.path != ":memory:":
+                # WAL lets the app and the batch runner read while another process writes.
+                self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.executescript(SCHEMA)
+            self._conn.commit()
+        return self._conn
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._connection().execute(sql, params).fetchall()
+
+    # --- Writes ---
+    def save(self, content_hash, response_data, file_name=None, model_name=None, analyzed_at=None):
+        """Stores (or replaces) the analysis of one brief."""
+        analyzed_at = time.time() if analyzed_at is None else analyzed_at
+        breakdown = response_data.get("breakdown", {})
+        category_rows = []
+        item_rows = []
+        for category, details in breakdown.items():
+            category_rows.append((content_hash, category, details.get("score"), details.get("feedback", ""), analyzed_at))
+            for field, values in details.items():
+                if not isinstance(values, list):
+                    continue
+                for position, value in enumerate(values):
+                    item_rows.append((content_hash, category, field, position, str(value), _value_key(value)))
+
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM briefs WHERE content_hash = ?", (content_hash,))
+                conn.execute(
+                    "INSERT INTO briefs (content_hash, file_name, model_name, analyzed_at, overall_score, gap_analysis, response)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        content_hash,
+                        file_name,
+                        model_name,
+                        analyzed_at,
+                        response_data.get("overall_score"),
+                        json.dumps(response_data.get("gap_analysis", [])),
+                        json.dumps(response_data),
+                    ),
+                )
+                conn.executemany(
+                    "INSERT INTO category_scores (content_hash, category, score, feedback, analyzed_at) VALUES (?, ?, ?, ?, ?)",
+                    category_rows,
+                )
+                conn.executemany(
+                    "INSERT INTO extracted_items (content_hash, category, field, position, value, value_key)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    item_rows,
+                )
+
+    def delete(self, content_hash):
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM briefs WHERE content_hash = ?", (content_hash,))
+
+    # --- Lookups ---
+    def get(self, content_hash):
+        """Returns the stored response for a brief, or None if it has never been analysed."""
+        rows = self._query("SELECT response FROM briefs WHERE content_hash = ?", (content_hash,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def count(self):
+        return self._query("SELECT COUNT(*) FROM briefs")[0][0]
+
+    def find_briefs(self, category=None, min_score=None, max_score=None, limit=100):
+        """Returns ``[{content_hash, file_name, analyzed_at, score}]`` for briefs whose score is in range.
+
+        ``score`` is the category score when ``category`` is given, otherwise the overall score.
+        """
+        if category is None:
+            sql = "SELECT content_hash, file_name, analyzed_at, overall_score FROM briefs WHERE 1 = 1"
+            column, params = "overall_score", []
+        else:
+            sql = (
+                "SELECT b.content_hash, b.file_name, b.analyzed_at, c.score FROM category_scores c"
+                " JOIN briefs b ON b.content_hash = c.content_hash WHERE c.category = ?"
+            )
+            column, params = "c.score", [category]
+        if min_score is not None:
+            sql += f" AND {column} >= ?"
+            params.append(min_score)
+        if max_score is not None:
+            sql += f" AND {column} <= ?"
+            params.append(max_score)
+        sql += f" ORDER BY {column} DESC LIMIT ?"
+        params.append(limit)
+        return [
+            {"content_hash": row[0], "file_name": row[1], "analyzed_at": row[2], "score": row[3]}
+            for row in self._query(sql, params)
+        ]
+
+    # --- Aggregations ---
+    def average_scores(self, period="month", category=None):
+        """Returns ``[{period, category, average_score, briefs}]`` ordered by period, then category."""
+        if period not in PERIOD_FORMATS:
+            raise ValueError(f"period must be one of {', '.join(PERIOD_FORMATS)}")
+        sql = (
+            "SELECT strftime(?, analyzed_at, 'unixepoch') AS period, category, AVG(score), COUNT(*)"
+            " FROM category_scores"
+        )
+        params = [PERIOD_FORMATS[period]]
+        if category is not None:
+            sql += " WHERE category = ?"
+            params.append(category)
+        sql += " GROUP BY period, category ORDER BY period, category"
+        return [
+            {"period": row[0], "category": row[1], "average_score": row[2], "briefs": row[3]}
+            for row in self._query(sql, params)
+        ]
+
+    def average_overall_score(self, period="month"):
+        """Returns ``[{period, average_score, briefs}]`` for the overall score."""
+        if period not in PERIOD_FORMATS:
+            raise ValueError(f"period must be one of {', '.join(PERIOD_FORMATS)}")
+        rows = self._query(
+            "SELECT strftime(?, analyzed_at, 'unixepoch') AS period, AVG(overall_score), COUNT(*)"
+            " FROM briefs GROUP BY period ORDER BY period",
+            (PERIOD_FORMATS[period],),
+        )
+        return [{"period": row[0], "average_score": row[1], "briefs": row[2]} for row in rows]
+
+    def top_values(self, field, limit=10, category=None):
+        """Returns the most frequent values of an extracted list field as ``[(value, briefs)]``.
+
+        Values are grouped case- and whitespace-insensitively and counted once per brief.
+        """
+        sql = "SELECT MIN(value), COUNT(DISTINCT content_hash) AS briefs FROM extracted_items WHERE field = ?"
+        params = [field]
+        if category is not None:
+            sql += " AND category = ?"
+            params.append(category)
+        sql += " GROUP BY value_key ORDER BY briefs DESC, value_key LIMIT ?"
+        params.append(limit)
+        return [(row[0], row[1]) for row in self._query(sql, params)]
+
+    def top_competitors(self, limit=10):
+        return self.top_values("competitors_mentioned", limit)
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_analysis_store():
+    """Returns the process-wide analysis store, creating it on first use."""
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = AnalysisStore()
+        return _default_store
+
+
+def record_analysis(content_hash, response_data, file_name=None, model_name=None):
+    """Saves an analysis to the default store; a failed write only prints a warning."""
+    try:
+        get_analysis_store().save(content_hash, response_data, file_name, model_name)
+    except (sqlite3.Error, AttributeError, TypeError) as e:
+        print(f"Warning: analysis store write failed: {e}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the history of analysed briefs.")
+    parser.add_argument("--db", default=DEFAULT_STORE_PATH, help="Path of the analysis store.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    scores = commands.add_parser("scores", help="Average category scores per period.")
+    scores.add_argument("--period", choices=list(PERIOD_FORMATS), default="month")
+    scores.add_argument("--category", help="Limit to one breakdown category, e.g. clarity_of_objectives.")
+
+    top = commands.add_parser("top", help="Most frequent values of an extracted field.")
+    top.add_argument("field", nargs="?", default="competitors_mentioned")
+    top.add_argument("-n", "--limit", type=int, default=10)
+    top.add_argument("--category")
+
+    find = commands.add_parser("find", help="Briefs with a score in a range.")
+    find.add_argument("--category")
+    find.add_argument("--min", type=int, dest="min_score")
+    find.add_argument("--max", type=int, dest="max_score")
+    find.add_argument("-n", "--limit", type=int, default=100)
+
+    args = parser.parse_args(argv)
+    store = AnalysisStore(args.db)
+    started = time.perf_counter()
+    if args.command == "scores":
+        for row in store.average_scores(args.period, args.category):
+            print(f"{row['period']}  {row['category']:<28} {row['average_score']:6.2f}  ({row['briefs']} briefs)")
+    elif args.command == "top":
+        for value, briefs in store.top_values(args.field, args.limit, args.category):
+            print(f"{briefs:6d}  {value}")
+    else:
+        for row in store.find_briefs(args.category, args.min_score, args.max_score, args.limit):
+            analyzed = time.strftime("%Y-%m-%d", time.localtime(row["analyzed_at"]))
+            print(f"{row['score']:>4}  {analyzed}  {row['file_name'] or row['content_hash'][:12]}")
+    print(f"{store.count()} briefs in store, query took {(time.perf_counter() - started) * 1000:.1f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
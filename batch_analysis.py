@@ -0,0 +1,185 @@
+import argparse
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from text_extraction import SUPPORTED_EXTENSIONS, extract_text_from_docx, extract_text_from_pdf
+from sentiment_analysis import analyze_sentiment
+from ai_analysis import analysis_model, build_results, is_pre_scored, load_analysis
+from analysis_store import content_hash, record_analysis
+from similarity_index import index_brief
+import llm_client
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_REQUESTS_PER_MINUTE = 60
+
+
+class TokenBucket:
+    """Async token-bucket rate limiter.
+
+    Holds up to ``capacity`` tokens and refills at ``rate`` tokens per second.
+    ``acquire`` waits until a token is available, so bursts up to ``capacity``
+    go through immediately and the sustained rate never exceeds ``rate``.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1, rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+def collect_brief_paths(inputs):
+    """Expands a mix of files and directories into a sorted list of DOCX/PDF paths."""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            for name in sorted(os.listdir(item)):
+                if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    paths.append(os.path.join(item, name))
+        elif item.lower().endswith(SUPPORTED_EXTENSIONS):
+            paths.append(item)
+        else:
+            print(f"Warning: skipping unsupported file {item}")
+    return paths
+
+
+def extract_text_from_bytes(path, file_bytes):
+    if path.lower().endswith(".docx"):
+        return extract_text_from_docx(file_bytes)
+    return extract_text_from_pdf(file_bytes)
+
+
+def _analyze_one(path):
+    """Runs extraction, sentiment and analysis for one brief on a worker thread."""
+    result = {"file": os.path.basename(path), "path": path, "status": "ok", "error": None}
+    started = time.perf_counter()
+    try:
+        with open(path, "rb") as f:
+            file_bytes = f.read()
+        document_text = extract_text_from_bytes(path, file_bytes)
+        if not document_text:
+            raise ValueError("no text could be extracted")
+
+        polarity, subjectivity = analyze_sentiment(document_text)
+        result["polarity"] = polarity
+        result["subjectivity"] = subjectivity
+
+        response_data = load_analysis(document_text)
+        if response_data is None:
+            raise ValueError("the model response could not be parsed")
+        df_results, overall_score, gap_analysis_results, competitors_mentioned = build_results(response_data)
+        digest = content_hash(file_bytes)
+        if not is_pre_scored(response_data):
+            record_analysis(digest, response_data, os.path.basename(path), analysis_model(response_data))
+            index_brief(digest, document_text, os.path.basename(path))
+
+        result["overall_score"] = overall_score
+        for category, score in df_results["Score"].items():
+            result[f"{category} Score"] = score
+        result["gap_analysis"] = "; ".join(gap_analysis_results)
+        result["competitors_mentioned"] = "; ".join(competitors_mentioned)
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = str(e)
+    result["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+class _ThreadBucket:
+    """Lets worker threads wait on a TokenBucket that lives on the event loop."""
+
+    def __init__(self, bucket, loop):
+        self.bucket = bucket
+        self.loop = loop
+
+    def wait_sync(self):
+        asyncio.run_coroutine_threadsafe(self.bucket.acquire(), self.loop).result()
+
+
+async def analyze_briefs_async(paths, concurrency=DEFAULT_CONCURRENCY, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE):
+    """Analyzes many briefs concurrently and returns one result dict per path, in input order.
+
+    At most ``concurrency`` briefs are processed at a time and Gemini requests are
+    throttled to ``requests_per_minute`` by a token bucket shared by all workers.
+    The bucket is consulted per backend request (see llm_client.set_rate_limiter),
+    so cached briefs cost nothing and chunked or escalated briefs pay per call.
+    """
+    loop = asyncio.get_running_loop()
+    bucket = _ThreadBucket(
+        TokenBucket(rate=requests_per_minute / 60.0, capacity=max(1, concurrency)), loop
+    )
+
+    llm_client.set_rate_limiter(bucket)
+    try:
+        # The pool size is the concurrency limit: each worker handles one brief end to end.
+        with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="brief") as executor:
+            return await asyncio.gather(
+                *(loop.run_in_executor(executor, _analyze_one, path) for path in paths)
+            )
+    finally:
+        llm_client.set_rate_limiter(None)
+
+
+def analyze_briefs(paths, concurrency=DEFAULT_CONCURRENCY, requests_per_minute=DEFAULT_REQUESTS_PER_MINUTE):
+    """Synchronous wrapper around analyze_briefs_async."""
+    return asyncio.run(analyze_briefs_async(paths, concurrency, requests_per_minute))
+
+
+def results_table(results):
+    """Combines per-brief results into a single DataFrame indexed by file name."""
+    df = pd.DataFrame(results)
+    if df.empty:
+        return df
+    return df.set_index("file")
+
+
+def write_results(df, output_path):
+    if output_path.lower().endswith(".json"):
+        df.to_json(output_path, orient="records", indent=2)
+    else:
+        df.to_csv(output_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze a batch of marketing briefs (DOCX or PDF).")
+    parser.add_argument("inputs", nargs="+", help="Brief files or directories containing briefs.")
+    parser.add_argument("-o", "--output", default="brief_results.csv", help="Combined results table (.csv or .json).")
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Maximum briefs processed at once.")
+    parser.add_argument("--rpm", type=float, default=DEFAULT_REQUESTS_PER_MINUTE, help="Maximum Gemini requests per minute.")
+    args = parser.parse_args(argv)
+
+    paths = collect_brief_paths(args.inputs)
+    if not paths:
+        parser.error("no DOCX or PDF files found")
+
+    started = time.perf_counter()
+    results = analyze_briefs(paths, concurrency=args.concurrency, requests_per_minute=args.rpm)
+    df = results_table(results)
+    write_results(df, args.output)
+
+    failed = sum(1 for r in results if r["status"] != "ok")
+    print(f"Analyzed {len(results) - failed}/{len(results)} briefs in {time.perf_counter() - started:.1f}s -> {args.output}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
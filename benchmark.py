@@ -0,0 +1,192 @@
+import argparse
+import io
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+import docx
+
+import llm_client
+from ai_analysis import build_results, generate_prompt, parse_response
+from sentiment_analysis import analyze_sentiment
+from simple_pdf import LINES_PER_PAGE, build_text_pdf, paginate, wrap_lines
+from text_extraction import iter_docx_blocks, iter_pdf_pages
+from utils import parse_and_improve
+
+DEFAULT_PAGES = [1, 10, 50, 100, 500]
+DEFAULT_OUTPUT = "benchmark_results.json"
+STAGES = ["extract", "sentiment", "llm", "parse", "build_results", "parse_and_improve"]
+
+HEADINGS = ["Background", "Objectives", "Target Audience", "Competitive Landscape", "Channels", "KPIs"]
+WORDS = (
+    "brand campaign launch audience growth awareness engagement digital social retail premium "
+    "customers market share conversion loyalty creative message insight value product partner "
+    "budget timeline measure increase strong clear innovative trusted local national online"
+).split()
+
+
+# --- Synthetic Briefs ---
+def synthetic_brief(pages, seed=0):
+    """Returns deterministic brief text that fills roughly ``pages`` PDF pages."""
+    rng = random.Random(seed)
+    target_lines = pages * LINES_PER_PAGE
+    paragraphs = ["Synthetic Campaign Brief"]
+    lines = 1
+    while lines < target_lines:
+        paragraphs.append(HEADINGS[len(paragraphs) % len(HEADINGS)] + ":")
+        sentences = [
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 16))).capitalize() + "."
+            for _ in range(rng.randint(3, 6))
+        ]
+        paragraphs.append(" ".join(sentences))
+        lines += 2 + len(paragraphs[-1]) // 90
+    return "\n".join(paragraphs)
+
+
+def synthetic_docx(text):
+    doc = docx.Document()
+    for paragraph in text.split("\n"):
+        if paragraph.endswith(":"):
+            doc.add_heading(paragraph.rstrip(":"), level=2)
+        else:
+            doc.add_paragraph(paragraph)
+    doc_bytes = io.BytesIO()
+    doc.save(doc_bytes)
+    return doc_bytes.getvalue()
+
+
+def synthetic_pdf(text, pages):
+    return build_text_pdf(paginate(wrap_lines(text))[:pages])
+
+
+# --- Pipeline ---
+def run_pipeline(file_bytes, kind):
+    """Runs the full brief pipeline once and returns per-stage wall time in seconds."""
+    timings = {}
+
+    def timed(stage, fn, *args):
+        started = time.perf_counter()
+        result = fn(*args)
+        timings[stage] = time.perf_counter() - started
+        return result
+
+    # Limits are disabled so the benchmark measures the extraction engine itself.
+    if kind == "pdf":
+        text = timed("extract", lambda: "\n".join(iter_pdf_pages(file_bytes, max_pages=None, max_bytes=None)))
+    else:
+        text = timed("extract", lambda: "\n".join(iter_docx_blocks(file_bytes, max_bytes=None)))
+    timed("sentiment", analyze_sentiment, text)
+    response_text = timed("llm", llm_client.generate, generate_prompt(text), None, None, "benchmark")
+    response_data = timed("parse", parse_response, response_text)
+    df_results, overall_score, _, _ = timed("build_results", build_results, response_data)
+    timed("parse_and_improve", parse_and_improve, df_results, overall_score)
+    return timings
+
+
+def peak_memory_mb(file_bytes, kind):
+    tracemalloc.start()
+    try:
+        run_pipeline(file_bytes, kind)
+        return tracemalloc.get_traced_memory()[1] / 1024 / 1024
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark(pages_list=DEFAULT_PAGES, kinds=("docx", "pdf"), repeats=3, latency=0.0, measure_memory=True):
+    """Benchmarks the pipeline over synthetic briefs of each size and kind, using FakeBackend."""
+    llm_client.set_backend(llm_client.FakeBackend(latency=latency))
+    results = []
+    for pages in pages_list:
+        text = synthetic_brief(pages, seed=pages)
+        for kind in kinds:
+            file_bytes = synthetic_docx(text) if kind == "docx" else synthetic_pdf(text, pages)
+            runs = [run_pipeline(file_bytes, kind) for _ in range(repeats)]
+            stage_seconds = {stage: statistics.median(run[stage] for run in runs) for stage in STAGES}
+            total_seconds = sum(stage_seconds.values())
+            result = {
+                "kind": kind,
+                "pages": pages,
+                "file_bytes": len(file_bytes),
+                "text_chars": len(text),
+                "repeats": repeats,
+                "stage_seconds": stage_seconds,
+                "total_seconds": total_seconds,
+                "pages_per_second": pages / total_seconds if total_seconds else None,
+                "peak_memory_mb": peak_memory_mb(file_bytes, kind) if measure_memory else None,
+            }
+            results.append(result)
+            print(
+                f"{kind:>4} {pages:>4}p  total {total_seconds * 1000:9.1f} ms  "
+                + "  ".join(f"{stage} {stage_seconds[stage] * 1000:.1f}" for stage in STAGES)
+                + (f"  peak {result['peak_memory_mb']:.1f} MB" if measure_memory else "")
+            )
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(results, baseline, threshold=0.2):
+    """Returns a line for every (kind, pages, stage) that is more than ``threshold`` slower than the baseline."""
+    baseline_index = {(r["kind"], r["pages"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        previous = baseline_index.get((result["kind"], result["pages"]))
+        if previous is None:
+            continue
+        for stage in STAGES + ["total"]:
+            current = result["total_seconds"] if stage == "total" else result["stage_seconds"][stage]
+            before = previous["total_seconds"] if stage == "total" else previous["stage_seconds"].get(stage)
+            if before and current > before * (1 + threshold):
+                regressions.append(
+                    f"{result['kind']} {result['pages']}p {stage}: {before * 1000:.1f} ms -> {current * 1000:.1f} ms"
+                )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the brief pipeline against a fake LLM backend.")
+    parser.add_argument("--pages", type=int, nargs="+", default=DEFAULT_PAGES, help="Synthetic brief sizes in pages.")
+    parser.add_argument("--kinds", nargs="+", choices=["docx", "pdf"], default=["docx", "pdf"])
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per size; the median is reported.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated LLM latency in seconds.")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc peak-memory pass.")
+    parser.add_argument("-o", "--output", default=DEFAULT_OUTPUT, help="Where to write machine-readable results.")
+    parser.add_argument("--compare", help="Previous results file to check for regressions.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Relative slowdown reported as a regression.")
+    args = parser.parse_args(argv)
+
+    results = benchmark(args.pages, args.kinds, args.repeats, args.latency, not args.no_memory)
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "commit": _git_commit(),
+            "latency": args.latency,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,273 @@
+import argparse
+import functools
+import hashlib
+import io
+import os
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+
+from instrumentation import timed
+from simple_pdf import BoldLine, build_text_pdf, paginate, wrap_lines
+
+# --- Export Settings ---
+EXPORT_FORMATS = {
+    "docx": ("application/vnd.openxmlformats-officedocument.wordprocessingml.document", ".docx"),
+    "md": ("text/markdown", ".md"),
+    "pdf": ("application/pdf", ".pdf"),
+}
+DEFAULT_TITLE = "Improved Marketing Brief"
+# Rendered documents kept in memory, bounded by their total size.
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+# Parsed and rendered sections kept per process; each is a few KB at most.
+SECTION_CACHE_ENTRIES = 512
+
+_BULLET = re.compile(r"^\s*(?:[-*•]|\d{1,2}[.)])\s+")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+# --- Sections ---
+@functools.lru_cache(maxsize=SECTION_CACHE_ENTRIES)
+def section_blocks(text):
+    """Splits a section body into ``("paragraph" | "bullet", text)`` blocks.
+
+    Paragraphs are separated by blank lines; lines starting with ``-``, ``*``,
+    ``•`` or ``1.`` become bullets. Results are cached, so an unchanged section
+    is only parsed once however often the brief is exported.
+    """
+    blocks = []
+    for paragraph in _PARAGRAPH_BREAK.split(text.strip()):
+        prose = []
+        for line in paragraph.splitlines():
+            if _BULLET.match(line):
+                if prose:
+                    blocks.append(("paragraph", " ".join(prose)))
+                    prose = []
+                blocks.append(("bullet", _BULLET.sub("", line).strip()))
+            elif line.strip():
+                prose.append(line.strip())
+        if prose:
+            blocks.append(("paragraph", " ".join(prose)))
+    return tuple(blocks)
+
+
+def sections_from_text(text):
+    """Turns a brief's plain text into ``(heading, text)`` pairs by its headings."""
+    from section_analysis import split_sections
+
+    return [(heading, body) for heading, body in split_sections(text)]
+
+
+def export_key(sections, fmt, title=DEFAULT_TITLE):
+    """Content hash of a document: its format, title and every section heading and text."""
+    digest = hashlib.sha256()
+    for part in [fmt, title or ""] + [value for section in sections for value in section]:
+        digest.update(part.encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+# --- Markdown ---
+@functools.lru_cache(maxsize=SECTION_CACHE_ENTRIES)
+def _markdown_section(heading, text):
+    lines = [f"## {heading}"] if heading else []
+    previous = None
+    for kind, block in section_blocks(text):
+        # Consecutive bullets form one list; everything else is separated by a blank line.
+        if lines and not (kind == previous == "bullet"):
+            lines.append("")
+        lines.append(f"- {block}" if kind == "bullet" else block)
+        previous = kind
+    return "\n".join(lines) + "\n\n"
+
+
+def write_markdown(sections, out, title=DEFAULT_TITLE):
+    if title:
+        out.write(f"# {title}\n\n".encode("utf-8"))
+    for heading, text in sections:
+        out.write(_markdown_section(heading, text).encode("utf-8"))
+
+
+# --- PDF ---
+@functools.lru_cache(maxsize=SECTION_CACHE_ENTRIES)
+def _pdf_section_lines(heading, text):
+    lines = [BoldLine(line) for line in wrap_lines(heading)] if heading else []
+    for kind, block in section_blocks(text):
+        if kind == "bullet":
+            wrapped = wrap_lines(block, width=86)
+            lines.extend(["- " + wrapped[0]] + ["  " + line for line in wrapped[1:]])
+        else:
+            lines.extend(wrap_lines(block) + [""])
+    return tuple(lines + [""])
+
+
+def write_pdf(sections, out, title=DEFAULT_TITLE):
+    lines = [BoldLine(title), ""] if title else []
+    for heading, text in sections:
+        lines.extend(_pdf_section_lines(heading, text))
+    out.write(build_text_pdf(paginate(lines)))
+
+
+# --- DOCX ---
+def write_docx(sections, out, title=DEFAULT_TITLE):
+    import docx
+
+    doc = docx.Document()
+    if title:
+        doc.add_heading(title, level=1)
+    for heading, text in sections:
+        if heading:
+            doc.add_heading(heading, level=2)
+        for kind, block in section_blocks(text):
+            doc.add_paragraph(block, style="List Bullet" if kind == "bullet" else None)
+    doc.save(out)
+
+
+_WRITERS = {"docx": write_docx, "md": write_markdown, "pdf": write_pdf}
+
+
+def write_brief(sections, fmt, out, title=DEFAULT_TITLE):
+    """Writes ``(heading, text)`` sections to the binary file object ``out`` in ``fmt``."""
+    if fmt not in _WRITERS:
+        raise ValueError(f"Unsupported export format: {fmt}. Use one of {', '.join(EXPORT_FORMATS)}.")
+    _WRITERS[fmt](sections, out, title)
+
+
+# --- Document Cache ---
+class ExportCache:
+    """In-memory LRU of rendered documents keyed by export_key, bounded by total bytes."""
+
+    def __init__(self, max_bytes=MAX_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def set(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._entries[key] = data
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_export_cache():
+    """Returns the process-wide export cache, creating it on first use."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ExportCache()
+        return _default_cache
+
+
+@timed("export")
+def export_brief(sections, fmt="docx", title=DEFAULT_TITLE):
+    """Returns the brief rendered as ``fmt`` bytes.
+
+    The document is cached by the hash of its sections, so reruns and repeated
+    downloads of an unchanged brief return the same bytes without rebuilding it.
+    """
+    key = export_key(sections, fmt, title)
+    data = get_export_cache().get(key)
+    if data is None:
+        out = io.BytesIO()
+        write_brief(sections, fmt, out, title)
+        data = out.getvalue()
+        get_export_cache().set(key, data)
+    return data
+
+
+# --- Batch Export ---
+def _archive_name(name, fmt, used):
+    stem = os.path.splitext(os.path.basename(name))[0] or "brief"
+    candidate = stem + EXPORT_FORMATS[fmt][1]
+    counter = 2
+    while candidate in used:
+        candidate = f"{stem}-{counter}{EXPORT_FORMATS[fmt][1]}"
+        counter += 1
+    used.add(candidate)
+    return candidate
+
+
+@timed("export.zip")
+def export_briefs_zip(briefs, out, fmt="docx", title=DEFAULT_TITLE):
+    """Writes ``(name, sections)`` briefs into one zip archive at ``out`` (a path or binary file object).
+
+    Each document is rendered straight into its archive entry and the input may be
+    a generator, so only one brief is held in memory at a time. Returns the
+    archive names written.
+    """
+    used = set()
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, sections in briefs:
+            archive_name = _archive_name(name, fmt, used)
+            with archive.open(archive_name, "w", force_zip64=True) as entry:
+                write_brief(sections, fmt, entry, title)
+    return sorted(used)
+
+
+# --- CLI ---
+def _iter_brief_files(paths):
+    from text_extraction import extract_text
+
+    for path in paths:
+        try:
+            with open(path, "rb") as f:
+                text = extract_text(f.read(), path)
+        except Exception as e:
+            print(f"Warning: skipping {path}: {e}")
+            continue
+        yield path, sections_from_text(text)
+
+
+def main(argv=None):
+    from batch_analysis import collect_brief_paths
+
+    parser = argparse.ArgumentParser(description="Export briefs (DOCX or PDF) as formatted DOCX, Markdown or PDF documents.")
+    parser.add_argument("inputs", nargs="+", help="Brief files or directories containing briefs.")
+    parser.add_argument("-f", "--format", choices=sorted(EXPORT_FORMATS), default="docx", help="Output format.")
+    parser.add_argument("-o", "--output", default="briefs.zip", help="Zip archive, or a single document when exporting one brief.")
+    parser.add_argument("--title", default="", help="Title heading added to every document.")
+    args = parser.parse_args(argv)
+
+    paths = collect_brief_paths(args.inputs)
+    if not paths:
+        print("No DOCX or PDF briefs found.")
+        return 1
+
+    if args.output.lower().endswith(".zip"):
+        names = export_briefs_zip(_iter_brief_files(paths), args.output, args.format, args.title)
+        print(f"Wrote {len(names)} of {len(paths)} briefs to {args.output}")
+        return 0 if names else 1
+
+    if len(paths) > 1:
+        print("Exporting several briefs needs a .zip output.")
+        return 1
+    for _, sections in _iter_brief_files(paths):
+        with open(args.output, "wb") as f:
+            write_brief(sections, args.format, f, args.title)
+        print(f"Wrote {args.output}")
+        return 0
+    return 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,333 @@
+import argparse
+import asyncio
+import base64
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from email.parser import BytesParser
+from email.policy import HTTP
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from ai_analysis import analysis_model, build_results, is_pre_scored, load_analysis
+from analysis_store import content_hash, record_analysis
+from sentiment_analysis import analyze_sentiment_sections
+from similarity_index import index_brief
+from text_extraction import ExtractionLimitError, UnsupportedFormatError, extract_text
+from utils import parse_and_improve
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_CONCURRENCY = 8
+MAX_REQUEST_BYTES = 100 * 1024 * 1024
+# File names assumed for raw uploads that only carry a Content-Type.
+CONTENT_TYPE_NAMES = {
+    "application/pdf": "brief.pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": "brief.docx",
+}
+
+
+# --- Pipeline ---
+class BriefInputError(ValueError):
+    """Raised when the request has no usable brief: nothing given, unreadable, or no text."""
+
+
+class AnalysisFailedError(RuntimeError):
+    """Raised when the model call fails or its response cannot be used."""
+
+
+def analyze_brief(text=None, file_bytes=None, file_name=None, use_cache=True):
+    """Runs extraction, sentiment, analysis and suggestions for one brief.
+
+    Pass either ``text`` or ``file_bytes`` with a ``file_name`` ending in .docx or .pdf.
+    Returns a JSON-serialisable dict; raises on bad input or a failed analysis.
+    """
+    if file_bytes is not None:
+        digest = content_hash(file_bytes)
+        try:
+            text = extract_text(file_bytes, file_name or "")
+        except (UnsupportedFormatError, ExtractionLimitError):
+            raise
+        except Exception as e:
+            raise BriefInputError(f"could not read {file_name}: {e}") from e
+    elif text is not None:
+        digest = content_hash(text.encode("utf-8"))
+    else:
+        raise BriefInputError("provide brief text or a DOCX/PDF file")
+    if not text or not text.strip():
+        raise BriefInputError("no text could be extracted")
+
+    sentiment = analyze_sentiment_sections(text)
+    response_data = load_analysis(text, use_cache)
+    if response_data is None:
+        raise AnalysisFailedError("the model response could not be parsed")
+    df_results, overall_score, gap_analysis_results, competitors_mentioned = build_results(response_data)
+    suggestions = parse_and_improve(df_results, overall_score)
+
+    if not is_pre_scored(response_data):
+        record_analysis(digest, response_data, file_name, analysis_model(response_data))
+        index_brief(digest, text, file_name)
+    return {
+        "status": "ok",
+        "file_name": file_name,
+        "content_hash": digest,
+        "model": analysis_model(response_data),
+        "overall_score": overall_score,
+        "breakdown": response_data["breakdown"],
+        "gap_analysis": gap_analysis_results,
+        "competitors_mentioned": competitors_mentioned,
+        "sentiment": sentiment,
+        "suggestions": suggestions,
+        # Present when the local pre-score skipped or shortened the Gemini call.
+        "pre_score": response_data.get("pre_score"),
+    }
+
+
+def _analyze_input(brief):
+    """analyze_brief for one ``{name, text, file_bytes}`` input, turning failures into an error result."""
+    try:
+        return analyze_brief(brief.get("text"), brief.get("file_bytes"), brief.get("name"))
+    except Exception as e:
+        return {"status": "error", "file_name": brief.get("name"), "error": str(e), "error_type": type(e).__name__}
+
+
+async def analyze_many(briefs, executor):
+    """Analyzes briefs concurrently on ``executor``, yielding each result (with its input index) as it completes."""
+    loop = asyncio.get_running_loop()
+
+    async def run(index, brief):
+        result = await loop.run_in_executor(executor, _analyze_input, brief)
+        return dict(result, index=index)
+
+    for next_result in asyncio.as_completed([run(index, brief) for index, brief in enumerate(briefs)]):
+        yield await next_result
+
+
+# --- Request Parsing ---
+class RequestError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def parse_briefs(content_type, body, query):
+    """Returns ``[{name, text, file_bytes}]`` from a request body.
+
+    Accepts JSON (``{"text": ...}``, ``{"file_name": ..., "content_base64": ...}`` or
+    ``{"briefs": [...]}`` of either), multipart form uploads, plain text, or a raw
+    DOCX/PDF body named by ``?file_name=`` or its Content-Type.
+    """
+    media_type = content_type.split(";")[0].strip().lower()
+    if media_type == "application/json":
+        try:
+            payload = json.loads(body)
+        except json.JSONDecodeError as e:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"invalid JSON: {e}")
+        items = payload.get("briefs", [payload]) if isinstance(payload, dict) else payload
+        briefs = []
+        for item in items if isinstance(items, list) else []:
+            if not isinstance(item, dict):
+                continue
+            if item.get("content_base64"):
+                briefs.append({"name": item.get("file_name"), "file_bytes": base64.b64decode(item["content_base64"])})
+            elif item.get("text"):
+                briefs.append({"name": item.get("file_name"), "text": item["text"]})
+        return briefs
+
+    if media_type == "multipart/form-data":
+        message = BytesParser(policy=HTTP).parsebytes(
+            b"Content-Type: " + content_type.encode("latin-1") + b"\r\n\r\n" + body
+        )
+        briefs = []
+        for part in message.iter_parts():
+            payload = part.get_payload(decode=True) or b""
+            if part.get_filename():
+                briefs.append({"name": part.get_filename(), "file_bytes": payload})
+            elif part.get_param("name", header="content-disposition") == "text":
+                briefs.append({"name": None, "text": payload.decode("utf-8", "replace")})
+        return briefs
+
+    if media_type == "text/plain":
+        return [{"name": query.get("file_name"), "text": body.decode("utf-8", "replace")}] if body else []
+
+    name = query.get("file_name") or CONTENT_TYPE_NAMES.get(media_type)
+    if not name:
+        raise RequestError(HTTPStatus.UNSUPPORTED_MEDIA_TYPE, "send JSON, multipart, text/plain or a DOCX/PDF body with ?file_name=")
+    return [{"name": name, "file_bytes": body}] if body else []
+
+
+# --- HTTP Service ---
+class BriefService:
+    """Minimal asyncio HTTP/1.1 server for the analysis pipeline.
+
+    Endpoints:
+      POST /analyze        one brief, JSON response
+      POST /analyze/batch  many briefs, NDJSON response with one line per brief as it completes
+      GET  /health, GET /metrics (Prometheus text)
+
+    Each connection is handled on the event loop; the pipeline itself runs on a
+    thread pool of ``concurrency`` workers, so slow Gemini calls never block
+    other requests.
+    """
+
+    def __init__(self, concurrency=DEFAULT_CONCURRENCY):
+        self.executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="service")
+
+    async def handle(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").strip()
+            if not request_line:
+                return
+            method, target, _ = request_line.split(" ", 2)
+            headers = {}
+            while True:
+                line = (await reader.readline()).decode("latin-1")
+                if line in ("\r\n", "\n", ""):
+                    break
+                key, _, value = line.partition(":")
+                headers[key.strip().lower()] = value.strip()
+
+            length = int(headers.get("content-length") or 0)
+            if length > MAX_REQUEST_BYTES:
+                raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"request body over {MAX_REQUEST_BYTES} bytes")
+            body = await reader.readexactly(length) if length else b""
+            url = urlsplit(target)
+            query = {key: values[0] for key, values in parse_qs(url.query).items()}
+            await self.route(writer, method, url.path, headers, body, query)
+        except RequestError as e:
+            await self.send_json(writer, e.status, {"status": "error", "error": str(e)})
+        except (ValueError, asyncio.IncompleteReadError) as e:
+            await self.send_json(writer, HTTPStatus.BAD_REQUEST, {"status": "error", "error": f"malformed request: {e}"})
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def route(self, writer, method, path, headers, body, query):
+        if path == "/health" and method == "GET":
+            await self.send_json(writer, HTTPStatus.OK, {"status": "ok"})
+        elif path == "/metrics" and method == "GET":
+            from instrumentation import prometheus_text
+
+            await self.send(writer, HTTPStatus.OK, prometheus_text().encode("utf-8"), "text/plain; version=0.0.4")
+        elif path in ("/analyze", "/analyze/batch"):
+            if method != "POST":
+                raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED, "use POST")
+            briefs = parse_briefs(headers.get("content-type", ""), body, query)
+            if not briefs:
+                raise RequestError(HTTPStatus.BAD_REQUEST, "no brief text or file in the request")
+            if path == "/analyze/batch" or query.get("stream") == "ndjson":
+                await self.stream_ndjson(writer, briefs)
+            else:
+                result = await asyncio.get_running_loop().run_in_executor(self.executor, _analyze_input, briefs[0])
+                await self.send_json(writer, _error_status(result), result)
+        else:
+            raise RequestError(HTTPStatus.NOT_FOUND, f"no route for {method} {path}")
+
+    async def send(self, writer, status, body, content_type):
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body
+        )
+        await writer.drain()
+
+    async def send_json(self, writer, status, payload):
+        await self.send(writer, status, json.dumps(payload).encode("utf-8"), "application/json")
+
+    async def stream_ndjson(self, writer, briefs):
+        """Writes one JSON line per brief as soon as it is analyzed, using chunked transfer encoding."""
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+            b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n"
+        )
+        async for result in analyze_many(briefs, self.executor):
+            line = json.dumps(result).encode("utf-8") + b"\n"
+            writer.write(b"%x\r\n%s\r\n" % (len(line), line))
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def serve(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        server = await asyncio.start_server(self.handle, host, port)
+        print(f"Briefly service listening on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def _error_status(result):
+    if result["status"] == "ok":
+        return HTTPStatus.OK
+    if result["error_type"] == UnsupportedFormatError.__name__:
+        return HTTPStatus.UNSUPPORTED_MEDIA_TYPE
+    if result["error_type"] in (ExtractionLimitError.__name__, BriefInputError.__name__):
+        return HTTPStatus.UNPROCESSABLE_ENTITY
+    if result["error_type"] == AnalysisFailedError.__name__:
+        return HTTPStatus.BAD_GATEWAY
+    return HTTPStatus.INTERNAL_SERVER_ERROR
+
+
+# --- CLI ---
+def _read_inputs(paths, text):
+    from batch_analysis import collect_brief_paths
+
+    briefs = []
+    if text is not None:
+        briefs.append({"name": None, "text": sys.stdin.read() if text == "-" else text})
+    for path in collect_brief_paths(paths):
+        with open(path, "rb") as f:
+            briefs.append({"name": os.path.basename(path), "file_bytes": f.read()})
+    return briefs
+
+
+async def _run_cli(briefs, concurrency, ndjson, output):
+    failed = 0
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="service") as executor:
+        if not ndjson:
+            result = _analyze_input(briefs[0])
+            output.write(json.dumps(result, indent=2) + "\n")
+            return 0 if result["status"] == "ok" else 1
+        async for result in analyze_many(briefs, executor):
+            failed += result["status"] != "ok"
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+    return 1 if failed else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze marketing briefs without the Streamlit UI.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    analyze = commands.add_parser("analyze", help="Analyze briefs and print JSON.")
+    analyze.add_argument("inputs", nargs="*", help="DOCX/PDF files or directories.")
+    analyze.add_argument("--text", help="Brief text to analyze, or - to read it from stdin.")
+    analyze.add_argument("--ndjson", action="store_true", help="One JSON line per brief as each completes (default for several briefs).")
+    analyze.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+    analyze.add_argument("-o", "--output", help="Write results to this file instead of stdout.")
+
+    serve = commands.add_parser("serve", help="Run the HTTP service.")
+    serve.add_argument("--host", default=DEFAULT_HOST)
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY)
+
+    args = parser.parse_args(argv)
+    if args.command == "serve":
+        try:
+            asyncio.run(BriefService(args.concurrency).serve(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    briefs = _read_inputs(args.inputs, args.text)
+    if not briefs:
+        parser.error("no brief text or DOCX/PDF files given")
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        return asyncio.run(_run_cli(briefs, args.concurrency, args.ndjson or len(briefs) > 1, output))
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,205 @@
+import contextvars
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from ai_analysis import (
+    ANALYSIS_GENERATION_CONFIG,
+    CATEGORY_FIELDS,
+    PROMPT_VERSION,
+    generate_prompt,
+    parse_response_outcome,
+    validate_analysis,
+)
+from analysis_cache import get_analysis_cache, make_cache_key
+from instrumentation import span
+from model_router import get_router, model_cache_tag
+from section_analysis import split_sections
+from text_normalization import CHARS_PER_TOKEN, estimate_tokens, normalize_text
+
+# --- Chunking Settings ---
+MAX_CHUNK_TOKENS = int(os.environ.get("BRIEFLY_CHUNK_TOKENS", "8000"))
+CHUNK_CONCURRENCY = 6
+
+_PARAGRAPH_SPLIT = re.compile(r"\n\s*\n|\n")
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+")
+
+
+def needs_chunking(text, max_tokens=None):
+    # Budgets apply to the normalized text, which is what the prompt actually carries.
+    return estimate_tokens(normalize_text(text)) > (max_tokens or MAX_CHUNK_TOKENS)
+
+
+# --- Splitting ---
+def _pack(units, max_tokens, joiner):
+    """Greedily joins consecutive units into pieces of at most ``max_tokens``."""
+    # Counted in characters, joiners included, so the joined piece never exceeds the budget.
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    pieces, current, current_chars = [], [], 0
+    for unit in units:
+        added = len(unit) + (len(joiner) if current else 0)
+        if current and current_chars + added > max_chars:
+            pieces.append(joiner.join(current))
+            current, current_chars = [], 0
+            added = len(unit)
+        current.append(unit)
+        current_chars += added
+    if current:
+        pieces.append(joiner.join(current))
+    return pieces
+
+
+def _split_oversized(text, max_tokens):
+    """Splits text on paragraph, then sentence boundaries, cutting mid-sentence only as a last resort."""
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+    for pattern, joiner in ((_PARAGRAPH_SPLIT, "\n"), (_SENTENCE_SPLIT, " ")):
+        units = [unit for unit in pattern.split(text) if unit.strip()]
+        if len(units) > 1:
+            pieces = []
+            for unit in units:
+                pieces.extend(_split_oversized(unit, max_tokens))
+            return _pack(pieces, max_tokens, joiner)
+    width = max_tokens * CHARS_PER_TOKEN
+    return [text[start:start + width] for start in range(0, len(text), width)]
+
+
+def split_into_chunks(text, max_tokens=None):
+    """Splits a brief into chunks of at most ``max_tokens`` estimated tokens.
+
+    Whole sections are kept together where they fit. Longer sections are split on
+    paragraph and sentence boundaries, and every piece repeats its section heading.
+    The text is normalized first; a brief that then fits is returned as a single chunk.
+    """
+    max_tokens = max_tokens or MAX_CHUNK_TOKENS
+    text = normalize_text(text)
+    if estimate_tokens(text) <= max_tokens:
+        return [text]
+
+    units = []
+    for heading, body in split_sections(text):
+        section_text = f"{heading}\n{body}" if heading else body
+        if estimate_tokens(section_text) <= max_tokens:
+            units.append(section_text)
+            continue
+        body_budget = max(1, max_tokens - estimate_tokens(heading) - 1)
+        for piece in _split_oversized(body, body_budget):
+            units.append(f"{heading}\n{piece}" if heading else piece)
+    return _pack(units, max_tokens, "\n\n")
+
+
+# --- Map ---
+def generate_chunk_prompt(chunk_text):
+    return (
+        "## Partial Brief\n"
+        "This is one part of a longer brief analyzed in parts. Score each category only on this part; "
+        "give a category this part does not address a score of 0 and empty lists. "
+        "In gap_analysis, list only what this part should contain but does not.\n"
+        + generate_prompt(chunk_text)
+    )
+
+
+def analyze_chunk(chunk_text, use_cache=True):
+    """Analyzes one chunk. Returns the parsed response, or None on failure."""
+    cache_key = make_cache_key(chunk_text, f"{PROMPT_VERSION}.chunk", model_cache_tag())
+    if use_cache:
+        cached = get_analysis_cache().get(cache_key)
+        if cached is not None:
+            return cached
+
+    try:
+        response_data, model_name = get_router().call(
+            "analyze.chunk", generate_chunk_prompt(chunk_text), parse=parse_response_outcome,
+            check=lambda data: validate_analysis(data, include_summary=False),
+            generation_config=ANALYSIS_GENERATION_CONFIG,
+        )
+    except Exception as e:
+        print(f"Warning: analyzing a chunk failed: {e}")
+        return None
+    if not isinstance(response_data, dict) or not isinstance(response_data.get("breakdown"), dict):
+        return None
+    response_data = dict(response_data, model=model_name)
+    if use_cache:
+        get_analysis_cache().set(cache_key, response_data)
+    return response_data
+
+
+# --- Reduce ---
+def _score(details):
+    try:
+        return int(details.get("score") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def _unique(values):
+    seen = set()
+    result = []
+    for value in values:
+        key = " ".join(str(value).lower().split())
+        if key and key not in seen:
+            seen.add(key)
+            result.append(value)
+    return result
+
+
+def merge_chunk_analyses(analyses, weights):
+    """Merges per-chunk responses into one response with the usual schema.
+
+    A category's score is the weighted mean over the chunks that addressed it
+    (a score of 0 means "not covered"), weighted by chunk size. Extracted lists,
+    feedback and gaps are combined in document order without duplicates. The
+    overall score is the mean of the category scores.
+    """
+    breakdown = {}
+    for category, fields in CATEGORY_FIELDS.items():
+        parts = [
+            (analysis["breakdown"][category], weight)
+            for analysis, weight in zip(analyses, weights)
+            if isinstance(analysis["breakdown"].get(category), dict)
+        ]
+        covered = [(details, weight) for details, weight in parts if _score(details) > 0]
+        total_weight = sum(weight for _, weight in covered)
+        details = {
+            "score": round(sum(_score(d) * weight for d, weight in covered) / total_weight) if total_weight else 0,
+            "feedback": " ".join(_unique(d.get("feedback", "") for d, _ in covered)),
+        }
+        for field in fields:
+            details[field] = _unique(
+                value for d, _ in parts for value in (d.get(field) if isinstance(d.get(field), list) else [])
+            )
+        breakdown[category] = details
+
+    return {
+        "overall_score": round(sum(details["score"] for details in breakdown.values()) / len(breakdown)),
+        "breakdown": breakdown,
+        "gap_analysis": _unique(
+            gap for analysis in analyses for gap in (analysis.get("gap_analysis") or [])
+        ),
+    }
+
+
+def request_chunked_analysis(text, max_tokens=None, concurrency=CHUNK_CONCURRENCY, use_cache=True):
+    """Analyzes a long brief chunk by chunk, concurrently, and merges the results.
+
+    Returns a response in the same schema as a single-prompt analysis, or None if
+    every chunk failed.
+    """
+    chunks = split_into_chunks(text, max_tokens)
+    with span("analyze.chunked", chunks=len(chunks)):
+        with ThreadPoolExecutor(max_workers=min(concurrency, len(chunks)), thread_name_prefix="chunk") as executor:
+            # Each task runs in a copy of the caller's context so its spans join the current trace.
+            futures = [
+                executor.submit(contextvars.copy_context().run, analyze_chunk, chunk, use_cache) for chunk in chunks
+            ]
+            results = [future.result() for future in futures]
+
+    analyses = [result for result in results if result is not None]
+    if len(analyses) < len(chunks):
+        print(f"Warning: {len(chunks) - len(analyses)} of {len(chunks)} chunks could not be analyzed")
+    if not analyses:
+        return None
+    weights = [estimate_tokens(chunk) for chunk, result in zip(chunks, results) if result is not None]
+    merged = merge_chunk_analyses(analyses, weights)
+    merged["model"] = ",".join(sorted({analysis["model"] for analysis in analyses if analysis.get("model")}))
+    return merged
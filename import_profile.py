@@ -0,0 +1,81 @@
+import argparse
+import ast
+import os
+import subprocess
+import sys
+
+DEFAULT_ENTRYPOINT = "streamlit_app.py"
+# Dependencies that should only load when the stage needing them runs.
+HEAVY_MODULES = ["pandas", "numpy", "docx", "PyPDF2", "textblob", "google.generativeai", "json_repair", "altair"]
+
+
+def top_level_imports(path):
+    """Returns the modules imported at the top level of ``path``, in order."""
+    with open(path) as f:
+        tree = ast.parse(f.read(), filename=path)
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def import_times(modules, cwd=None):
+    """Imports ``modules`` in a fresh interpreter and returns ``{module: cumulative_seconds}`` for everything loaded."""
+    code = "; ".join(f"import {module}" for module in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, cwd=cwd
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed")
+
+    times = {}
+    for line in result.stderr.splitlines():
+        # "import time:      self [us] |  cumulative | imported package"
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        try:
+            times[name.strip()] = int(cumulative) / 1e6
+        except ValueError:
+            continue
+    return times
+
+
+def profile(entrypoint=DEFAULT_ENTRYPOINT):
+    """Profiles the cold import of ``entrypoint``'s top-level imports.
+
+    Returns ``{"total", "modules": [(module, seconds)], "heavy_loaded": [...]}``.
+    """
+    cwd = os.path.dirname(os.path.abspath(entrypoint))
+    modules = top_level_imports(entrypoint)
+    times = import_times(modules, cwd=cwd)
+    per_module = [(module, times.get(module, 0.0)) for module in modules]
+    return {
+        "total": sum(seconds for _, seconds in per_module),
+        "modules": per_module,
+        "heavy_loaded": [module for module in HEAVY_MODULES if module in times],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report the cold-start import cost of the app's modules.")
+    parser.add_argument("entrypoint", nargs="?", default=DEFAULT_ENTRYPOINT)
+    parser.add_argument("--budget", type=float, help="Fail if total import time exceeds this many seconds.")
+    args = parser.parse_args(argv)
+
+    report = profile(args.entrypoint)
+    for module, seconds in sorted(report["modules"], key=lambda item: -item[1]):
+        print(f"{seconds * 1000:9.1f} ms  {module}")
+    print(f"{report['total'] * 1000:9.1f} ms  total")
+    print("Heavy modules loaded at import: " + (", ".join(report["heavy_loaded"]) or "none"))
+    if args.budget is not None and report["total"] > args.budget:
+        print(f"Import time exceeds the {args.budget:.2f} s budget.")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,316 @@
+import contextvars
+import cProfile
+import functools
+import io
+import os
+import pstats
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+SERVICE_NAME = "briefly"
+# Upper bounds (seconds) of the Prometheus duration histogram buckets.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+PROFILE_STATS_LINES = 40
+
+
+class Span:
+    """One timed stage. Times are nanoseconds since the epoch, as in OpenTelemetry."""
+
+    __slots__ = ("name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, name, parent_id, attributes):
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.attributes = attributes
+        self.error = None
+
+    @property
+    def duration(self):
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+
+class Trace:
+    """The spans recorded for one request, plus an optional cProfile report."""
+
+    def __init__(self, name):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex
+        self.spans = []
+        self.profile = None
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def waterfall(self, origin_ns=None):
+        """Returns ``[{name, depth, start, duration}]`` rows in start order.
+
+        ``start`` is in seconds from the trace's first span, or from ``origin_ns``
+        when several traces share one chart.
+        """
+        spans = sorted(self.spans, key=lambda s: s.start_ns)
+        if not spans:
+            return []
+        origin = spans[0].start_ns if origin_ns is None else origin_ns
+        depths = {}
+        rows = []
+        for span in spans:
+            depth = depths.get(span.parent_id, -1) + 1
+            depths[span.span_id] = depth
+            rows.append({
+                "name": span.name,
+                "depth": depth,
+                "start": (span.start_ns - origin) / 1e9,
+                "duration": span.duration,
+                "error": span.error,
+            })
+        return rows
+
+
+_current_trace = contextvars.ContextVar("briefly_trace", default=None)
+_current_span = contextvars.ContextVar("briefly_span", default=None)
+
+
+# --- Aggregated Metrics ---
+class _DurationHistogram:
+    def __init__(self):
+        self.bucket_counts = [0] * len(DURATION_BUCKETS)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        for i, bound in enumerate(DURATION_BUCKETS):
+            if seconds <= bound:
+                self.bucket_counts[i] += 1
+
+
+_stage_histograms = {}
+_stage_lock = threading.Lock()
+
+
+def _observe(name, seconds):
+    with _stage_lock:
+        histogram = _stage_histograms.get(name)
+        if histogram is None:
+            histogram = _stage_histograms[name] = _DurationHistogram()
+        histogram.observe(seconds)
+
+
+# --- Spans ---
+@contextmanager
+def span(name, **attributes):
+    """Times a stage. Nested spans become children; the duration always feeds the stage histograms."""
+    parent = _current_span.get()
+    current = Span(name, parent.span_id if parent else None, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+        trace = _current_trace.get()
+        if trace is not None:
+            trace.add(current)
+        _observe(name, current.duration)
+
+
+def timed(name):
+    """Decorator form of span."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_span(name, start_ns, end_ns, **attributes):
+    """Records an already finished span, for work that cannot be wrapped in a with-block (e.g. generators)."""
+    parent = _current_span.get()
+    finished = Span(name, parent.span_id if parent else None, attributes)
+    finished.start_ns = start_ns
+    finished.end_ns = end_ns
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(finished)
+    _observe(name, finished.duration)
+
+
+def start_trace(name):
+    """Starts collecting spans for a request. Returns ``(trace, token)`` for end_trace."""
+    trace = Trace(name)
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token):
+    _current_trace.reset(token)
+
+
+@contextmanager
+def trace(name):
+    current, token = start_trace(name)
+    try:
+        with span(name):
+            yield current
+    finally:
+        end_trace(token)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+# --- Profiling ---
+def profiling_enabled():
+    return os.environ.get("BRIEFLY_PROFILE", "").lower() in ("1", "true", "yes")
+
+
+@contextmanager
+def profile_if_slow(threshold_seconds=5.0, enabled=None):
+    """Runs the block under cProfile and keeps the report on the current trace if it took too long.
+
+    Profiling is opt-in: pass ``enabled=True`` or set ``BRIEFLY_PROFILE=1``.
+    """
+    if not (profiling_enabled() if enabled is None else enabled):
+        yield
+        return
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - started
+        trace = _current_trace.get()
+        if elapsed >= threshold_seconds and trace is not None:
+            report = io.StringIO()
+            pstats.Stats(profiler, stream=report).sort_stats("cumulative").print_stats(PROFILE_STATS_LINES)
+            trace.profile = report.getvalue()
+
+
+# --- Exporters ---
+def _otel_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otel_json(*traces):
+    """Exports traces in the OTLP/JSON layout accepted by OpenTelemetry collectors."""
+    spans = []
+    for trace in traces:
+        for s in trace.spans:
+            spans.append({
+                "traceId": trace.trace_id,
+                "spanId": s.span_id,
+                "parentSpanId": s.parent_id or "",
+                "name": s.name,
+                "kind": 1,
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns or s.start_ns),
+                "attributes": [{"key": key, "value": _otel_value(value)} for key, value in s.attributes.items()],
+                "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+            })
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": spans}],
+        }]
+    }
+
+
+def prometheus_text():
+    """Exports stage durations, LLM latency percentiles, JSON parse counts, prompt tokens, pre-score and model routes and job counts in Prometheus text format."""
+    from ai_analysis import parse_stats, prompt_token_stats
+    from job_queue import queue_stats
+    from model_router import route_stats as model_route_stats
+    from pre_scorer import route_stats
+    from request_policy import latency_summary
+
+    lines = [
+        "# HELP briefly_stage_duration_seconds Wall time of instrumented pipeline stages.",
+        "# TYPE briefly_stage_duration_seconds histogram",
+    ]
+    with _stage_lock:
+        stages = sorted(_stage_histograms.items())
+        for name, histogram in stages:
+            for bound, count in zip(DURATION_BUCKETS, histogram.bucket_counts):
+                lines.append(f'briefly_stage_duration_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+            lines.append(f'briefly_stage_duration_seconds_bucket{{stage="{name}",le="+Inf"}} {histogram.count}')
+            lines.append(f'briefly_stage_duration_seconds_sum{{stage="{name}"}} {histogram.total}')
+            lines.append(f'briefly_stage_duration_seconds_count{{stage="{name}"}} {histogram.count}')
+
+    latencies = sorted(latency_summary().items())
+    lines.append("# HELP briefly_llm_latency_seconds Recent LLM call latency by operation.")
+    lines.append("# TYPE briefly_llm_latency_seconds summary")
+    for operation, summary in latencies:
+        for quantile, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")):
+            if summary[key] is not None:
+                lines.append(f'briefly_llm_latency_seconds{{operation="{operation}",quantile="{quantile}"}} {summary[key]}')
+        lines.append(f'briefly_llm_latency_seconds_count{{operation="{operation}"}} {summary["count"]}')
+    for counter, help_text in (
+        ("errors", "LLM calls that failed after their last attempt"),
+        ("retries", "LLM call attempts retried after a transient error"),
+        ("hedges", "Duplicate LLM requests sent for slow calls"),
+    ):
+        lines.append(f"# HELP briefly_llm_{counter}_total {help_text}, by operation.")
+        lines.append(f"# TYPE briefly_llm_{counter}_total counter")
+        for operation, summary in latencies:
+            lines.append(f'briefly_llm_{counter}_total{{operation="{operation}"}} {summary[counter]}')
+
+    lines.append("# HELP briefly_json_parse_total Model responses by parse path.")
+    lines.append("# TYPE briefly_json_parse_total counter")
+    for outcome, count in sorted(parse_stats().items()):
+        lines.append(f'briefly_json_parse_total{{outcome="{outcome}"}} {count}')
+
+    lines.append("# HELP briefly_prompt_tokens_total Estimated tokens of the compacted analysis prompts sent.")
+    lines.append("# TYPE briefly_prompt_tokens_total counter")
+    for kind, count in sorted(prompt_token_stats().items()):
+        lines.append(f'briefly_prompt_tokens_total{{prompt="{kind}"}} {count}')
+
+    lines.append("# HELP briefly_prescore_routes_total Analyses by pre-score decision: full, shortened or skipped Gemini call.")
+    lines.append("# TYPE briefly_prescore_routes_total counter")
+    for decision, count in sorted(route_stats().items()):
+        lines.append(f'briefly_prescore_routes_total{{decision="{decision}"}} {count}')
+
+    model_routes = sorted(model_route_stats().items())
+    lines.append("# HELP briefly_route_calls_total Model calls by routed operation, model and outcome.")
+    lines.append("# TYPE briefly_route_calls_total counter")
+    for (operation, model_name), route in model_routes:
+        for outcome, count in sorted(route["outcomes"].items()):
+            lines.append(f'briefly_route_calls_total{{operation="{operation}",model="{model_name}",outcome="{outcome}"}} {count}')
+    lines.append("# HELP briefly_route_escalations_total Model calls whose response was escalated to the next model.")
+    lines.append("# TYPE briefly_route_escalations_total counter")
+    for (operation, model_name), route in model_routes:
+        lines.append(f'briefly_route_escalations_total{{operation="{operation}",model="{model_name}"}} {route["escalated"]}')
+    lines.append("# HELP briefly_route_latency_seconds_total Total model call time by routed operation and model.")
+    lines.append("# TYPE briefly_route_latency_seconds_total counter")
+    for (operation, model_name), route in model_routes:
+        lines.append(f'briefly_route_latency_seconds_total{{operation="{operation}",model="{model_name}"}} {route["latency_seconds"]}')
+    lines.append("# HELP briefly_route_cost_usd_total Estimated model cost by routed operation and model.")
+    lines.append("# TYPE briefly_route_cost_usd_total counter")
+    for (operation, model_name), route in model_routes:
+        lines.append(f'briefly_route_cost_usd_total{{operation="{operation}",model="{model_name}"}} {route["cost_usd"]}')
+
+    lines.append("# HELP briefly_jobs Background jobs in the job table by status.")
+    lines.append("# TYPE briefly_jobs gauge")
+    for status, count in queue_stats().items():
+        lines.append(f'briefly_jobs{{status="{status}"}} {count}')
+    return "\n".join(lines) + "\n"
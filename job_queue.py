@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import trace
+
+# --- Queue Settings ---
+DEFAULT_WORKERS = int(os.environ.get("BRIEFLY_JOB_WORKERS", "8"))
+# Finished jobs stay in the table this long so polling sessions can collect them.
+JOB_RETENTION_SECONDS = 15 * 60
+MAX_FINISHED_JOBS = 1000
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+class Job:
+    """One unit of background work and everything a polling UI needs to render it.
+
+    ``events`` collects partial results as the job runs (e.g. analysis stream
+    events), so the UI can show progress before ``result`` is ready.
+    """
+
+    __slots__ = ("job_id", "kind", "key", "status", "result", "error", "events", "trace",
+                 "created_at", "started_at", "finished_at", "_done")
+
+    def __init__(self, kind, key):
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.key = key
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.events = []
+        self.trace = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._done = threading.Event()
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def elapsed(self):
+        return (self.finished_at or time.time()) - self.created_at
+
+    def wait(self, timeout=None):
+        """Blocks until the job finishes or ``timeout`` passes. Returns True if it finished."""
+        return self._done.wait(timeout)
+
+
+class JobQueue:
+    """Thread pool plus an in-memory job table shared by every session in the process.
+
+    Submitting work with the key of a job that is still queued or running returns
+    that job instead of starting another, so duplicate uploads of the same brief
+    cost one analysis.
+    """
+
+    def __init__(self, max_workers=DEFAULT_WORKERS, retention_seconds=JOB_RETENTION_SECONDS):
+        self.retention_seconds = retention_seconds
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind, key, fn, *args):
+        """Queues ``fn(job, *args)``; its return value becomes the job's result."""
+        with self._lock:
+            self._prune(time.time())
+            job_id = self._in_flight.get(key)
+            if job_id is not None:
+                return self._jobs[job_id]
+            job = Job(kind, key)
+            self._jobs[job.job_id] = job
+            self._in_flight[key] = job.job_id
+        self._executor.submit(self._run, job, fn, args)
+        return job
+
+    def _run(self, job, fn, args):
+        job.status = RUNNING
+        job.started_at = time.time()
+        try:
+            with trace(f"job.{job.kind}") as job_trace:
+                job.trace = job_trace
+                job.result = fn(job, *args)
+            job.status = DONE
+        except Exception as e:
+            print(f"Warning: {job.kind} job {job.job_id} failed: {e}")
+            job.error = str(e)
+            job.status = FAILED
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                if self._in_flight.get(job.key) == job.job_id:
+                    del self._in_flight[job.key]
+            job._done.set()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def discard(self, job_id):
+        """Forgets a job, so the next submit with its key starts a fresh one (e.g. to retry a failure)."""
+        with self._lock:
+            job = self._jobs.pop(job_id, None)
+            if job is not None and self._in_flight.get(job.key) == job_id:
+                del self._in_flight[job.key]
+
+    def stats(self):
+        """Returns the number of jobs in the table per status."""
+        with self._lock:
+            counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+    def _prune(self, now):
+        finished = sorted(
+            (job for job in self._jobs.values() if job.finished), key=lambda job: job.finished_at
+        )
+        excess = len(finished) - MAX_FINISHED_JOBS
+        for index, job in enumerate(finished):
+            if index < excess or now - job.finished_at > self.retention_seconds:
+                del self._jobs[job.job_id]
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+_default_queue = None
+_default_queue_lock = threading.Lock()
+
+
+def get_job_queue():
+    """Returns the process-wide job queue, creating it on first use."""
+    global _default_queue
+    with _default_queue_lock:
+        if _default_queue is None:
+            _default_queue = JobQueue()
+        return _default_queue
+
+
+def queue_stats():
+    """Job counts per status, or an empty dict if no job has been submitted in this process."""
+    return _default_queue.stats() if _default_queue is not None else {}
+
+
+# --- Brief Jobs ---
+def _job_key(kind, payload):
+    return f"{kind}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+def _run_analysis(job, text):
+    from ai_analysis import stream_analysis
+
+    response_data = None
+    for event in stream_analysis(text):
+        if event[0] == "complete":
+            response_data = event[2]
+        elif event[0] == "reset":
+            job.events.clear()
+        else:
+            job.events.append(event)
+    if response_data is None:
+        raise ValueError("the analysis response could not be parsed")
+    return response_data
+
+
+def submit_analysis(text, queue=None):
+    """Queues the analysis of a brief. The job's events are the stream_analysis events so far."""
+    return (queue or get_job_queue()).submit("analyze", _job_key("analyze", text), _run_analysis, text)
+
+
+def _run_improve_all(job, section_requests):
+    from ai_analysis import improve_all_sections
+
+    return improve_all_sections(section_requests)
+
+
+def submit_improve_all(section_requests, queue=None):
+    """Queues improve_all_sections for ``(section, original_text, user_input)`` requests."""
+    key = _job_key("improve_all", json.dumps(section_requests))
+    return (queue or get_job_queue()).submit("improve_all", key, _run_improve_all, section_requests)
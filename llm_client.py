@@ -0,0 +1,314 @@
+import abc
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from instrumentation import record_span, span
+from request_policy import RequestPolicy, call_with_policy, stream_with_policy
+from text_normalization import estimate_tokens
+
+# --- Client Settings ---
+DEFAULT_MODEL = os.environ.get("BRIEFLY_MODEL", "gemini-1.5-flash")
+DEFAULT_TIMEOUT_SECONDS = float(os.environ.get("BRIEFLY_TIMEOUT_SECONDS", "60"))
+DEFAULT_MAX_RETRIES = int(os.environ.get("BRIEFLY_MAX_RETRIES", "2"))
+DEFAULT_DEADLINE_SECONDS = float(os.environ.get("BRIEFLY_DEADLINE_SECONDS", "120"))
+# Hedging is off unless a latency percentile (e.g. 95) is configured.
+DEFAULT_HEDGE_PERCENTILE = float(os.environ["BRIEFLY_HEDGE_PERCENTILE"]) if os.environ.get("BRIEFLY_HEDGE_PERCENTILE") else None
+
+
+class ClientSettings:
+    """Model, timeout, retry and hedging settings shared by every call through this module.
+
+    ``timeout`` applies to a single backend request; ``deadline`` bounds a whole
+    call including retries and hedged duplicates.
+    """
+
+    def __init__(
+        self,
+        model_name=DEFAULT_MODEL,
+        timeout=DEFAULT_TIMEOUT_SECONDS,
+        max_retries=DEFAULT_MAX_RETRIES,
+        deadline=DEFAULT_DEADLINE_SECONDS,
+        hedge_percentile=DEFAULT_HEDGE_PERCENTILE,
+    ):
+        self.model_name = model_name
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.deadline = deadline
+        self.hedge_percentile = hedge_percentile
+
+    def policy(self):
+        return RequestPolicy(
+            deadline=self.deadline,
+            max_attempts=self.max_retries + 1,
+            hedge_percentile=self.hedge_percentile,
+        )
+
+
+class LLMBackend(abc.ABC):
+    """Interface for text generation backends.
+
+    Backends return plain text; prompt building and response parsing stay in
+    ai_analysis so every backend sees exactly the same requests.
+    """
+
+    @abc.abstractmethod
+    def generate(self, prompt, model_name, timeout=None, generation_config=None):
+        """Returns the full response text."""
+
+    def generate_stream(self, prompt, model_name, timeout=None, generation_config=None):
+        """Yields the response text in chunks. Defaults to a single chunk."""
+        yield self.generate(prompt, model_name, timeout, generation_config)
+
+
+def _load_api_key():
+    api_key = os.environ.get("GOOGLE_API_KEY")
+    if api_key:
+        return api_key
+    import streamlit as st
+    return st.secrets["api_keys"]["GOOGLE_API_KEY"]
+
+
+class GeminiBackend(LLMBackend):
+    """Google Gemini backend with a process-wide pool of model handles.
+
+    The SDK is imported and configured on first use, and one GenerativeModel is
+    kept per model name so repeated calls reuse the same handle and client.
+    """
+
+    def __init__(self, api_key=None):
+        self._api_key = api_key
+        self._genai = None
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def _model(self, model_name):
+        with self._lock:
+            if self._genai is None:
+                import google.generativeai as genai
+                genai.configure(api_key=self._api_key or _load_api_key())
+                self._genai = genai
+            model = self._models.get(model_name)
+            if model is None:
+                model = self._genai.GenerativeModel(model_name=model_name)
+                self._models[model_name] = model
+            return model
+
+    @staticmethod
+    def _request_options(timeout):
+        return {"timeout": timeout} if timeout else None
+
+    def generate(self, prompt, model_name, timeout=None, generation_config=None):
+        response = self._model(model_name).generate_content(
+            prompt, generation_config=generation_config, request_options=self._request_options(timeout)
+        )
+        return response.text
+
+    def generate_stream(self, prompt, model_name, timeout=None, generation_config=None):
+        response = self._model(model_name).generate_content(
+            prompt, generation_config=generation_config, request_options=self._request_options(timeout), stream=True
+        )
+        for chunk in response:
+            yield chunk.text
+
+
+class FakeBackend(LLMBackend):
+    """Deterministic local stand-in for Gemini, for tests and benchmarks.
+
+    ``responder(prompt, model_name)`` produces the response text; by default a
+    well-formed analysis is generated with scores derived from a hash of the
+    prompt. ``latency`` seconds are slept per call and ``chunk_size`` controls how
+    streamed responses are split. Every prompt is recorded in ``calls``.
+
+    ``failure_rates`` maps model names to the share of prompts for which that
+    model returns a truncated response, to exercise repair and escalation paths.
+    Which prompts fail is derived from a hash, so runs are repeatable.
+    """
+
+    def __init__(self, responder=None, latency=0.0, chunk_size=64, failure_rates=None):
+        self.responder = responder or default_fake_response
+        self.latency = latency
+        self.chunk_size = chunk_size
+        self.failure_rates = failure_rates or {}
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def _fails(self, prompt, model_name):
+        rate = self.failure_rates.get(model_name, 0.0)
+        if not rate:
+            return False
+        digest = hashlib.sha256(f"{model_name}\x00{prompt}".encode("utf-8")).digest()
+        return int.from_bytes(digest[:4], "big") / 2 ** 32 < rate
+
+    def generate(self, prompt, model_name, timeout=None, generation_config=None):
+        with self._lock:
+            self.calls.append((model_name, prompt))
+        if self.latency:
+            time.sleep(self.latency)
+        text = self.responder(prompt, model_name)
+        return text[:len(text) // 2] if self._fails(prompt, model_name) else text
+
+    def generate_stream(self, prompt, model_name, timeout=None, generation_config=None):
+        text = self.generate(prompt, model_name, timeout, generation_config)
+        for start in range(0, len(text), self.chunk_size):
+            yield text[start:start + self.chunk_size]
+
+
+def default_fake_response(prompt, model_name):
+    """Builds a plausible response for analysis, category-scoring and improvement prompts."""
+    from ai_analysis import CATEGORY_FIELDS
+
+    seed = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest(), 16)
+    category_order = list(CATEGORY_FIELDS)
+
+    def score(category):
+        return 40 + (seed >> (category_order.index(category) * 8)) % 55
+
+    if "## Improve " in prompt:
+        match = re.search(r"Original Text:\s*```\s*(.*?)\s*```", prompt, re.S)
+        original_text = match.group(1) if match else ""
+        return f"{original_text}\n\n(Improved by {model_name}.)"
+
+    if "Category Scoring Request" in prompt:
+        titles = re.findall(r"^\s*### (.+)$", prompt, re.M)
+        categories = [title.strip().lower().replace(" ", "_") for title in titles]
+        categories = [category for category in categories if category in CATEGORY_FIELDS]
+    else:
+        categories = category_order
+
+    breakdown = {}
+    for category in categories:
+        details = {"score": score(category), "feedback": f"Deterministic feedback for {category.replace('_', ' ')}."}
+        details.update({field: [] for field in CATEGORY_FIELDS[category]})
+        breakdown[category] = details
+
+    if "Category Scoring Request" in prompt:
+        return json.dumps({"breakdown": breakdown})
+
+    overall_score = round(sum(details["score"] for details in breakdown.values()) / len(breakdown))
+    return "```json\n" + json.dumps({
+        "overall_score": overall_score,
+        "breakdown": breakdown,
+        "gap_analysis": [],
+    }, indent=2) + "\n```"
+
+
+def parse_failure_rates(spec):
+    """Parses ``"model=0.3,other-model=0.05"`` into a FakeBackend failure_rates dict."""
+    rates = {}
+    for item in spec.split(","):
+        if "=" in item:
+            model_name, rate = item.rsplit("=", 1)
+            rates[model_name.strip()] = float(rate)
+    return rates
+
+
+# --- Process-Wide Client ---
+_settings = ClientSettings()
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_settings():
+    return _settings
+
+
+def configure(model_name=None, timeout=None, max_retries=None, deadline=None, hedge_percentile=None):
+    """Overrides the default model, timeout, retry, deadline or hedging settings for subsequent calls."""
+    if model_name is not None:
+        _settings.model_name = model_name
+    if timeout is not None:
+        _settings.timeout = timeout
+    if max_retries is not None:
+        _settings.max_retries = max_retries
+    if deadline is not None:
+        _settings.deadline = deadline
+    if hedge_percentile is not None:
+        _settings.hedge_percentile = hedge_percentile
+
+
+def get_backend():
+    """Returns the active backend, creating it on first use.
+
+    ``BRIEFLY_LLM_BACKEND=fake`` selects FakeBackend, which needs no credentials.
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if os.environ.get("BRIEFLY_LLM_BACKEND", "gemini").lower() == "fake":
+                _backend = FakeBackend(
+                    latency=float(os.environ.get("BRIEFLY_FAKE_LATENCY", "0")),
+                    failure_rates=parse_failure_rates(os.environ.get("BRIEFLY_FAKE_FAILURE_RATES", "")),
+                )
+            else:
+                _backend = GeminiBackend()
+        return _backend
+
+
+def set_backend(backend):
+    """Replaces the active backend, e.g. with a FakeBackend in tests or benchmarks."""
+    global _backend
+    with _backend_lock:
+        _backend = backend
+
+
+# --- Rate Limiting ---
+_rate_limiter = None
+
+
+def set_rate_limiter(limiter):
+    """Throttles every backend request through ``limiter.wait_sync()``; None removes the limit.
+
+    Retries, hedged duplicates and escalations each take a token; cache hits never
+    reach the backend and take none.
+    """
+    global _rate_limiter
+    _rate_limiter = limiter
+
+
+def _throttled(request):
+    limiter = _rate_limiter
+    if limiter is not None:
+        limiter.wait_sync()
+    return request()
+
+
+def generate(prompt, model_name=None, generation_config=None, operation="generate"):
+    """Generates a response under the configured request policy.
+
+    Latency is recorded per ``operation`` (see request_policy.latency_summary).
+    """
+    model_name = model_name or _settings.model_name
+    backend = get_backend()
+    with span(f"llm.{operation}", model=model_name, prompt_chars=len(prompt), prompt_tokens=estimate_tokens(prompt)):
+        return call_with_policy(
+            operation,
+            lambda: _throttled(lambda: backend.generate(prompt, model_name, _settings.timeout, generation_config)),
+            _settings.policy(),
+        )
+
+
+def generate_stream(prompt, model_name=None, generation_config=None, operation="generate_stream"):
+    """Yields the response text in chunks as the backend produces them.
+
+    Transient errors before the first chunk are retried and the deadline covers
+    the whole stream (see request_policy.stream_with_policy). Streams are not
+    hedged; the time to the last chunk is recorded under ``operation``.
+    """
+    model_name = model_name or _settings.model_name
+    backend = get_backend()
+    started_ns = time.time_ns()
+    yield from stream_with_policy(
+        operation,
+        lambda remaining: _throttled(lambda: backend.generate_stream(
+            prompt, model_name, min(_settings.timeout, remaining), generation_config
+        )),
+        _settings.policy(),
+    )
+    record_span(
+        f"llm.{operation}.stream", started_ns, time.time_ns(),
+        model=model_name, prompt_chars=len(prompt), prompt_tokens=estimate_tokens(prompt),
+    )
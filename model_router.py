@@ -0,0 +1,309 @@
+import argparse
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+
+import llm_client
+from instrumentation import span
+from text_normalization import estimate_tokens
+
+# --- Routing Settings ---
+# Opt-in: unless BRIEFLY_ROUTING=on, every request goes to BRIEFLY_MODEL as before routing existed.
+ROUTING_ENABLED = os.environ.get("BRIEFLY_ROUTING", "off").lower() == "on"
+DEFAULT_CASCADE = [
+    model_name.strip()
+    for model_name in os.environ.get(
+        "BRIEFLY_MODEL_CASCADE", "gemini-1.5-flash-8b,gemini-1.5-flash,gemini-1.5-pro"
+    ).split(",")
+    if model_name.strip()
+]
+# Optional JSON file overriding RoutingRules attributes, and optional JSON-lines log of every routed call.
+RULES_PATH = os.environ.get("BRIEFLY_ROUTING_RULES")
+ROUTE_LOG_PATH = os.environ.get("BRIEFLY_ROUTE_LOG")
+
+# USD per million (input, output) tokens; models not listed are counted as free.
+MODEL_PRICES = {
+    "gemini-1.5-flash-8b": (0.0375, 0.15),
+    "gemini-1.5-flash": (0.075, 0.30),
+    "gemini-1.5-pro": (1.25, 5.00),
+}
+
+
+class RoutingRules:
+    """Thresholds the router applies. Any of them can be overridden by keyword or from a JSON file."""
+
+    def __init__(self, **overrides):
+        # Prompts up to cheap_max_tokens start on the first model of the cascade, up
+        # to standard_max_tokens on the second, and longer ones on the third.
+        self.cheap_max_tokens = 3000
+        self.standard_max_tokens = 12000
+        # Minimum starting tier per operation; improvements are prose the user keeps.
+        self.start_tiers = {"improve": 1}
+        # A model whose recent responses needed json_repair or failed validation more
+        # often than this is skipped, once it has min_samples outcomes from the last
+        # window_seconds (at most window of them). Outcomes expire, so a skipped model
+        # is tried again once its failures age out.
+        self.max_repair_rate = 0.25
+        self.min_samples = 20
+        self.window = 200
+        self.window_seconds = 600
+        # Analyses whose scores differ from the local pre-score by more than this on average are escalated.
+        self.max_prescore_disagreement = 40
+        # Improvements shorter than this share of the original text are treated as truncated.
+        self.min_improvement_ratio = 0.3
+        for name, value in overrides.items():
+            if not hasattr(self, name):
+                raise ValueError(f"Unknown routing rule: {name}")
+            setattr(self, name, value)
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path) as f:
+            return cls(**json.load(f))
+
+
+class NoAcceptableResponseError(RuntimeError):
+    """Raised when no model in the plan returned a response that passed its ``check``."""
+
+
+def estimated_cost(model_name, input_tokens, output_tokens):
+    input_price, output_price = MODEL_PRICES.get(model_name, (0.0, 0.0))
+    return (input_tokens * input_price + output_tokens * output_price) / 1_000_000
+
+
+# --- Router ---
+class ModelRouter:
+    """Picks a model per request and escalates along a cheap-first cascade.
+
+    A request starts on the cheapest model its operation and prompt size allow,
+    skipping models whose recent repair/failure rate is too high. When the
+    response fails to parse, or its ``check`` or ``confidence`` gate returns a
+    reason, the next model is tried. Only parse and ``check`` failures count
+    toward a model's repair/failure rate. Every attempt is recorded per
+    (operation, model) route.
+    """
+
+    def __init__(self, cascade=None, rules=None, enabled=ROUTING_ENABLED, log_path=ROUTE_LOG_PATH):
+        self.cascade = list(cascade or DEFAULT_CASCADE)
+        self.rules = rules or RoutingRules()
+        self.enabled = enabled
+        self.log_path = log_path
+        self._outcomes = {}
+        self._routes = {}
+        self._lock = threading.Lock()
+
+    def _expire(self, outcomes, now):
+        while outcomes and now - outcomes[0][0] > self.rules.window_seconds:
+            outcomes.popleft()
+
+    def repair_failure_rate(self, model_name):
+        """Share of the model's recent responses that needed json_repair or failed validation, or None if too few."""
+        with self._lock:
+            outcomes = self._outcomes.get(model_name)
+            if outcomes:
+                self._expire(outcomes, time.monotonic())
+            if not outcomes or len(outcomes) < self.rules.min_samples:
+                return None
+            return sum(failed for _, failed in outcomes) / len(outcomes)
+
+    def plan(self, operation, prompt_tokens):
+        """Returns the models to try for a request, in order."""
+        if not self.enabled or not self.cascade:
+            return [llm_client.get_settings().model_name]
+        if prompt_tokens <= self.rules.cheap_max_tokens:
+            tier = 0
+        elif prompt_tokens <= self.rules.standard_max_tokens:
+            tier = 1
+        else:
+            tier = 2
+        tier = min(max(tier, self.rules.start_tiers.get(operation, 0)), len(self.cascade) - 1)
+        models = self.cascade[tier:]
+        # The strongest model is always kept as the last resort.
+        return [
+            model_name for model_name in models[:-1]
+            if (self.repair_failure_rate(model_name) or 0.0) <= self.rules.max_repair_rate
+        ] + models[-1:]
+
+    def assess(self, parsed, parse_outcome, check=None, confidence=None):
+        """Applies the quality gates to a parsed response. Returns ``(reason, failed, valid)``.
+
+        ``reason`` is None when the response is accepted; ``failed`` says whether
+        the attempt counts toward the model's repair/failure rate; ``valid`` says
+        whether it passed ``check`` and may be used if nothing better turns up.
+        """
+        reason = "unparseable" if parsed is None else (check(parsed) if check else None)
+        valid = reason is None
+        failed = not valid or parse_outcome in ("repaired", "failed")
+        if valid and confidence is not None:
+            reason = confidence(parsed)
+        return reason, failed, valid
+
+    def record(self, operation, model_name, seconds, prompt_tokens, response_text, outcome, failed=False, escalated=False):
+        """Adds one attempt to the route statistics and, if configured, the JSON-lines route log."""
+        output_tokens = estimate_tokens(response_text) if response_text else 0
+        cost = estimated_cost(model_name, prompt_tokens, output_tokens)
+        with self._lock:
+            route = self._routes.setdefault((operation, model_name), {
+                "calls": 0, "escalated": 0, "latency_seconds": 0.0, "cost_usd": 0.0,
+                "input_tokens": 0, "output_tokens": 0, "outcomes": Counter(),
+            })
+            route["calls"] += 1
+            route["escalated"] += escalated
+            route["latency_seconds"] += seconds
+            route["cost_usd"] += cost
+            route["input_tokens"] += prompt_tokens
+            route["output_tokens"] += output_tokens
+            route["outcomes"][outcome] += 1
+            if outcome != "error":
+                history = self._outcomes.setdefault(model_name, deque(maxlen=self.rules.window))
+                history.append((time.monotonic(), failed))
+        if self.log_path:
+            entry = {
+                "time": time.time(), "operation": operation, "model": model_name, "outcome": outcome,
+                "escalated": escalated, "latency_seconds": round(seconds, 4), "input_tokens": prompt_tokens,
+                "output_tokens": output_tokens, "cost_usd": cost,
+            }
+            try:
+                with open(self.log_path, "a") as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError as e:
+                print(f"Warning: could not write the route log: {e}")
+
+    def call(self, operation, prompt, parse=None, check=None, confidence=None, generation_config=None, models=None):
+        """Runs a request through the cascade and returns ``(value, model_name)``.
+
+        ``parse(text)`` returns ``(value, parse_outcome)`` (plain text is used as is
+        when omitted). ``check(value)`` (schema validation) and ``confidence(value)``
+        (heuristics) return None when the value is acceptable or a short reason to
+        escalate. If only the confidence gate fails on every model, the last value
+        that passed ``check`` is returned. If no value passed ``check``, the last
+        error is raised when every model raised, and NoAcceptableResponseError
+        otherwise; invalid values are never returned.
+        """
+        prompt_tokens = estimate_tokens(prompt)
+        models = models or self.plan(operation, prompt_tokens)
+        value, chosen, last_error, last_reason = None, models[-1], None, None
+        with span(f"route.{operation}", planned=",".join(models)) as route_span:
+            for position, model_name in enumerate(models):
+                final = position == len(models) - 1
+                started = time.perf_counter()
+                try:
+                    text = llm_client.generate(prompt, model_name=model_name, generation_config=generation_config, operation=operation)
+                except Exception as e:
+                    last_error = e
+                    self.record(operation, model_name, time.perf_counter() - started, prompt_tokens, "", "error", escalated=not final)
+                    continue
+                parsed, parse_outcome = parse(text) if parse else (text, "fast")
+                reason, failed, valid = self.assess(parsed, parse_outcome, check, confidence)
+                self.record(
+                    operation, model_name, time.perf_counter() - started, prompt_tokens, text, reason or "ok",
+                    failed=failed, escalated=reason is not None and not final,
+                )
+                last_reason = reason
+                if valid:
+                    value, chosen = parsed, model_name
+                if reason is None:
+                    break
+            route_span.attributes["model"] = chosen if value is not None else ""
+        if value is None:
+            if last_reason is None and last_error is not None:
+                raise last_error
+            raise NoAcceptableResponseError(
+                f"no model returned an acceptable {operation} response (last: {last_reason or last_error})"
+            )
+        return value, chosen
+
+    def cache_tag(self):
+        """Identifies the models that may answer, for cache keys: the cascade, or BRIEFLY_MODEL when routing is off."""
+        if not self.enabled or not self.cascade:
+            return llm_client.get_settings().model_name
+        return "route:" + ",".join(self.cascade)
+
+    def stats(self):
+        """Per-route totals: ``{(operation, model): {calls, escalated, latency_seconds, cost_usd, ...}}``."""
+        with self._lock:
+            return {key: dict(route, outcomes=dict(route["outcomes"])) for key, route in self._routes.items()}
+
+
+_default_router = None
+_default_router_lock = threading.Lock()
+
+
+def get_router():
+    """Returns the process-wide router, creating it on first use."""
+    global _default_router
+    with _default_router_lock:
+        if _default_router is None:
+            _default_router = ModelRouter(rules=RoutingRules.from_file(RULES_PATH) if RULES_PATH else None)
+        return _default_router
+
+
+def set_router(router):
+    """Replaces the process-wide router, e.g. with different rules in tests or simulations."""
+    global _default_router
+    with _default_router_lock:
+        _default_router = router
+
+
+def model_cache_tag():
+    """Model part of analysis cache keys for the process-wide router."""
+    return get_router().cache_tag()
+
+
+def route_stats():
+    """Per-route statistics, or an empty dict if nothing has been routed in this process."""
+    return _default_router.stats() if _default_router is not None else {}
+
+
+# --- Simulation ---
+def format_route_table(stats):
+    lines = [f"{'operation':<14} {'model':<22} {'calls':>5} {'escal.':>6} {'avg s':>7} {'cost $':>9}  outcomes"]
+    for (operation, model_name), route in sorted(stats.items()):
+        outcomes = ", ".join(f"{name}={count}" for name, count in sorted(route["outcomes"].items()))
+        lines.append(
+            f"{operation:<14} {model_name:<22} {route['calls']:>5} {route['escalated']:>6} "
+            f"{route['latency_seconds'] / route['calls']:>7.3f} {route['cost_usd']:>9.5f}  {outcomes}"
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    # Run as a script this module is __main__; the pipeline routes through the
+    # imported model_router module, so the router must be installed there.
+    import model_router as router_module
+    from ai_analysis import load_analysis
+    from batch_analysis import collect_brief_paths
+    from text_extraction import extract_text
+
+    parser = argparse.ArgumentParser(
+        description="Replay briefs through the router on the fake backend and report per-route latency and cost."
+    )
+    parser.add_argument("inputs", nargs="+", help="Brief files or directories containing briefs.")
+    parser.add_argument("--failure-rates", default="gemini-1.5-flash-8b=0.3,gemini-1.5-flash=0.05",
+                        help="Fake truncated-response rate per model, e.g. 'model=0.3,other=0.05'.")
+    parser.add_argument("--latency", type=float, default=0.0, help="Simulated seconds per fake call.")
+    parser.add_argument("--rules", help="JSON file overriding routing rules.")
+    args = parser.parse_args(argv)
+
+    llm_client.set_backend(llm_client.FakeBackend(
+        latency=args.latency, failure_rates=llm_client.parse_failure_rates(args.failure_rates)
+    ))
+    router_module.set_router(router_module.ModelRouter(
+        rules=router_module.RoutingRules.from_file(args.rules) if args.rules else None, enabled=True
+    ))
+    for path in collect_brief_paths(args.inputs):
+        try:
+            with open(path, "rb") as f:
+                text = extract_text(f.read(), path)
+        except Exception as e:
+            print(f"Warning: skipping {path}: {e}")
+            continue
+        load_analysis(text, use_cache=False)
+    print(format_route_table(router_module.route_stats()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
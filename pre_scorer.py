@@ -0,0 +1,565 @@
+import argparse
+import os
+import re
+import threading
+
+from ai_analysis import CATEGORY_FIELDS, request_category_analysis
+from instrumentation import timed
+from section_analysis import assign_categories, join_sections, split_sections
+from sentiment_analysis import split_sentences
+from text_normalization import estimate_tokens
+
+# --- Routing Settings ---
+# "on" lets the pre-score skip or shorten the Gemini call; "off" always runs the full analysis.
+# Off by default until the thresholds below are calibrated against model scores.
+PRESCORE_MODE = os.environ.get("BRIEFLY_PRESCORE", "off").lower()
+# Briefs shorter than this are reported locally instead of being sent to Gemini.
+MIN_WORDS = 60
+# A brief with at most this many evidenced categories and a provisional overall
+# score below FAIL_SCORE obviously fails; it is scored locally.
+FAIL_MAX_CATEGORIES = 1
+FAIL_SCORE = 30
+# Categories at or above this provisional score are not sent back to Gemini.
+CONFIDENT_SCORE = 75
+# A shortened call is only worth it when its excerpts are this much smaller than the brief.
+SHORTEN_MAX_RATIO = 0.6
+
+HEADING_POINTS = 20
+NO_EVIDENCE_SCORE = 10
+MAX_PROVISIONAL_SCORE = 95
+MAX_ITEMS = 8
+
+_WORD = re.compile(r"[A-Za-z][A-Za-z'’-]*|\d+")
+
+
+# --- Keyword Index ---
+# kind -> canonical name -> phrases. Every phrase is compiled into one dict keyed
+# by word tuples, so a single pass over each sentence's words finds all kinds.
+KEYWORDS = {
+    "channel": {
+        "Social media": ["social media", "social"],
+        "Instagram": ["instagram", "insta", "reels"],
+        "TikTok": ["tiktok", "tik tok"],
+        "Facebook": ["facebook", "meta ads"],
+        "YouTube": ["youtube"],
+        "LinkedIn": ["linkedin"],
+        "X (Twitter)": ["twitter", "tweets"],
+        "Snapchat": ["snapchat"],
+        "Pinterest": ["pinterest"],
+        "Email": ["email", "e mail", "emails", "newsletter", "newsletters", "crm"],
+        "Search": ["seo", "sem", "ppc", "paid search", "google ads", "search ads"],
+        "Display": ["display", "programmatic", "banner", "banners"],
+        "TV": ["tv", "television", "ctv", "connected tv", "broadcast"],
+        "Radio": ["radio"],
+        "Podcasts": ["podcast", "podcasts"],
+        "Out-of-home": ["ooh", "dooh", "out of home", "billboard", "billboards", "poster", "posters"],
+        "Print": ["print", "magazine", "magazines", "newspaper", "newspapers"],
+        "Influencers": ["influencer", "influencers", "creators", "ambassadors"],
+        "Affiliates": ["affiliate", "affiliates", "partnerships"],
+        "PR": ["pr", "public relations", "press release", "press releases"],
+        "Events": ["event", "events", "experiential", "sponsorship", "sponsorships", "pop up", "pop ups"],
+        "In-store": ["in store", "instore", "retail", "point of sale"],
+        "Website": ["website", "landing page", "landing pages", "microsite"],
+    },
+    "kpi": {
+        "Click-through rate": ["ctr", "click through rate", "click through rates", "clicks"],
+        "Conversion rate": ["conversion", "conversions", "conversion rate", "conversion rates", "cvr"],
+        "Cost per acquisition": ["cpa", "cac", "cost per acquisition", "cost per action", "cost per lead"],
+        "Cost per click": ["cpc", "cost per click"],
+        "CPM": ["cpm"],
+        "Return on ad spend": ["roas", "return on ad spend"],
+        "ROI": ["roi", "return on investment"],
+        "Impressions": ["impressions"],
+        "Reach": ["reach"],
+        "Engagement": ["engagement", "engagement rate", "likes", "shares", "comments"],
+        "Sign-ups": ["sign ups", "signups", "registrations", "subscribers"],
+        "Leads": ["leads", "mql", "mqls", "sql", "sqls"],
+        "Sales": ["sales", "orders", "purchases"],
+        "Revenue": ["revenue", "turnover"],
+        "Website traffic": ["traffic", "visits", "sessions", "page views", "pageviews"],
+        "Downloads": ["downloads", "installs"],
+        "Brand awareness": ["awareness", "brand lift", "recall"],
+        "NPS": ["nps", "net promoter score", "customer satisfaction", "csat"],
+        "Retention": ["retention", "churn", "repeat purchase", "repeat purchases"],
+        "Followers": ["followers"],
+        "Views": ["views", "video views", "view through rate", "vtr"],
+        "Market share": ["market share"],
+    },
+    "objective": {"objective": [
+        "increase", "grow", "boost", "drive", "achieve", "reach", "launch", "improve", "reduce", "generate",
+        "acquire", "double", "triple", "win", "convert", "establish", "position", "raise", "build", "goal",
+        "goals", "objective", "objectives", "aim", "aims", "target",
+    ]},
+    "business": {"business": [
+        "business goal", "business goals", "business objective", "business objectives", "business strategy",
+        "company goals", "company strategy", "company mission", "market share", "revenue", "profit", "profitability",
+        "growth strategy", "long term", "mission", "vision", "strategic", "commercial",
+    ]},
+    "brand": {"brand": [
+        "brand strategy", "brand positioning", "brand purpose", "brand values", "brand platform", "brand promise",
+        "positioning", "proposition", "tone of voice",
+    ]},
+    "segment": {"segment": [
+        "men", "women", "male", "female", "mums", "moms", "dads", "parents", "families", "students", "professionals",
+        "gen z", "gen x", "gen y", "generation z", "millennials", "boomers", "retirees", "b2b", "b2c", "sme", "smes",
+        "decision makers", "homeowners", "graduates", "teens", "teenagers", "young adults",
+    ]},
+    "location": {"location": [
+        "uk", "us", "usa", "eu", "europe", "european", "nationwide", "national", "global", "globally", "urban",
+        "rural", "city", "cities", "regional", "local", "london", "north america", "apac", "emea",
+    ]},
+    "interest": {"interest": [
+        "interested in", "interest", "interests", "passionate about", "who love", "who enjoy", "who like",
+        "who want", "who need", "who use", "who run", "who buy", "lifestyle", "behaviour", "behaviours", "behavior",
+        "behaviors", "habits", "income", "affluent", "persona", "personas", "motivation", "motivations",
+        "pain point", "pain points",
+    ]},
+    "audience": {"audience": [
+        "audience", "audiences", "target audience", "targeting", "customer", "customers", "consumer", "consumers",
+        "persona", "personas", "users", "shoppers",
+    ]},
+    "competitor": {"competitor": [
+        "competitor", "competitors", "competition", "competing", "rival", "rivals", "vs", "versus", "compared to",
+        "compared with", "market leader", "market leaders",
+    ]},
+    "advantage": {"advantage": [
+        "unique", "only", "unlike", "better than", "cheaper", "faster", "differentiate", "differentiator",
+        "differentiation", "advantage", "advantages", "usp", "stand out", "first to", "leading", "award winning",
+        "greener", "premium",
+    ]},
+    "justification": {"justification": [
+        "because", "to reach", "to drive", "so that", "where our", "where the", "since", "due to", "as our audience",
+    ]},
+}
+# Channels whose usual KPI is suggested when the brief names the channel but not the KPI.
+CHANNEL_KPIS = {
+    "Search": "Click-through rate", "Display": "CPM", "Email": "Conversion rate", "Instagram": "Engagement",
+    "TikTok": "Views", "YouTube": "Views", "Influencers": "Engagement", "Website": "Website traffic",
+    "TV": "Reach", "Out-of-home": "Reach", "In-store": "Sales",
+}
+# Verb-like keywords also match their regular inflections (grows, growing, increased).
+_INFLECTED_KINDS = ("objective",)
+MAX_PHRASE_WORDS = 4
+
+
+def _inflections(word):
+    stem = word[:-1] if word.endswith("e") else word
+    return {word, word + "s", stem + "ed", stem + "ing", word + "d" if word.endswith("e") else word + "ed"}
+
+
+def _build_keyword_index():
+    index = {}
+    for kind, names in KEYWORDS.items():
+        for name, phrases in names.items():
+            for phrase in phrases:
+                words = phrase.split()
+                forms = _inflections(words[-1]) if kind in _INFLECTED_KINDS and len(words) == 1 else {words[-1]}
+                # Kinds without canonical names (e.g. segments) report the phrase itself.
+                label = phrase if name == kind else name
+                for form in forms:
+                    index.setdefault(tuple(words[:-1] + [form]), []).append((kind, label))
+    return index
+
+
+_KEYWORD_INDEX = _build_keyword_index()
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+# Structural patterns that a keyword list cannot express.
+_QUANTIFIED = re.compile(r"\d+(?:[.,]\d+)?\s?(?:%|percent\b|[km]\b|million\b|thousand\b|x\b)|[£$€]\s?\d", re.I)
+_TIME_BOUND = re.compile(
+    r"\b(?:by|before|within|until|in|during|over)\s+(?:the\s+)?(?:end of\s+)?(?:q[1-4]|h[12]|20\d\d|"
+    r"jan\w*|feb\w*|mar\w*|apr\w*|may|jun\w*|jul\w*|aug\w*|sep\w*|oct\w*|nov\w*|dec\w*|"
+    r"spring|summer|autumn|fall|winter|\d+\s+(?:days|weeks|months|years)|the next \w+ (?:weeks|months))\b"
+    r"|\b(?:deadline|timeline|fy\s?\d{2,4})\b",
+    re.I,
+)
+_AGE = re.compile(r"\b(?:aged?\s*)?\d{2}\s*(?:-|–|to)\s*\d{2}\b|\b(?:over|under)\s+\d{2}s?\b|\b\d{2}\+", re.I)
+_PROPER_NOUN = re.compile(r"\b[A-Z][\w&'’.-]*(?:\s+(?:&\s+)?[A-Z][\w&'’-]*)*")
+_NUMBER = re.compile(r"\d")
+# How a brief names its own brand or product: "our new Swift range", "Brand: Acme",
+# "the launch of Swift", "Acme sells ...". Possessives ("Acme's") match without the "'s".
+_OUR_NAME = re.compile(r"\b(?:[Oo]ur|[Mm]y)\s+(?:[a-z]+\s+){0,2}([A-Z][\w&-]*)")
+_OWN_NAME = re.compile(
+    r"\b(?:[Bb]rand|[Pp]roduct|[Cc]lient|[Cc]ompany)\s*[:–-]\s*([A-Z][\w&-]*)"
+    r"|\b(?:[Ll]aunch(?:es|ing)?|[Ii]ntroduc(?:e|es|ing))\s+(?:of\s+)?(?:the\s+|our\s+)?(?:new\s+)?([A-Z][\w&-]*)"
+    r"|\b([A-Z][\w&-]*)\s+(?:sells|makes|offers|launches|is launching|is our|wants to|aims to)\b"
+)
+# Capitalized only because they start a sentence; never part of a competitor's name.
+_NON_NAME_WORDS = frozenset("""
+a an the this that these those our we us they them their its it he she his her my your you i
+each every some any all both many most other another such there here which who what when while
+""".split())
+
+
+# --- Signal Extraction ---
+def keyword_hits(sentence):
+    """Returns ``{kind: [canonical names in order of appearance]}`` for one sentence."""
+    words = _TOKEN.findall(sentence.lower())
+    hits = {}
+    for start in range(len(words)):
+        for size in range(1, MAX_PHRASE_WORDS + 1):
+            for kind, name in _KEYWORD_INDEX.get(tuple(words[start:start + size]), ()):
+                names = hits.setdefault(kind, [])
+                if name not in names:
+                    names.append(name)
+    return hits
+
+
+def _unique(values, limit=MAX_ITEMS):
+    seen, result = set(), []
+    for value in values:
+        key = value.lower()
+        if key not in seen:
+            seen.add(key)
+            result.append(value)
+    return result[:limit]
+
+
+def _competitors(sentences, lowercase_words, own_words):
+    """Capitalized names in sentences about competitors.
+
+    A capitalized word that also appears in lower case elsewhere in the brief is
+    an ordinary word at the start of a sentence or heading, not a brand. Leading
+    determiners and pronouns are dropped, and the brand's own names (``own_words``,
+    see ``_own_words``) are not competitors.
+    """
+    names = []
+    for sentence in sentences:
+        for candidate in _PROPER_NOUN.findall(sentence):
+            words = candidate.strip(" .").split()
+            while words and words[0].lower() in _NON_NAME_WORDS:
+                words = words[1:]
+            if not words:
+                continue
+            candidate, first = " ".join(words), words[0]
+            if len(candidate) > 1 and not first.isupper() and first.lower() not in lowercase_words \
+                    and not keyword_hits(first) and not own_words.intersection(word.lower() for word in words):
+                names.append(candidate)
+    return _unique(names)
+
+
+def _own_words(title, sections, sentences, hits):
+    """Lower-cased words the brief uses for its own brand and products.
+
+    Covers the title, headings and names the body introduces as its own. In
+    sentences about competitors only "our <Name>" counts, since "Nike sells ..."
+    there describes a rival.
+    """
+    words = {
+        word.lower() for heading in [title] + [heading for heading, _ in sections if heading]
+        for word in re.findall(r"[\w&'’-]+", heading)
+    }
+    for sentence, found in zip(sentences, hits):
+        patterns = (_OUR_NAME,) if "competitor" in found else (_OUR_NAME, _OWN_NAME)
+        for pattern in patterns:
+            for match in pattern.finditer(sentence):
+                name = next(group for group in match.groups() if group)
+                if name.lower() not in _NON_NAME_WORDS:
+                    words.add(name.lower())
+    return words
+
+
+def _clip(sentence, width=160):
+    sentence = " ".join(sentence.split())
+    return sentence if len(sentence) <= width else sentence[:width - 1].rstrip() + "…"
+
+
+def extract_signals(text, sections, assignment):
+    """Runs the keyword index and patterns over the brief once. Returns ``{category: {signal: [evidence]}}``.
+
+    ``sections`` and ``assignment`` come from section_analysis; sentences under a
+    category's heading count as evidence for it even without a cue word.
+    """
+    in_section = {category: set() for category in assignment}
+    sentences = []
+    for index, (heading, body) in enumerate(sections):
+        for sentence in split_sentences(body):
+            for category, indices in assignment.items():
+                if index in indices:
+                    in_section[category].add(len(sentences))
+            sentences.append(sentence)
+    hits = [keyword_hits(sentence) for sentence in sentences]
+    lowercase_words = set(re.findall(r"\b[a-z][\w'-]*", text))
+    title = next((line for line in text.splitlines() if line.strip()), "")
+    own_words = _own_words(title, sections, sentences, hits)
+
+    def having(kind, category=None):
+        return [
+            sentence for i, (sentence, found) in enumerate(zip(sentences, hits))
+            if kind in found or (category is not None and i in in_section[category])
+        ]
+
+    def names(kind):
+        return _unique([name for found in hits for name in found.get(kind, [])], limit=None)
+
+    objectives = [s for s in having("objective") if _NUMBER.search(s) or len(s.split()) > 4]
+    return {
+        "clarity_of_objectives": {
+            "objectives": [_clip(s) for s in objectives],
+            "quantified": [s for s in objectives if _QUANTIFIED.search(s)],
+            "time_bound": [s for s in objectives if _TIME_BOUND.search(s)],
+        },
+        "strategic_alignment": {
+            "business_goals": having("business"),
+            "brand": having("brand"),
+        },
+        "target_audience_definition": {
+            "age": [match.group(0) for match in _AGE.finditer(text)],
+            "segments": names("segment"),
+            "location": names("location"),
+            "interests": having("interest"),
+            "examples": [_clip(s) for s in having("audience", "target_audience_definition")],
+        },
+        "competitive_analysis": {
+            "mentions": having("competitor", "competitive_analysis"),
+            "competitors": _competitors(having("competitor", "competitive_analysis"), lowercase_words, own_words),
+            "advantages": [_clip(s) for s in having("advantage")],
+        },
+        "channel_strategy": {
+            "channels": names("channel"),
+            "justified": [_clip(s) for s, found in zip(sentences, hits) if "channel" in found and "justification" in found],
+        },
+        "key_performance_indicators": {
+            "kpis": names("kpi"),
+            "targets": [_clip(s) for s in having("kpi") if _NUMBER.search(s)],
+        },
+    }
+
+
+# --- Provisional Scores ---
+# Each rule is (signal, points, minimum evidence count, label, gap when missing or None).
+SCORING_RULES = {
+    "clarity_of_objectives": [
+        ("objectives", 30, 1, "stated objectives", "No clear campaign objectives are stated."),
+        ("quantified", 20, 1, "measurable targets", "Objectives have no measurable targets."),
+        ("time_bound", 15, 1, "deadlines", "Objectives have no deadline or timeframe."),
+        ("objectives", 10, 2, "several objectives", None),
+    ],
+    "strategic_alignment": [
+        ("business_goals", 35, 1, "links to business goals", "The brief does not say how the campaign supports business goals."),
+        ("brand", 20, 1, "brand positioning", None),
+        ("business_goals", 10, 3, "detailed business context", None),
+    ],
+    "target_audience_definition": [
+        ("examples", 15, 1, "an audience description", "No target audience is described."),
+        ("age", 15, 1, "age ranges", "The audience has no age range."),
+        ("segments", 15, 1, "audience segments", None),
+        ("location", 10, 1, "locations", "The audience has no location."),
+        ("interests", 15, 1, "interests or behaviours", "The audience's interests and behaviours are not described."),
+    ],
+    "competitive_analysis": [
+        ("mentions", 20, 1, "a competitive context", "The competitive landscape is not discussed."),
+        ("competitors", 25, 1, "named competitors", "No competitors are named."),
+        ("advantages", 20, 1, "competitive advantages", "No competitive advantage is stated."),
+        ("competitors", 10, 2, "several competitors", None),
+    ],
+    "channel_strategy": [
+        ("channels", 30, 1, "named channels", "No marketing channels are specified."),
+        ("channels", 15, 3, "a channel mix", None),
+        ("justified", 20, 1, "channel rationale", "Channel choices are not justified."),
+    ],
+    "key_performance_indicators": [
+        ("kpis", 30, 1, "named KPIs", "No KPIs are defined."),
+        ("targets", 25, 1, "KPI targets", "KPIs have no numeric targets."),
+        ("kpis", 10, 3, "several KPIs", None),
+    ],
+}
+
+
+def _category_details(category, signals, has_heading):
+    found, missing, gaps = [], [], []
+    points = HEADING_POINTS if has_heading else 0
+    for signal, signal_points, minimum, label, gap in SCORING_RULES[category]:
+        if len(signals[signal]) >= minimum:
+            points += signal_points
+            found.append(label)
+        else:
+            missing.append(label)
+            if gap:
+                gaps.append(gap)
+    score = min(MAX_PROVISIONAL_SCORE, points) if found else NO_EVIDENCE_SCORE
+    feedback = f"Found {', '.join(found)}." if found else "Nothing in the brief addresses this yet."
+    if missing:
+        feedback += f" Not found: {', '.join(missing)}."
+    return score, feedback, gaps
+
+
+def _extracted_fields(category, signals):
+    if category == "clarity_of_objectives":
+        keywords = [word for word in _WORD.findall(" ".join(signals["objectives"])) if len(word) > 6]
+        return {"extracted_objectives": signals["objectives"][:MAX_ITEMS], "keywords": _unique(keywords)}
+    if category == "strategic_alignment":
+        return {"alignment_issues": []}
+    if category == "target_audience_definition":
+        demographics = signals["age"] + signals["segments"] + signals["location"]
+        return {"extracted_demographics": _unique(demographics), "target_audience_examples": signals["examples"][:3]}
+    if category == "competitive_analysis":
+        return {"competitors_mentioned": signals["competitors"], "competitive_advantages": signals["advantages"][:3]}
+    if category == "channel_strategy":
+        return {"recommended_channels": signals["channels"], "channel_justifications": []}
+    return {"extracted_kpis": signals["kpis"], "kpi_suggestions": []}
+
+
+class PreScore:
+    """Local, provisional analysis of a brief and the routing decision derived from it.
+
+    ``response_data`` has the same shape as a Gemini analysis. ``decision`` is
+    ``"skip"`` (score locally), ``"shorten"`` (only ``llm_categories`` go to
+    Gemini) or ``"full"``.
+    """
+
+    def __init__(self, response_data, confident, word_count, decision, reason, llm_categories):
+        self.response_data = response_data
+        self.confident = confident
+        self.word_count = word_count
+        self.decision = decision
+        self.reason = reason
+        self.llm_categories = llm_categories
+
+    @property
+    def overall_score(self):
+        return self.response_data["overall_score"]
+
+
+def _category_excerpts(text, categories):
+    """The text each category depends on, as section_analysis.BriefScoreState assigns it."""
+    sections = split_sections(text)
+    assignment = assign_categories(sections)
+    return {
+        category: "\n\n".join(join_sections([sections[i]]) for i in assignment[category]) or text
+        for category in categories
+    }
+
+
+@timed("prescore")
+def pre_score(text):
+    """Scores a brief locally with the precompiled indexes in a few milliseconds and decides how to route it."""
+    sections = split_sections(text)
+    assignment = assign_categories(sections)
+    signals = extract_signals(text, sections, assignment)
+
+    breakdown, gaps = {}, []
+    for category in CATEGORY_FIELDS:
+        score, feedback, category_gaps = _category_details(category, signals[category], bool(assignment[category]))
+        breakdown[category] = {"score": score, "feedback": feedback}
+        breakdown[category].update(_extracted_fields(category, signals[category]))
+        gaps.extend(category_gaps)
+
+    # Suggest the usual KPI for each named channel that has none yet.
+    kpi_details = breakdown["key_performance_indicators"]
+    kpi_details["kpi_suggestions"] = _unique(
+        CHANNEL_KPIS[channel] for channel in signals["channel_strategy"]["channels"]
+        if channel in CHANNEL_KPIS and CHANNEL_KPIS[channel] not in kpi_details["extracted_kpis"]
+    )
+
+    overall_score = round(sum(details["score"] for details in breakdown.values()) / len(breakdown))
+    response_data = {"overall_score": overall_score, "breakdown": breakdown, "gap_analysis": gaps}
+    confident = [category for category, details in breakdown.items() if details["score"] >= CONFIDENT_SCORE]
+    evidenced = [category for category, details in breakdown.items() if details["score"] > NO_EVIDENCE_SCORE]
+    uncertain = [category for category in CATEGORY_FIELDS if category not in confident]
+    word_count = len(_WORD.findall(text))
+
+    if word_count < MIN_WORDS:
+        decision, reason = "skip", f"the brief has only {word_count} words"
+    elif len(evidenced) <= FAIL_MAX_CATEGORIES and overall_score < FAIL_SCORE:
+        decision, reason = "skip", f"only {len(evidenced)} of {len(breakdown)} categories are addressed"
+    elif not uncertain:
+        decision, reason = "skip", "every category is already well covered"
+    elif confident:
+        excerpts = _category_excerpts(text, uncertain)
+        if sum(estimate_tokens(excerpt) for excerpt in excerpts.values()) <= SHORTEN_MAX_RATIO * estimate_tokens(text):
+            decision, reason = "shorten", f"{len(confident)} categories are already well covered"
+        else:
+            decision, reason = "full", "the remaining categories depend on most of the brief"
+    else:
+        decision, reason = "full", "no category is covered well enough to score locally"
+    llm_categories = {"skip": [], "shorten": uncertain, "full": list(CATEGORY_FIELDS)}[decision]
+    return PreScore(response_data, confident, word_count, decision, reason, llm_categories)
+
+
+# --- Routing ---
+_route_stats = {"full": 0, "shorten": 0, "skip": 0}
+_route_stats_lock = threading.Lock()
+
+
+def _count_route(decision):
+    with _route_stats_lock:
+        _route_stats[decision] += 1
+
+
+def route_stats():
+    """Counts of analyses by pre-score decision: full Gemini call, shortened call, or skipped."""
+    with _route_stats_lock:
+        return dict(_route_stats)
+
+
+def _annotated(response_data, result, llm_categories):
+    return dict(response_data, pre_score={
+        "decision": result.decision, "reason": result.reason, "llm_categories": llm_categories,
+    })
+
+
+def route_analysis(text, result=None):
+    """Answers an analysis from the pre-score when it can.
+
+    Returns a response in the usual schema when the brief was skipped or the
+    shortened call succeeded, annotated with a ``pre_score`` entry; returns None
+    when the caller should run the full Gemini analysis. ``result`` reuses a
+    pre_score the caller already computed.
+    """
+    if PRESCORE_MODE == "off":
+        return None
+    result = result or pre_score(text)
+    if result.decision == "skip":
+        _count_route("skip")
+        return _annotated(result.response_data, result, [])
+    if result.decision == "full":
+        _count_route("full")
+        return None
+
+    excerpts = _category_excerpts(text, result.llm_categories)
+    breakdown = request_category_analysis(excerpts)
+    scored = {}
+    for category in result.llm_categories:
+        details = (breakdown or {}).get(category)
+        try:
+            scored[category] = dict(details, score=int(details["score"]))
+        except (TypeError, KeyError, ValueError):
+            # Any missing category falls back to the full analysis rather than mixing sources further.
+            _count_route("full")
+            return None
+
+    _count_route("shorten")
+    merged = {category: scored.get(category, details) for category, details in result.response_data["breakdown"].items()}
+    response_data = {
+        "overall_score": round(sum(details["score"] for details in merged.values()) / len(merged)),
+        "breakdown": merged,
+        "gap_analysis": result.response_data["gap_analysis"],
+    }
+    return _annotated(response_data, result, result.llm_categories)
+
+
+# --- CLI ---
+def main(argv=None):
+    import time
+
+    from text_extraction import extract_text
+
+    parser = argparse.ArgumentParser(description="Score briefs locally with the rule-based pre-scorer.")
+    parser.add_argument("inputs", nargs="+", help="DOCX/PDF briefs.")
+    args = parser.parse_args(argv)
+
+    for path in args.inputs:
+        with open(path, "rb") as f:
+            text = extract_text(f.read(), path)
+        started = time.perf_counter()
+        result = pre_score(text)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"{path}: provisional {result.overall_score}/100 in {elapsed:.1f} ms, {result.decision} ({result.reason})")
+        for category, details in result.response_data["breakdown"].items():
+            print(f"  {category:<28} {details['score']:>3}  {details['feedback']}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
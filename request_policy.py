@@ -0,0 +1,250 @@
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+# Exception class names treated as transient, so the google.api_core types do not need importing here.
+TRANSIENT_ERROR_NAMES = {
+    "DeadlineExceeded",
+    "ServiceUnavailable",
+    "TooManyRequests",
+    "ResourceExhausted",
+    "InternalServerError",
+    "GatewayTimeout",
+    "Aborted",
+}
+HISTOGRAM_WINDOW = 2048
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when a call does not finish within its policy deadline."""
+
+
+def is_transient(error):
+    """Returns True for errors worth retrying: timeouts, connection errors and 5xx/429 API errors."""
+    if isinstance(error, DeadlineExceededError):
+        return False
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+    return type(error).__name__ in TRANSIENT_ERROR_NAMES
+
+
+class RequestPolicy:
+    """Deadline, retry and hedging settings for one kind of call.
+
+    ``deadline`` bounds the whole call including retries. Transient errors are
+    retried up to ``max_attempts`` times with exponential backoff and full
+    jitter. When ``hedge_percentile`` is set and the operation has at least
+    ``hedge_min_samples`` recorded latencies, a duplicate request is sent once the
+    first has been running longer than that percentile; whichever finishes first wins.
+    """
+
+    def __init__(
+        self,
+        deadline=90.0,
+        max_attempts=3,
+        base_delay=0.5,
+        max_delay=8.0,
+        hedge_percentile=None,
+        hedge_min_samples=20,
+    ):
+        self.deadline = deadline
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+
+    def backoff(self, attempt):
+        """Full-jitter delay before retry number ``attempt`` (0-based)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+# --- Latency Metrics ---
+class LatencyHistogram:
+    """Rolling window of call latencies with success, error, retry and hedge counters."""
+
+    def __init__(self, window=HISTOGRAM_WINDOW):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.count = 0
+        self.errors = 0
+        self.retries = 0
+        self.hedges = 0
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+            self.count += 1
+
+    def increment(self, name):
+        """Adds one to the ``errors``, ``retries`` or ``hedges`` counter."""
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def percentile(self, p):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        index = min(len(samples) - 1, max(0, int(round(p / 100.0 * len(samples))) - 1))
+        return samples[index]
+
+    def __len__(self):
+        return len(self._samples)
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "retries": self.retries,
+            "hedges": self.hedges,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+        }
+
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def get_histogram(operation):
+    with _histograms_lock:
+        histogram = _histograms.get(operation)
+        if histogram is None:
+            histogram = _histograms[operation] = LatencyHistogram()
+        return histogram
+
+
+def latency_summary():
+    """Returns p50/p95/p99 latency (seconds) and counters for every operation seen so far."""
+    with _histograms_lock:
+        operations = list(_histograms.items())
+    return {operation: histogram.summary() for operation, histogram in operations}
+
+
+# --- Execution ---
+CALL_WORKERS = 32
+# Hedged duplicates get their own threads so they never queue behind the calls they
+# are meant to speed up; when every hedge thread is busy the call is not hedged.
+HEDGE_WORKERS = 8
+_executor = ThreadPoolExecutor(max_workers=CALL_WORKERS, thread_name_prefix="llm-call")
+_hedge_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS, thread_name_prefix="llm-hedge")
+_hedge_slots = threading.BoundedSemaphore(HEDGE_WORKERS)
+
+
+def _timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - started
+
+
+def _submit_hedge(fn):
+    """Starts a duplicate of ``fn`` on a hedge thread, or returns None when none is free."""
+    if not _hedge_slots.acquire(blocking=False):
+        return None
+    future = _hedge_executor.submit(_timed, fn)
+    future.add_done_callback(lambda _: _hedge_slots.release())
+    return future
+
+
+def _run_attempt(histogram, fn, timeout, policy):
+    """Runs one attempt, hedging it if the policy allows. Returns the first successful result."""
+    futures = {_executor.submit(_timed, fn)}
+    hedge_after = None
+    if policy.hedge_percentile is not None and len(histogram) >= policy.hedge_min_samples:
+        hedge_after = histogram.percentile(policy.hedge_percentile)
+
+    started = time.monotonic()
+    last_error = None
+    while futures:
+        remaining = timeout - (time.monotonic() - started)
+        if remaining <= 0:
+            break
+        wait_for = remaining
+        if hedge_after is not None:
+            wait_for = min(remaining, max(0.0, hedge_after - (time.monotonic() - started)))
+
+        done, futures = wait(futures, timeout=wait_for, return_when=FIRST_COMPLETED)
+        for future in done:
+            try:
+                result, seconds = future.result()
+            except Exception as e:
+                last_error = e
+                continue
+            histogram.record(seconds)
+            return result
+
+        if hedge_after is not None and not done and futures:
+            # The first request is slower than usual; race a duplicate against it.
+            hedge = _submit_hedge(fn)
+            if hedge is not None:
+                histogram.increment("hedges")
+                futures.add(hedge)
+            hedge_after = None
+
+    if last_error is not None and not futures:
+        raise last_error
+    raise DeadlineExceededError(f"call did not finish within {timeout:.1f}s")
+
+
+def stream_with_policy(operation, stream_fn, policy=None):
+    """Yields the chunks of ``stream_fn(timeout)`` under ``policy``, recording the time to the last chunk.
+
+    Transient errors before the first chunk are retried with backoff, since
+    nothing has been consumed yet; later errors are raised, as the stream cannot
+    be replayed. The deadline bounds the whole stream: each attempt's timeout is
+    capped to the time left, and it is checked again between chunks.
+    """
+    policy = policy or RequestPolicy()
+    histogram = get_histogram(operation)
+    started = time.perf_counter()
+    deadline_at = time.monotonic() + policy.deadline
+
+    for attempt in range(policy.max_attempts):
+        yielded = False
+        try:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                raise DeadlineExceededError(f"{operation} did not finish within {policy.deadline:.1f}s")
+            for chunk in stream_fn(remaining):
+                if time.monotonic() > deadline_at:
+                    raise DeadlineExceededError(f"{operation} did not finish within {policy.deadline:.1f}s")
+                yielded = True
+                yield chunk
+            histogram.record(time.perf_counter() - started)
+            return
+        except Exception as e:
+            delay = policy.backoff(attempt)
+            last_attempt = attempt == policy.max_attempts - 1
+            if yielded or not is_transient(e) or last_attempt or time.monotonic() + delay >= deadline_at:
+                histogram.increment("errors")
+                raise
+            histogram.increment("retries")
+            print(f"Warning: {operation} failed before its first chunk ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def call_with_policy(operation, fn, policy=None):
+    """Calls ``fn()`` under ``policy``, recording its latency under ``operation``."""
+    policy = policy or RequestPolicy()
+    histogram = get_histogram(operation)
+    deadline_at = time.monotonic() + policy.deadline
+
+    for attempt in range(policy.max_attempts):
+        remaining = deadline_at - time.monotonic()
+        try:
+            if remaining <= 0:
+                raise DeadlineExceededError(f"{operation} did not finish within {policy.deadline:.1f}s")
+            return _run_attempt(histogram, fn, remaining, policy)
+        except Exception as e:
+            delay = policy.backoff(attempt)
+            last_attempt = attempt == policy.max_attempts - 1
+            if not is_transient(e) or last_attempt or time.monotonic() + delay >= deadline_at:
+                histogram.increment("errors")
+                raise
+            histogram.increment("retries")
+            print(f"Warning: {operation} failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
@@ -0,0 +1,246 @@
+# pandas is imported inside the functions that build frames, to keep it off the app's import path.
+
+# Response field -> DataFrame column used by ai_analysis.build_results.
+FIELD_COLUMNS = {
+    'extracted_objectives': 'Extracted Objectives',
+    'keywords': 'Keywords',
+    'alignment_issues': 'Alignment Issues',
+    'extracted_demographics': 'Extracted Demographics',
+    'target_audience_examples': 'Target Audience Examples',
+    'competitors_mentioned': 'Competitors Mentioned',
+    'competitive_advantages': 'Competitive Advantages',
+    'recommended_channels': 'Recommended Channels',
+    'channel_justifications': 'Channel Justifications',
+    'extracted_kpis': 'Extracted KPIs',
+    'kpi_suggestions': 'KPI Suggestions',
+    'target_locations': 'Target Locations',
+}
+SCALAR_FIELDS = ('score', 'feedback')
+LONG_COLUMNS = ['brief_id', 'category', 'field', 'value']
+
+
+def category_title(category):
+    return category.replace('_', ' ').title()
+
+
+def category_key(title):
+    return title.lower().replace(' ', '_')
+
+
+class CategoryResult:
+    """Score, feedback and non-empty extracted lists for one breakdown category."""
+
+    __slots__ = ('category', 'score', 'feedback', 'items')
+
+    def __init__(self, category, score, feedback, items):
+        self.category = category
+        self.score = score
+        self.feedback = feedback
+        self.items = items
+
+    @classmethod
+    def from_details(cls, category, details):
+        items = {
+            field: tuple(details[field])
+            for field in FIELD_COLUMNS
+            if isinstance(details.get(field), list) and details[field]
+        }
+        return cls(category, int(details['score']), details.get('feedback', ''), items)
+
+
+class BriefAnalysis:
+    """Compact, typed form of one analysis response."""
+
+    __slots__ = ('brief_id', 'overall_score', 'categories', 'gap_analysis')
+
+    def __init__(self, brief_id, overall_score, categories, gap_analysis):
+        self.brief_id = brief_id
+        self.overall_score = overall_score
+        self.categories = categories
+        self.gap_analysis = gap_analysis
+
+    @classmethod
+    def from_response(cls, brief_id, response_data):
+        categories = tuple(
+            CategoryResult.from_details(category, details)
+            for category, details in response_data['breakdown'].items()
+        )
+        return cls(brief_id, int(response_data['overall_score']), categories,
+                   tuple(response_data.get('gap_analysis', [])))
+
+    def long_rows(self):
+        """Yields ``(brief_id, category, field, value)`` rows; list fields give one row per item."""
+        for result in self.categories:
+            yield self.brief_id, result.category, 'score', result.score
+            yield self.brief_id, result.category, 'feedback', result.feedback
+            for field, values in result.items.items():
+                for value in values:
+                    yield self.brief_id, result.category, field, value
+
+
+def _long_frame(columns):
+    import pandas as pd
+
+    df = pd.DataFrame(dict(zip(LONG_COLUMNS, columns)), columns=LONG_COLUMNS)
+    df['category'] = df['category'].astype('category')
+    df['field'] = df['field'].astype('category')
+    return df
+
+
+def to_long_frame(analyses):
+    """Builds one long-format table of ``(brief_id, category, field, value)`` for many analyses."""
+    columns = ([], [], [], [])
+    for analysis in analyses:
+        for row in analysis.long_rows():
+            for column, value in zip(columns, row):
+                column.append(value)
+    return _long_frame(columns)
+
+
+def long_frame_from_results(df_results, brief_id=0):
+    """Converts the wide per-category DataFrame returned by analyze_text to long format."""
+    columns = ([], [], [], [])
+
+    def add(category, field, value):
+        for column, item in zip(columns, (brief_id, category, field, value)):
+            column.append(item)
+
+    present_columns = [(field, column) for field, column in FIELD_COLUMNS.items() if column in df_results.columns]
+    for title, row in zip(df_results.index, df_results.to_dict('records')):
+        category = category_key(title)
+        add(category, 'score', row.get('Score'))
+        add(category, 'feedback', row.get('Feedback'))
+        for field, column in present_columns:
+            for value in row[column] or ():
+                add(category, field, value)
+    return _long_frame(columns)
+
+
+# --- Suggestion Rules ---
+# Each rule is (category, kind, fields, template), applied in order:
+#   joined  - one suggestion with all values of fields[0] joined by ", "
+#   missing - one suggestion when none of the fields have values
+#   each    - one suggestion per value of fields[0]
+#   pairs   - one suggestion per (fields[0], fields[1]) value pair, by position
+SUGGESTION_RULES = [
+    ('clarity_of_objectives', 'joined', ('extracted_objectives',),
+     "Consider refining the following objectives to ensure they are clear, measurable, and ambitious: {values}"),
+    ('clarity_of_objectives', 'missing', ('extracted_objectives',),
+     "Clearly define specific, measurable, achievable, relevant, and time-bound (SMART) objectives for the campaign."),
+    ('clarity_of_objectives', 'joined', ('keywords',),
+     "Ensure these keywords are strategically and consistently incorporated throughout the marketing materials to enhance visibility, searchability, and reach: {values}"),
+
+    ('strategic_alignment', 'joined', ('alignment_issues',),
+     "Carefully review and address the following potential misalignments with overall business goals to ensure the campaign effectively contributes to key strategic priorities: {values}"),
+    ('strategic_alignment', 'missing', ('alignment_issues',),
+     "Clearly articulate how the campaign directly aligns with and supports the company's overall marketing and business objectives. Provide specific examples to demonstrate the connection."),
+
+    ('target_audience_definition', 'joined', ('extracted_demographics',),
+     "Refine targeting by providing more specific information about the desired audience. Consider these extracted demographics: {values}"),
+    ('target_audience_definition', 'joined', ('target_audience_examples',),
+     "While '{values}' provides a starting point, explore and define the target audience more comprehensively. Include demographics, psychographics, behaviors, and needs."),
+    ('target_audience_definition', 'missing', ('extracted_demographics', 'target_audience_examples'),
+     "Define a specific target audience by considering demographics, psychographics, behaviors, and needs. Avoid overly broad descriptions."),
+
+    ('competitive_analysis', 'joined', ('competitors_mentioned',),
+     "Conduct a thorough analysis of these competitors to identify opportunities for differentiation and develop effective competitive strategies: {values}"),
+    ('competitive_analysis', 'missing', ('competitors_mentioned',),
+     "Research and identify key competitors. Analyze their strengths, weaknesses, target audience, and marketing strategies. Use this information to differentiate your offering and highlight its unique value proposition."),
+    ('competitive_analysis', 'joined', ('competitive_advantages',),
+     "Clearly and compellingly highlight these competitive advantages in your messaging and positioning to stand out in the market: {values}"),
+    ('competitive_analysis', 'missing', ('competitive_advantages',),
+     "Identify and clearly articulate your competitive advantages. What makes your product/service stand out from the competition? Highlight these advantages in your messaging."),
+
+    ('channel_strategy', 'joined', ('recommended_channels',),
+     "Evaluate the suitability of these channels for your target audience and campaign objectives: {values}"),
+    ('channel_strategy', 'missing', ('recommended_channels',),
+     "Develop a comprehensive channel strategy that outlines the specific channels to be used (e.g., social media, email, paid advertising, content marketing). Justify the selection of each channel based on its relevance to the target audience and campaign goals."),
+    ('channel_strategy', 'pairs', ('recommended_channels', 'channel_justifications'),
+     " - **{first}:** {second}"),
+
+    ('key_performance_indicators', 'joined', ('extracted_kpis',),
+     "Establish a system for consistently tracking and measuring these KPIs to evaluate campaign performance and make data-driven adjustments: {values}"),
+    ('key_performance_indicators', 'missing', ('extracted_kpis',),
+     "Define specific and measurable KPIs to track the success of your campaign. Consider metrics related to your objectives, such as website traffic, lead generation, sales conversions, brand awareness, or customer satisfaction."),
+    ('key_performance_indicators', 'each', ('kpi_suggestions',),
+     "- Consider tracking {value} to gain additional insights into campaign effectiveness."),
+]
+SUGGESTION_COLUMNS = ['brief_id', 'category', 'rule', 'position', 'suggestion']
+
+
+def rules_for_category(category, values):
+    """Applies SUGGESTION_RULES to one category. ``values`` maps field -> list of values.
+
+    This is the row-at-a-time form of suggest_improvements, used for a single
+    brief where building DataFrames would cost more than the rules themselves.
+    """
+    suggestions = []
+    for rule_category, kind, fields, template in SUGGESTION_RULES:
+        if rule_category != category:
+            continue
+        first = values.get(fields[0]) or []
+        if kind == 'joined' and first:
+            suggestions.append(template.format(values=', '.join(map(str, first))))
+        elif kind == 'missing' and not any(values.get(field) for field in fields):
+            suggestions.append(template)
+        elif kind == 'each':
+            suggestions.extend(template.format(value=value) for value in first)
+        elif kind == 'pairs':
+            second = values.get(fields[1]) or []
+            suggestions.extend(template.format(first=a, second=b) for a, b in zip(first, second))
+    return suggestions
+
+
+def _rule_frame(selected, rule_index, suggestions, positions=None):
+    import pandas as pd
+
+    return pd.DataFrame({
+        'brief_id': selected['brief_id'].to_numpy(),
+        'category': selected['category'].astype(str).to_numpy(),
+        'rule': rule_index,
+        'position': 0 if positions is None else positions.to_numpy(),
+        'suggestion': list(suggestions),
+    }, columns=SUGGESTION_COLUMNS)
+
+
+def suggest_improvements(long_df):
+    """Applies SUGGESTION_RULES to a long-format table covering any number of briefs.
+
+    Every rule is evaluated once across all briefs with column operations, so the
+    cost grows with the number of rules rather than briefs x categories.
+    Returns a DataFrame with columns ``SUGGESTION_COLUMNS`` in display order.
+    """
+    import pandas as pd
+
+    categories = long_df.loc[long_df['field'] == 'score', ['brief_id', 'category']].astype({'category': str})
+    items = long_df[~long_df['field'].isin(SCALAR_FIELDS)].astype({'category': str, 'field': str})
+    items = items.assign(position=items.groupby(['brief_id', 'category', 'field'], sort=False).cumcount())
+    values = items.groupby(['brief_id', 'category', 'field'], sort=False)['value'].agg(list).reset_index()
+
+    frames = []
+    for rule_index, (category, kind, fields, template) in enumerate(SUGGESTION_RULES):
+        if kind == 'joined':
+            selected = values[(values['category'] == category) & (values['field'] == fields[0])]
+            suggestions = selected['value'].map(lambda v, t=template: t.format(values=', '.join(map(str, v))))
+            frames.append(_rule_frame(selected, rule_index, suggestions))
+        elif kind == 'missing':
+            in_category = categories[categories['category'] == category]
+            has_values = values.loc[(values['category'] == category) & values['field'].isin(fields), 'brief_id']
+            selected = in_category[~in_category['brief_id'].isin(has_values)]
+            frames.append(_rule_frame(selected, rule_index, [template] * len(selected)))
+        elif kind == 'each':
+            selected = items[(items['category'] == category) & (items['field'] == fields[0])]
+            suggestions = selected['value'].map(lambda v, t=template: t.format(value=v))
+            frames.append(_rule_frame(selected, rule_index, suggestions, selected['position']))
+        elif kind == 'pairs':
+            first = items[(items['category'] == category) & (items['field'] == fields[0])]
+            second = items[(items['category'] == category) & (items['field'] == fields[1])]
+            selected = second.merge(first, on=['brief_id', 'category', 'position'], suffixes=('', '_first'))
+            suggestions = [template.format(first=a, second=b) for a, b in zip(selected['value_first'], selected['value'])]
+            frames.append(_rule_frame(selected, rule_index, suggestions, selected['position']))
+
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=SUGGESTION_COLUMNS)
+    suggestions = pd.concat(frames, ignore_index=True)
+    return suggestions.sort_values(['brief_id', 'rule', 'position'], kind='stable').reset_index(drop=True)
@@ -0,0 +1,192 @@
+import hashlib
+import re
+
+from ai_analysis import CATEGORY_FIELDS, request_category_analysis
+
+# Heading keywords that tie a section of the brief to the breakdown categories it feeds.
+CATEGORY_KEYWORDS = {
+    "clarity_of_objectives": re.compile(r"objective|goal|aim|purpose|ambition|challenge"),
+    "strategic_alignment": re.compile(r"strateg|background|business|brand|context|overview|positioning"),
+    "target_audience_definition": re.compile(r"audience|target|persona|demographic|customer|consumer"),
+    "competitive_analysis": re.compile(r"competit|market|landscape|rival|differentiat"),
+    "channel_strategy": re.compile(r"channel|media|distribution|touchpoint|platform|placement"),
+    "key_performance_indicators": re.compile(r"kpi|metric|measure|success|performance|evaluation|result"),
+}
+
+_MARKDOWN_HEADING = re.compile(r"^#{1,6}\s+")
+_NUMBERED_HEADING = re.compile(r"^\d+(\.\d+)*[.)]?\s+")
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _heading_title(line):
+    """Returns the heading text if ``line`` looks like a section heading, otherwise None."""
+    stripped = line.strip()
+    if not stripped or len(stripped) > 80:
+        return None
+    if _MARKDOWN_HEADING.match(stripped):
+        return _MARKDOWN_HEADING.sub("", stripped)
+
+    title = _NUMBERED_HEADING.sub("", stripped).rstrip(":").strip()
+    if not title or len(title.split()) > 8:
+        return None
+    if stripped.endswith(":") or (title.isupper() and any(c.isalpha() for c in title)):
+        return title
+    # Short unpunctuated lines only count when they name something we score.
+    lowered = title.lower()
+    if len(title.split()) <= 6 and not title.endswith((".", "!", "?", ",")) and any(
+        pattern.search(lowered) for pattern in CATEGORY_KEYWORDS.values()
+    ):
+        return title
+    return None
+
+
+def split_sections(text):
+    """Splits a brief into ``[heading, body]`` pairs. Text before the first heading gets an empty heading."""
+    sections = [["", []]]
+    for line in text.splitlines():
+        title = _heading_title(line)
+        if title is not None:
+            sections.append([title, []])
+        else:
+            sections[-1][1].append(line)
+
+    result = [[heading, "\n".join(lines).strip()] for heading, lines in sections]
+    return [section for section in result if section[0] or section[1]]
+
+
+def join_sections(sections):
+    parts = []
+    for heading, body in sections:
+        parts.append(f"{heading}\n{body}" if heading else body)
+    return "\n\n".join(part for part in parts if part)
+
+
+def assign_categories(sections):
+    """Maps each category to the indices of the sections whose heading mentions it."""
+    assignment = {category: [] for category in CATEGORY_FIELDS}
+    for index, (heading, _) in enumerate(sections):
+        lowered = heading.lower()
+        for category, pattern in CATEGORY_KEYWORDS.items():
+            if lowered and pattern.search(lowered):
+                assignment[category].append(index)
+    return assignment
+
+
+class BriefScoreState:
+    """Per-category analysis of a brief that can be re-scored incrementally.
+
+    Each category remembers the hash of the text it was scored against: the
+    sections whose headings map to it, or the whole brief when none do. After an
+    edit only categories whose source text changed are sent back to Gemini, and
+    the overall score is recomputed locally from the category scores.
+    """
+
+    def __init__(self, text, response_data):
+        self.base_hash = text_hash(text)
+        self.sections = split_sections(text)
+        self.assignment = assign_categories(self.sections)
+        self.breakdown = {category: dict(details) for category, details in response_data['breakdown'].items()}
+        self.gap_analysis = list(response_data.get('gap_analysis', []))
+        self.overall_score = int(response_data['overall_score'])
+        self.source_hashes = {category: text_hash(source) for category, source in self.category_texts().items()}
+        self.last_rescored = []
+
+    def text(self):
+        return join_sections(self.sections)
+
+    def category_texts(self):
+        full_text = None
+        texts = {}
+        for category, indices in self.assignment.items():
+            if indices:
+                texts[category] = "\n\n".join(join_sections([self.sections[i]]) for i in indices)
+            else:
+                if full_text is None:
+                    full_text = self.text()
+                texts[category] = full_text
+        return texts
+
+    def section_text(self, category):
+        """Returns the body text of the category's own sections, or "" if it has none.
+
+        Scoring still reads the whole brief for such categories (see category_texts),
+        but improvements and the final brief only use a category's own text.
+        """
+        return "\n\n".join(self.sections[i][1] for i in self.assignment.get(category, []))
+
+    def replace_section_text(self, category, new_text):
+        """Replaces the body of the category's sections with ``new_text``.
+
+        The text is written once, into the first section only this category uses;
+        its other exclusive sections are emptied. Sections shared with another
+        category are kept, since that category still depends on them. Categories
+        without an exclusive section get a new section appended under the
+        category title, so the rest of the brief is left untouched.
+        """
+        shared = {i for other, indices in self.assignment.items() if other != category for i in indices}
+        exclusive = [i for i in self.assignment.get(category, []) if i not in shared]
+        if exclusive:
+            self.sections[exclusive[0]][1] = new_text.strip()
+            for i in exclusive[1:]:
+                self.sections[i][1] = ""
+            self.assignment[category] = exclusive[:1]
+        else:
+            self.sections.append([category.replace('_', ' ').title(), new_text.strip()])
+            self.assignment[category] = [len(self.sections) - 1]
+
+    def rebase(self, text):
+        """Swaps in a revised version of the brief, keeping the scores of the previous one.
+
+        Categories whose source text differs in ``text`` become stale, so a
+        following rescore only re-requests what actually changed.
+        """
+        self.base_hash = text_hash(text)
+        self.sections = split_sections(text)
+        self.assignment = assign_categories(self.sections)
+
+    def stale_categories(self):
+        return [
+            category
+            for category, source in self.category_texts().items()
+            if self.source_hashes.get(category) != text_hash(source)
+        ]
+
+    def rescore(self):
+        """Re-requests scores for stale categories only and returns the list that was re-scored."""
+        texts = self.category_texts()
+        stale = [category for category in texts if self.source_hashes.get(category) != text_hash(texts[category])]
+        self.last_rescored = []
+        if not stale:
+            return []
+
+        breakdown = request_category_analysis({category: texts[category] for category in stale})
+        if not breakdown:
+            return []
+
+        for category in stale:
+            details = breakdown.get(category)
+            if not isinstance(details, dict) or 'score' not in details:
+                continue
+            try:
+                details['score'] = int(details['score'])
+            except (TypeError, ValueError):
+                continue
+            self.breakdown[category] = details
+            self.source_hashes[category] = text_hash(texts[category])
+            self.last_rescored.append(category)
+
+        if self.last_rescored:
+            scores = [int(details['score']) for details in self.breakdown.values()]
+            self.overall_score = round(sum(scores) / len(scores))
+        return self.last_rescored
+
+    def to_response_data(self):
+        """Returns the state in the same shape as a full analysis response."""
+        return {
+            "overall_score": self.overall_score,
+            "breakdown": self.breakdown,
+            "gap_analysis": self.gap_analysis,
+        }
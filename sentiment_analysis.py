@@ -1,9 +1,172 @@
-from textblob import TextBlob
+import re
+import threading
 
+from instrumentation import timed
+
+_TOKEN_PATTERN = re.compile(r"[a-z][a-z'\-]*|!")
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+
+_lexicon = None
+_negations = frozenset()
+_lexicon_lock = threading.Lock()
+
+
+def _load_lexicon():
+    """Precompiles TextBlob's pattern lexicon into ``word -> (polarity, subjectivity, intensity, is_modifier)``."""
+    global _lexicon, _negations
+    with _lexicon_lock:
+        if _lexicon is None:
+            from textblob.en import sentiment as pattern_sentiment
+
+            pattern_sentiment.load()
+            lexicon = {}
+            for word, senses in pattern_sentiment.items():
+                if None not in senses:
+                    continue
+                polarity, subjectivity, intensity = senses[None]
+                is_modifier = any(tag in senses for tag in pattern_sentiment.modifiers)
+                lexicon[word] = (polarity, subjectivity, intensity, is_modifier)
+            _negations = frozenset(pattern_sentiment.negations)
+            _lexicon = lexicon
+    return _lexicon
+
+
+def _clamp(value):
+    return max(-1.0, min(value, 1.0))
+
+
+def _assess(words, lexicon, negations):
+    """Scores one sentence the way pattern does: modifiers intensify, negations flip and soften.
+
+    Returns parallel lists of polarity and subjectivity, one entry per assessed word.
+    """
+    polarities, subjectivities, intensities, negated = [], [], [], []
+    modifier = False
+    negation = False
+    for word in words:
+        entry = lexicon.get(word)
+        if entry is not None:
+            polarity, subjectivity, intensity, is_modifier = entry
+            if modifier:
+                # "really good": the modifier's intensity scales the word it modifies.
+                polarities[-1] = _clamp(polarity * intensities[-1])
+                subjectivities[-1] = _clamp(subjectivity * intensities[-1])
+                intensities[-1] = intensity
+            else:
+                polarities.append(polarity)
+                subjectivities.append(subjectivity)
+                intensities.append(intensity)
+                negated.append(False)
+            if negation:
+                intensities[-1] = 1.0 / intensities[-1] if intensities[-1] else intensities[-1]
+                negated[-1] = True
+            modifier = is_modifier
+            negation = word in negations
+        elif word in negations:
+            negation = True
+        elif word == "!":
+            if polarities:
+                polarities[-1] = _clamp(polarities[-1] * 1.25)
+        else:
+            # Negations and modifiers carry across short words ("not a good", "really is a good").
+            if negation and len(word.strip("'")) > 1:
+                negation = False
+            if modifier and len(word) > 2:
+                modifier = False
+
+    # "not good" = slightly bad, "not bad" = slightly good.
+    return [p * -0.5 if n else p for p, n in zip(polarities, negated)], subjectivities
+
+
+def _score_segments(segments):
+    """Scores many text segments at once.
+
+    Word lookups run in one pass; polarity and subjectivity are then averaged
+    per segment with NumPy. Returns ``(polarity, subjectivity, assessed_words)`` arrays.
+    """
+    import numpy as np
+
+    lexicon = _load_lexicon()
+    polarities, subjectivities, owners = [], [], []
+    for index, segment in enumerate(segments):
+        p, s = _assess(_TOKEN_PATTERN.findall(segment.lower()), lexicon, _negations)
+        polarities.extend(p)
+        subjectivities.extend(s)
+        owners.extend([index] * len(p))
+
+    counts = np.bincount(np.asarray(owners, dtype=np.intp), minlength=len(segments))
+    owners = np.asarray(owners, dtype=np.intp)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        polarity = np.bincount(owners, weights=np.asarray(polarities, dtype=float), minlength=len(segments)) / counts
+        subjectivity = np.bincount(owners, weights=np.asarray(subjectivities, dtype=float), minlength=len(segments)) / counts
+    return np.nan_to_num(polarity), np.nan_to_num(subjectivity), counts
+
+
+def split_sentences(text):
+    return [sentence for sentence in _SENTENCE_SPLIT.split(text) if sentence.strip()]
+
+
+@timed("sentiment")
 def analyze_sentiment(text):
-    blob = TextBlob(text)
-    sentiment = blob.sentiment
-    return sentiment.polarity, sentiment.subjectivity
+    polarity, subjectivity, _ = _score_segments([text])
+    return float(polarity[0]), float(subjectivity[0])
+
+
+def analyze_sentiment_batch(texts):
+    """Returns ``(polarity, subjectivity)`` for each of many briefs, scored in one pass."""
+    polarity, subjectivity, _ = _score_segments(texts)
+    return list(zip(polarity.tolist(), subjectivity.tolist()))
+
+
+@timed("sentiment.sections")
+def analyze_sentiment_sections(text):
+    """Scores every sentence once and aggregates per section and for the whole brief.
+
+    Returns ``{"polarity", "subjectivity", "sections": [...]}`` where each section
+    is a dict with ``heading``, ``polarity``, ``subjectivity`` and ``sentences``.
+    Section and overall scores average the assessed words they contain, as the
+    whole-brief score always has.
+    """
+    import numpy as np
+    from section_analysis import split_sections
+
+    sections = split_sections(text)
+    sentences, section_ids = [], []
+    for index, (heading, body) in enumerate(sections):
+        for sentence in split_sentences(body):
+            sentences.append(sentence)
+            section_ids.append(index)
+
+    polarity, subjectivity, counts = _score_segments(sentences)
+    section_ids = np.asarray(section_ids, dtype=np.intp)
+    weights = counts.astype(float)
+
+    def weighted_mean(values, ids, size):
+        totals = np.bincount(ids, weights=values * weights, minlength=size)
+        words = np.bincount(ids, weights=weights, minlength=size)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.nan_to_num(totals / words)
+
+    section_polarity = weighted_mean(polarity, section_ids, len(sections))
+    section_subjectivity = weighted_mean(subjectivity, section_ids, len(sections))
+    sentence_counts = np.bincount(section_ids, minlength=len(sections))
+
+    overall_ids = np.zeros(len(sentences), dtype=np.intp)
+    return {
+        "polarity": float(weighted_mean(polarity, overall_ids, 1)[0]),
+        "subjectivity": float(weighted_mean(subjectivity, overall_ids, 1)[0]),
+        "sections": [
+            {
+                "heading": heading or "Introduction",
+                "polarity": float(section_polarity[i]),
+                "subjectivity": float(section_subjectivity[i]),
+                "sentences": int(sentence_counts[i]),
+            }
+            for i, (heading, _) in enumerate(sections)
+            if sentence_counts[i]
+        ],
+    }
+
 
 def interpret_sentiment(polarity, subjectivity):
     if polarity <= -0.5:
@@ -27,3 +190,11 @@ def interpret_sentiment(polarity, subjectivity):
         subjectivity_text = "The brief is very subjective, focusing heavily on opinions. Balance it with factual information to strengthen your argument."
 
     return polarity_text, subjectivity_text
+
+
+def interpret_section_sentiment(section_results):
+    """Applies interpret_sentiment to each section from analyze_sentiment_sections."""
+    return [
+        (section["heading"],) + interpret_sentiment(section["polarity"], section["subjectivity"])
+        for section in section_results["sections"]
+    ]
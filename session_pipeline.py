@@ -0,0 +1,83 @@
+import streamlit as st
+
+from analysis_store import content_hash
+from text_extraction import extract_text
+from sentiment_analysis import analyze_sentiment_sections
+
+PIPELINE_KEY = "pipeline_state"
+# Session keys that belong to one upload and must not leak into the next.
+UPLOAD_SCOPED_PREFIXES = ("improved_", "user_", "current_")
+UPLOAD_SCOPED_KEYS = ("df_results", "document_text")
+
+
+class PipelineState:
+    """Everything derived from one uploaded brief, kept in st.session_state across reruns.
+
+    Results are stored by reference, so later reruns reuse them without
+    re-reading the upload, re-extracting text or copying anything.
+    """
+
+    def __init__(self, content_hash, file_name, file_id):
+        self.content_hash = content_hash
+        self.file_name = file_name
+        self.file_id = file_id
+        self.document_text = None
+        self.sentiment = None
+        self.response_data = None
+        self.results = None
+        self.score_state = None
+        # Most similar earlier brief with a stored analysis; False once looked up and none was found.
+        self.similar_match = None
+        self.analysis_job_id = None
+        # Local rule-based scores, shown while the full analysis runs.
+        self.pre_score = None
+        # (heading, text) pairs of the last generated final brief, exported on demand.
+        self.final_sections = None
+
+
+# Cached across sessions by content hash; the leading underscore keeps the bytes out of Streamlit's hashing.
+@st.cache_data(max_entries=32, show_spinner=False)
+def _extract_text(digest, file_name, _file_bytes):
+    try:
+        return extract_text(_file_bytes, file_name)
+    except Exception as e:
+        st.error(f"Error extracting text from {file_name}: {e}")
+        return None
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def _sentiment(digest, _document_text):
+    return analyze_sentiment_sections(_document_text)
+
+
+def invalidate_pipeline_state():
+    """Drops the current upload's state and every widget or result key scoped to it."""
+    for key in list(st.session_state.keys()):
+        if key == PIPELINE_KEY or key in UPLOAD_SCOPED_KEYS or key.startswith(UPLOAD_SCOPED_PREFIXES):
+            del st.session_state[key]
+
+
+def get_pipeline_state(uploaded_file):
+    """Returns the pipeline state for ``uploaded_file``, extracting text and sentiment only for a new upload.
+
+    The upload's Streamlit file id is checked first so unchanged reruns skip
+    hashing; a re-upload of identical content keeps the existing state.
+    """
+    state = st.session_state.get(PIPELINE_KEY)
+    file_id = getattr(uploaded_file, "file_id", None)
+    if state is not None and file_id is not None and state.file_id == file_id:
+        return state
+
+    file_bytes = uploaded_file.getvalue()
+    digest = content_hash(file_bytes)
+    if state is not None and state.content_hash == digest:
+        state.file_id = file_id
+        return state
+
+    invalidate_pipeline_state()
+    state = PipelineState(digest, uploaded_file.name, file_id)
+    state.document_text = _extract_text(digest, uploaded_file.name, file_bytes)
+    if state.document_text:
+        state.sentiment = _sentiment(digest, state.document_text)
+    st.session_state[PIPELINE_KEY] = state
+    return state
@@ -0,0 +1,225 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+from analysis_cache import CACHE_DIR
+
+# --- Index Settings ---
+DEFAULT_INDEX_PATH = os.path.join(CACHE_DIR, "similarity_index.sqlite")
+SHINGLE_WORDS = 5
+NUM_PERMUTATIONS = 128
+# 16 bands of 8 rows: pairs above ~0.7 Jaccard almost always share a bucket, pairs below ~0.5 rarely do.
+LSH_BANDS = 16
+LSH_ROWS = NUM_PERMUTATIONS // LSH_BANDS
+DEFAULT_THRESHOLD = 0.8
+# Above this similarity a previous analysis is reused without asking.
+AUTO_REUSE_THRESHOLD = 0.95
+# Shingle hashes are processed in blocks to bound the permutation matrix size.
+SIGNATURE_BLOCK = 4096
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def _permutation_coefficient(label, i):
+    digest = hashlib.blake2b(f"{label}{i}".encode("ascii"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % (_MERSENNE_PRIME - 1) + 1
+
+
+# Derived from fixed hashes rather than a RNG so signatures stay comparable across versions.
+_PERM_A = [_permutation_coefficient("a", i) for i in range(NUM_PERMUTATIONS)]
+_PERM_B = [_permutation_coefficient("b", i) for i in range(NUM_PERMUTATIONS)]
+
+
+# --- MinHash ---
+def shingles(text, size=SHINGLE_WORDS):
+    """Returns the 32-bit hashes of the word ``size``-grams of the normalized text."""
+    words = _WORD_PATTERN.findall(text.lower())
+    if len(words) <= size:
+        return {zlib.crc32(" ".join(words).encode("utf-8"))} if words else set()
+    return {zlib.crc32(" ".join(words[i:i + size]).encode("utf-8")) for i in range(len(words) - size + 1)}
+
+
+def minhash_signature(text):
+    """Returns the NUM_PERMUTATIONS-value MinHash signature of ``text`` as a uint32 array."""
+    import numpy as np
+
+    hashes = np.fromiter(shingles(text), dtype=np.uint64)
+    signature = np.full(NUM_PERMUTATIONS, _MERSENNE_PRIME, dtype=np.uint64)
+    a = np.asarray(_PERM_A, dtype=np.uint64)[:, None]
+    b = np.asarray(_PERM_B, dtype=np.uint64)[:, None]
+    for start in range(0, len(hashes), SIGNATURE_BLOCK):
+        block = hashes[None, start:start + SIGNATURE_BLOCK]
+        np.minimum(signature, ((a * block + b) % _MERSENNE_PRIME).min(axis=1), out=signature)
+    return signature.astype(np.uint32)
+
+
+def estimated_similarity(signature_a, signature_b):
+    """Estimated Jaccard similarity: the share of signature positions that agree."""
+    return float((signature_a == signature_b).mean())
+
+
+def band_buckets(signature):
+    """Returns one ``(band, bucket)`` key per LSH band of the signature."""
+    raw = signature.astype("<u4").tobytes()
+    width = LSH_ROWS * 4
+    return [
+        (band, int.from_bytes(hashlib.blake2b(raw[band * width:(band + 1) * width], digest_size=8).digest(), "big", signed=True))
+        for band in range(LSH_BANDS)
+    ]
+
+
+# --- Persistent Index ---
+class SimilarityIndex:
+    """Persistent MinHash/LSH index of analysed brief texts.
+
+    Each brief is stored with its signature and one row per LSH band bucket.
+    A lookup probes the indexed bucket table for the query's bands and only
+    compares signatures of the briefs that share a bucket, so its cost depends
+    on the number of near matches rather than the size of the index.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            if self.path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS indexed_briefs (
+                    content_hash TEXT PRIMARY KEY,
+                    file_name TEXT,
+                    added_at REAL NOT NULL,
+                    signature BLOB NOT NULL,
+                    document_text BLOB NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS lsh_buckets (
+                    band INTEGER NOT NULL,
+                    bucket INTEGER NOT NULL,
+                    content_hash TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_lsh_buckets_band_bucket ON lsh_buckets (band, bucket);
+                CREATE INDEX IF NOT EXISTS idx_lsh_buckets_hash ON lsh_buckets (content_hash);
+                """
+            )
+            self._conn.commit()
+        return self._conn
+
+    def add(self, content_hash, text, file_name=None, signature=None):
+        """Indexes a brief's text under its content hash, replacing any earlier entry."""
+        signature = minhash_signature(text) if signature is None else signature
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM lsh_buckets WHERE content_hash = ?", (content_hash,))
+                conn.execute(
+                    "INSERT OR REPLACE INTO indexed_briefs (content_hash, file_name, added_at, signature, document_text)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (content_hash, file_name, time.time(), signature.astype("<u4").tobytes(),
+                     zlib.compress(text.encode("utf-8"))),
+                )
+                conn.executemany(
+                    "INSERT INTO lsh_buckets (band, bucket, content_hash) VALUES (?, ?, ?)",
+                    [(band, bucket, content_hash) for band, bucket in band_buckets(signature)],
+                )
+
+    def find_similar(self, text, threshold=DEFAULT_THRESHOLD, exclude=None, limit=5, signature=None):
+        """Returns up to ``limit`` indexed briefs at least ``threshold`` similar to ``text``.
+
+        Results are ``{content_hash, file_name, added_at, similarity}`` dicts, most similar first.
+        ``exclude`` skips one content hash, normally the brief being looked up.
+        """
+        import numpy as np
+
+        signature = minhash_signature(text) if signature is None else signature
+        buckets = band_buckets(signature)
+        where = " OR ".join("(band = ? AND bucket = ?)" for _ in buckets)
+        params = [value for key in buckets for value in key]
+        with self._lock:
+            conn = self._connection()
+            candidates = [row[0] for row in conn.execute(f"SELECT DISTINCT content_hash FROM lsh_buckets WHERE {where}", params)]
+            candidates = [content_hash for content_hash in candidates if content_hash != exclude]
+            if not candidates:
+                return []
+            rows = conn.execute(
+                "SELECT content_hash, file_name, added_at, signature FROM indexed_briefs"
+                f" WHERE content_hash IN ({', '.join('?' * len(candidates))})",
+                candidates,
+            ).fetchall()
+
+        matches = []
+        for content_hash, file_name, added_at, stored in rows:
+            similarity = estimated_similarity(signature, np.frombuffer(stored, dtype="<u4"))
+            if similarity >= threshold:
+                matches.append({
+                    "content_hash": content_hash,
+                    "file_name": file_name,
+                    "added_at": added_at,
+                    "similarity": similarity,
+                })
+        matches.sort(key=lambda match: -match["similarity"])
+        return matches[:limit]
+
+    def get_text(self, content_hash):
+        """Returns the stored text of an indexed brief, or None."""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT document_text FROM indexed_briefs WHERE content_hash = ?", (content_hash,)
+            ).fetchone()
+        return zlib.decompress(row[0]).decode("utf-8") if row else None
+
+    def count(self):
+        with self._lock:
+            return self._connection().execute("SELECT COUNT(*) FROM indexed_briefs").fetchone()[0]
+
+
+_default_index = None
+_default_index_lock = threading.Lock()
+
+
+def get_similarity_index():
+    """Returns the process-wide similarity index, creating it on first use."""
+    global _default_index
+    with _default_index_lock:
+        if _default_index is None:
+            _default_index = SimilarityIndex()
+        return _default_index
+
+
+def index_brief(content_hash, text, file_name=None):
+    """Adds a brief to the default index; a failed write only prints a warning."""
+    try:
+        get_similarity_index().add(content_hash, text, file_name)
+    except sqlite3.Error as e:
+        print(f"Warning: similarity index write failed: {e}")
+
+
+def find_reusable_analysis(text, content_hash, threshold=DEFAULT_THRESHOLD):
+    """Finds the most similar earlier brief that has a stored analysis.
+
+    Returns ``{content_hash, file_name, added_at, similarity, text, response_data}``,
+    or None when no indexed brief is similar enough.
+    """
+    from analysis_store import get_analysis_store
+
+    try:
+        matches = get_similarity_index().find_similar(text, threshold, exclude=content_hash)
+        for match in matches:
+            response_data = get_analysis_store().get(match["content_hash"])
+            previous_text = get_similarity_index().get_text(match["content_hash"])
+            if response_data is not None and previous_text is not None:
+                return dict(match, text=previous_text, response_data=response_data)
+    except sqlite3.Error as e:
+        print(f"Warning: similarity lookup failed: {e}")
+    return None
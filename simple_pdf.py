@@ -0,0 +1,92 @@
+import textwrap
+
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+MARGIN = 72
+FONT_SIZE = 11
+LEADING = 14
+LINES_PER_PAGE = (PAGE_HEIGHT - 2 * MARGIN) // LEADING
+WRAP_WIDTH = 90
+
+
+class BoldLine(str):
+    """A line set in Helvetica-Bold, e.g. a heading."""
+
+
+def _escape(line):
+    # WinAnsiEncoding is cp1252, which also covers curly quotes, dashes and the euro sign.
+    line = line.encode("cp1252", "replace").decode("cp1252")
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def wrap_lines(text, width=WRAP_WIDTH):
+    """Wraps text into PDF lines, keeping blank lines between paragraphs."""
+    lines = []
+    for paragraph in text.split("\n"):
+        lines.extend(textwrap.wrap(paragraph, width) or [""])
+    return lines
+
+
+def paginate(lines, lines_per_page=LINES_PER_PAGE):
+    return [lines[start:start + lines_per_page] for start in range(0, len(lines), lines_per_page)] or [[]]
+
+
+def build_text_pdf(pages):
+    """Builds a minimal PDF with one Helvetica text page per list of lines and returns its bytes.
+
+    Only what PyPDF2 and ordinary viewers need is written: a catalog, a page
+    tree, two shared fonts (regular, and bold for BoldLine lines) and a content
+    stream per page.
+    """
+    objects = []
+
+    def add(body):
+        objects.append(body)
+        return len(objects)
+
+    catalog_id = add(None)
+    pages_id = add(None)
+    font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+    bold_font_id = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>")
+
+    page_ids = []
+    for lines in pages:
+        commands = [f"BT /F1 {FONT_SIZE} Tf {LEADING} TL {MARGIN} {PAGE_HEIGHT - MARGIN} Td"]
+        font = "F1"
+        for line in lines:
+            line_font = "F2" if isinstance(line, BoldLine) else "F1"
+            if line_font != font:
+                commands.append(f"/{line_font} {FONT_SIZE} Tf")
+                font = line_font
+            commands.append(f"({_escape(line)}) Tj T*")
+        commands.append("ET")
+        stream = "\n".join(commands).encode("cp1252")
+        content_id = add(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        page_ids.append(add(
+            f"<< /Type /Page /Parent {pages_id} 0 R /MediaBox [0 0 {PAGE_WIDTH} {PAGE_HEIGHT}] "
+            f"/Resources << /Font << /F1 {font_id} 0 R /F2 {bold_font_id} 0 R >> >> /Contents {content_id} 0 R >>".encode("latin-1")
+        ))
+
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids)
+    objects[pages_id - 1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode("latin-1")
+    objects[catalog_id - 1] = f"<< /Type /Catalog /Pages {pages_id} 0 R >>".encode("latin-1")
+
+    output = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(output))
+        output += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+
+    xref_offset = len(output)
+    output += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        output += b"%010d 00000 n \n" % offset
+    output += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1, catalog_id, xref_offset
+    )
+    return bytes(output)
+
+
+def text_to_pdf(text):
+    """Lays plain text out over as many pages as needed and returns the PDF bytes."""
+    return build_text_pdf(paginate(wrap_lines(text)))
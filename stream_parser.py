@@ -0,0 +1,124 @@
+import json
+
+
+class AnalysisStreamParser:
+    """Tolerant incremental parser for a streamed analysis response.
+
+    Feed it text chunks as they arrive and it returns events for every part of
+    the response that has become complete:
+
+    - ``("overall_score", None, value)``
+    - ``("category", <category name>, <details dict>)`` for each breakdown entry
+    - ``("gap_analysis", None, <list>)``
+
+    The parser tracks string/escape state and container nesting one character at
+    a time, so each chunk is scanned once no matter how long the response gets.
+    Anything before the first ``{`` (such as a Markdown code fence) is ignored.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._started = False
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._last_string = None
+
+    def feed(self, chunk):
+        self._text += chunk
+        events = []
+        text = self._text
+        while self._pos < len(text):
+            pos = self._pos
+            char = text[pos]
+            self._pos += 1
+
+            if not self._started:
+                if char == "{":
+                    self._started = True
+                    self._stack.append({"type": "{", "key": None, "start": pos, "value_start": None})
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._last_string = text[self._string_start:pos + 1]
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = pos
+            elif char == ":" and self._stack and self._stack[-1]["type"] == "{":
+                self._stack[-1]["key"] = self._decode_string(self._last_string)
+                self._stack[-1]["value_start"] = pos + 1
+            elif char in "{[":
+                if self._stack:
+                    self._stack[-1]["value_start"] = None
+                self._stack.append({"type": char, "key": None, "start": pos, "value_start": None})
+            elif char in "}]":
+                if not self._stack:
+                    continue
+                self._close_scalar(pos, events)
+                closed = self._stack.pop()
+                self._close_container(closed, pos, events)
+            elif char == ",":
+                self._close_scalar(pos, events)
+        return events
+
+    # --- Internals ---
+    @staticmethod
+    def _decode_string(raw):
+        if raw is None:
+            return None
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            return raw.strip('"')
+
+    @staticmethod
+    def _load(fragment):
+        try:
+            return json.loads(fragment)
+        except json.JSONDecodeError:
+            from json_repair import repair_json
+
+            try:
+                return json.loads(repair_json(fragment))
+            except Exception:
+                return None
+
+    def _close_scalar(self, pos, events):
+        """Emits a top-level scalar (e.g. overall_score) once its terminating ',' or '}' is seen."""
+        if len(self._stack) != 1:
+            return
+        top = self._stack[0]
+        if top["value_start"] is None:
+            return
+        fragment = self._text[top["value_start"]:pos].strip()
+        top["value_start"] = None
+        if top["key"] == "overall_score" and fragment:
+            value = self._load(fragment)
+            if value is not None:
+                events.append(("overall_score", None, value))
+
+    def _close_container(self, closed, pos, events):
+        depth = len(self._stack)
+        if depth == 2 and closed["type"] == "{" and self._stack[0]["key"] == "breakdown":
+            details = self._load(self._text[closed["start"]:pos + 1])
+            if isinstance(details, dict):
+                events.append(("category", self._stack[1]["key"], details))
+        elif depth == 1 and closed["type"] == "[" and self._stack[0]["key"] == "gap_analysis":
+            items = self._load(self._text[closed["start"]:pos + 1])
+            if isinstance(items, list):
+                events.append(("gap_analysis", None, items))
+
+    @property
+    def text(self):
+        """The full response text received so far."""
+        return self._text
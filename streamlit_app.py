@@ -1,20 +1,178 @@
 import streamlit as st
-import pandas as pd
-import docx
-import io
-import asyncio
+import json
+import os
+import time
 import ui_config
 
-from text_extraction import extract_text_from_docx, extract_text_from_pdf
-from sentiment_analysis import analyze_sentiment, interpret_sentiment
-from ai_analysis import analyze_text_async, improve_section
+from sentiment_analysis import interpret_sentiment, interpret_section_sentiment
+from ai_analysis import replay_analysis, improve_section, build_results, is_pre_scored, analysis_model
+from section_analysis import BriefScoreState
+from session_pipeline import get_pipeline_state
+from analysis_store import record_analysis
+from job_queue import get_job_queue, submit_analysis, submit_improve_all
+from similarity_index import AUTO_REUSE_THRESHOLD, find_reusable_analysis, index_brief
+from pre_scorer import pre_score
 from utils import parse_and_improve
+from brief_export import EXPORT_FORMATS, export_brief
 from ui_config import add_footer
+from instrumentation import end_trace, profile_if_slow, prometheus_text, start_trace, to_otel_json
 
 # --- UI Configuration ---
 ui_config.set_page_config()
 ui_config.apply_custom_styles()
 
+EXPORT_FORMAT_LABELS = {"docx": "DOCX", "md": "Markdown", "pdf": "PDF"}
+JOB_POLL_SECONDS = 1.0
+# Cached analyses finish almost immediately; waiting this long saves them a polling round trip.
+JOB_INITIAL_WAIT_SECONDS = 0.25
+
+def render_analysis_stream(events):
+    """Renders scores and feedback category by category as analysis events arrive."""
+    score_placeholder = st.empty()
+    category_container = st.container()
+    # One placeholder per category, reused in order after a reset
+    category_placeholders = []
+    shown = 0
+    gap_placeholder = st.empty()
+    response_data = None
+
+    with st.spinner("Analyzing your brief..."):
+        try:
+            for kind, name, value in events:
+                if kind == "overall_score":
+                    score_placeholder.metric("Overall Score", value)
+                elif kind == "category":
+                    if shown == len(category_placeholders):
+                        with category_container:
+                            category_placeholders.append(st.empty())
+                    with category_placeholders[shown].container():
+                        st.markdown(f"**{name.replace('_', ' ').title()}: {value.get('score', '–')}/100**")
+                        st.caption(value.get('feedback', ''))
+                    shown += 1
+                elif kind == "gap_analysis" and value:
+                    gap_placeholder.markdown("**Gap Analysis**\n" + "\n".join(f"- {item}" for item in value))
+                elif kind == "reset":
+                    # The response is being replaced by an escalated one; drop what was shown.
+                    for placeholder in [score_placeholder, gap_placeholder] + category_placeholders:
+                        placeholder.empty()
+                    shown = 0
+                elif kind == "complete":
+                    response_data = value
+        except Exception as e:
+            # Timeouts and exhausted retries surface here; the caller shows a friendly error.
+            print(f"Error streaming analysis: {e}")
+            return None
+
+    return response_data
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def render_job_progress(job_id, label):
+    """Polls a background job, showing partial results, and reruns the app once it finishes."""
+    job = get_job_queue().get(job_id)
+    if job is None or job.finished:
+        st.rerun()
+    st.caption(f"{label} ({job.status}, {job.elapsed():.0f}s)")
+    if job.events:
+        render_analysis_stream(iter(list(job.events)))
+
+def wait_for_job(job, label, preview=None):
+    """Returns once ``job`` has finished; until then shows ``preview()`` and its progress and stops the script run."""
+    if not job.finished:
+        job.wait(JOB_INITIAL_WAIT_SECONDS)
+    # The job's own stages (LLM call, parsing, building) are traced on its worker thread
+    if job.trace is not None and job.trace not in job_traces:
+        job_traces.append(job.trace)
+    if not job.finished:
+        if preview is not None:
+            preview()
+        render_job_progress(job.job_id, label)
+        stop_run()
+    return job
+
+def render_pre_score(result):
+    """Shows the provisional scores of the local rule-based pre-score."""
+    with st.container(border=True):
+        st.markdown(f"**Instant check:** provisional score {result.overall_score}/100 from local rules")
+        for category, details in result.response_data['breakdown'].items():
+            st.caption(f"{category.replace('_', ' ').title()} ({details['score']}): {details['feedback']}")
+
+def reuse_similar_analysis(pipeline, document_text):
+    """Offers the analysis of a near-identical earlier brief, re-scoring only the sections that changed.
+
+    Very close matches are reused automatically. Returns the rebased BriefScoreState,
+    or None when there is no match or the user asks for a full analysis.
+    """
+    if pipeline.similar_match is None:
+        pipeline.similar_match = find_reusable_analysis(document_text, pipeline.content_hash) or False
+    match = pipeline.similar_match
+    if not match:
+        return None
+
+    if match["similarity"] < AUTO_REUSE_THRESHOLD:
+        st.info(
+            f"This brief is {match['similarity']:.0%} similar to {match['file_name'] or 'an earlier brief'}, "
+            f"analyzed on {time.strftime('%d %b %Y', time.localtime(match['added_at']))}."
+        )
+        reuse_col, full_col = st.columns(2)
+        if full_col.button("Run a full analysis"):
+            pipeline.similar_match = False
+            return None
+        if not reuse_col.button("Reuse that analysis"):
+            stop_run()
+
+    with st.spinner("Re-scoring the sections that changed..."):
+        score_state = BriefScoreState(match["text"], match["response_data"])
+        score_state.rebase(document_text)
+        stale = score_state.stale_categories()
+        rescored = score_state.rescore() if stale else []
+    if set(stale) - set(rescored):
+        st.warning("Some changed sections could not be re-scored; their previous scores are shown.")
+    changed = ", ".join(category.replace('_', ' ').title() for category in rescored) or "none"
+    st.caption(f"Reused the analysis of {match['file_name'] or 'an earlier brief'} ({match['similarity']:.0%} similar). Re-scored: {changed}.")
+    return score_state
+
+def render_debug_panel(traces):
+    """Shows a timing waterfall of this run's stages and its jobs' finished stages, with trace, metrics and profile downloads."""
+    with st.sidebar.expander("Debug: request timing", expanded=True):
+        origin = min((s.start_ns for t in traces for s in t.spans), default=None)
+        rows = sorted((row for t in traces for row in t.waterfall(origin)), key=lambda row: row['start'])
+        if not rows:
+            st.caption("No stages were recorded on this run.")
+            return
+
+        import altair as alt
+        import pandas as pd
+
+        df_spans = pd.DataFrame(rows)
+        df_spans['end'] = df_spans['start'] + df_spans['duration']
+        df_spans['stage'] = [f"{i:02d} {'  ' * row['depth']}{row['name']}" for i, row in enumerate(rows)]
+        chart = alt.Chart(df_spans).mark_bar().encode(
+            x=alt.X('start:Q', title='Seconds since request start'),
+            x2='end:Q',
+            y=alt.Y('stage:N', sort=None, title=None),
+            color=alt.Color('depth:O', legend=None),
+            tooltip=['name', 'start', 'duration', 'error'],
+        )
+        st.altair_chart(chart)
+        st.dataframe(df_spans[['name', 'start', 'duration']], hide_index=True)
+
+        st.download_button("Download trace (OpenTelemetry JSON)", json.dumps(to_otel_json(*traces)), file_name="trace.json")
+        st.download_button("Download metrics (Prometheus)", prometheus_text(), file_name="metrics.prom")
+        for t in traces:
+            if t.profile:
+                st.code(t.profile)
+
+def finish_run():
+    """Ends this run's trace and shows the debug panel."""
+    end_trace(trace_token)
+    if debug_mode:
+        render_debug_panel([request_trace] + job_traces)
+
+def stop_run():
+    """Stops the script run like ``st.stop()``, finishing the trace and debug panel first since nothing after it runs."""
+    finish_run()
+    st.stop()
+
 # --- Main App ---
 st.markdown(
     """
@@ -34,62 +192,184 @@ uploaded_file = st.file_uploader(
     "Upload Your Marketing Brief (DOCX or PDF)", type=["docx", "pdf"], accept_multiple_files=False
 )
 
+# --- Debug Options ---
+debug_mode = os.environ.get("BRIEFLY_DEBUG") == "1" or st.query_params.get("debug") == "1"
+profile_enabled, profile_threshold = False, 5.0
+if debug_mode:
+    with st.sidebar:
+        profile_enabled = st.checkbox("Capture cProfile for slow requests")
+        profile_threshold = st.number_input("Slow request threshold (seconds)", min_value=0.0, value=5.0)
+
+request_trace, trace_token = start_trace("streamlit_run")
+# Traces of the background jobs this run waited on, shown alongside its own stages
+job_traces = []
+
 # --- Process Uploaded File ---
-if uploaded_file is not None:
-    try:
-        file_bytes = uploaded_file.read()
-
-        if uploaded_file.name.endswith(".docx"):
-            document_text = extract_text_from_docx(file_bytes)
-        elif uploaded_file.name.endswith(".pdf"):
-            document_text = extract_text_from_pdf(file_bytes)
-        else:
-            st.error("Unsupported file type. Please upload a DOCX or PDF file.")
-            st.stop()
-
-        if document_text is None:
-            st.error("Failed to extract text from the uploaded file. Please try again with a different file.")
-            st.stop()
-
-        # --- Analyze the Text ---
-        with st.spinner("Analyzing your brief..."):
-            df_results, overall_score, gap_analysis_results, competitors_mentioned = asyncio.run(analyze_text_async(document_text))
-
-        # Store analysis results in session state
-        st.session_state['df_results'] = df_results
-        st.session_state['document_text'] = document_text
-
-        # --- Interactive Improvement Sections ---
-        st.header("Improve Your Marketing Brief")
-
-        for section in df_results.index:
-            original_text = document_text  # Extract relevant section text here
-            st.subheader(section)
-            st.text_area(f"Current {section}", value=original_text, key=f"current_{section}")
-
-            user_input = st.text_area(f"Your Improved {section}", key=f"user_{section}")
-            if st.button(f"Submit {section}"):
-                improved_text = improve_section(original_text, user_input, section)
-                st.write(improved_text)
-                st.session_state[f"improved_{section}"] = improved_text
-
-        # --- Compile Final Brief ---
-        if st.button("Generate Final Brief"):
-            final_brief = "\n\n".join([st.session_state.get(f"improved_{section}", "") for section in df_results.index])
-            doc = docx.Document()
-            doc.add_paragraph(final_brief)
-            doc_bytes = io.BytesIO()
-            doc.save(doc_bytes)
-            doc_bytes.seek(0)
-
-            st.download_button(
-                label="Download Improved Brief (DOCX)",
-                data=doc_bytes,
-                file_name="improved_brief.docx",
-                mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-            )
-
-    except Exception as e:
-        st.error(f"An error occurred: {e}")
+with profile_if_slow(profile_threshold, enabled=profile_enabled):
+    if uploaded_file is not None:
+        try:
+            if not uploaded_file.name.endswith((".docx", ".pdf")):
+                st.error("Unsupported file type. Please upload a DOCX or PDF file.")
+                stop_run()
+
+            # Extraction, sentiment and analysis run once per unique upload and are reused on every rerun
+            pipeline = get_pipeline_state(uploaded_file)
+            document_text = pipeline.document_text
+
+            if document_text is None:
+                st.error("Failed to extract text from the uploaded file. Please try again with a different file.")
+                stop_run()
+
+            # --- Analyze the Text ---
+            if pipeline.response_data is None:
+                reused_state = reuse_similar_analysis(pipeline, document_text)
+                if reused_state is not None:
+                    pipeline.response_data = reused_state.to_response_data()
+                    render_analysis_stream(replay_analysis(pipeline.response_data))
+                else:
+                    # Analysis runs on the background job queue; identical uploads share one job
+                    job = get_job_queue().get(pipeline.analysis_job_id) if pipeline.analysis_job_id else None
+                    if job is None:
+                        job = submit_analysis(document_text)
+                        pipeline.analysis_job_id = job.job_id
+                    if pipeline.pre_score is None:
+                        pipeline.pre_score = pre_score(document_text)
+                    job = wait_for_job(job, "Analyzing your brief...", preview=lambda: render_pre_score(pipeline.pre_score))
+                    pipeline.response_data = job.result
+                    if pipeline.response_data is not None:
+                        render_analysis_stream(replay_analysis(pipeline.response_data))
+                    else:
+                        # Forget the failed job so the next run submits a fresh analysis
+                        pipeline.analysis_job_id = None
+                        get_job_queue().discard(job.job_id)
+                if pipeline.response_data is None:
+                    st.error("The analysis could not be completed. Please try again.")
+                    if st.button("Retry analysis"):
+                        st.rerun()
+                    stop_run()
+                pipeline.results = build_results(pipeline.response_data)
+                # Keep every model analysis so scores can be compared across briefs later
+                if not is_pre_scored(pipeline.response_data):
+                    record_analysis(
+                        pipeline.content_hash, pipeline.response_data, pipeline.file_name,
+                        analysis_model(pipeline.response_data),
+                    )
+                    index_brief(pipeline.content_hash, document_text, pipeline.file_name)
+                # Per-category score state, kept so edits can be re-scored incrementally
+                pipeline.score_state = reused_state or BriefScoreState(document_text, pipeline.response_data)
+            else:
+                render_analysis_stream(replay_analysis(pipeline.response_data))
+            routing = pipeline.response_data.get('pre_score')
+            if routing and routing['decision'] == "skip":
+                st.info(f"Scored with local rules only, without Gemini: {routing['reason']}.")
+            elif routing and routing['decision'] == "shorten":
+                st.caption(f"Only {len(routing['llm_categories'])} categories were sent to Gemini: {routing['reason']}.")
+            df_results, overall_score, gap_analysis_results, competitors_mentioned = pipeline.results
+            score_state = pipeline.score_state
+
+            # --- Tone of Voice ---
+            if pipeline.sentiment is not None:
+                polarity_text, subjectivity_text = interpret_sentiment(pipeline.sentiment["polarity"], pipeline.sentiment["subjectivity"])
+                st.markdown(f"**Tone of Voice**\n\n{polarity_text}\n\n{subjectivity_text}")
+                with st.expander("Tone by section"):
+                    for (heading, section_polarity_text, section_subjectivity_text), section in zip(
+                        interpret_section_sentiment(pipeline.sentiment), pipeline.sentiment["sections"]
+                    ):
+                        st.markdown(
+                            f"**{heading}** (polarity {section['polarity']:+.2f}, subjectivity {section['subjectivity']:.2f})"
+                        )
+                        st.caption(f"{section_polarity_text} {section_subjectivity_text}")
+
+            # Store analysis results in session state
+            st.session_state['df_results'] = df_results
+            st.session_state['document_text'] = document_text
+
+            # --- Interactive Improvement Sections ---
+            st.header("Improve Your Marketing Brief")
+
+            for section in df_results.index:
+                category = section.lower().replace(' ', '_')
+                original_text = score_state.section_text(category)
+                st.subheader(section)
+                st.text_area(f"Current {section}", value=original_text, key=f"current_{section}")
+
+                user_input = st.text_area(f"Your Improved {section}", key=f"user_{section}")
+                if st.button(f"Submit {section}"):
+                    try:
+                        improved_text = improve_section(original_text, user_input, section)
+                    except Exception as e:
+                        st.error(f"Could not improve {section}: {e}")
+                    else:
+                        st.write(improved_text)
+                        st.session_state[f"improved_{section}"] = improved_text
+
+            # --- Re-score Improved Sections ---
+            if st.button("Re-score Improved Sections"):
+                for section in df_results.index:
+                    improved_text = st.session_state.get(f"improved_{section}")
+                    if improved_text:
+                        score_state.replace_section_text(section.lower().replace(' ', '_'), improved_text)
+
+                with st.spinner("Re-scoring changed sections..."):
+                    rescored = score_state.rescore()
+
+                rescored_df, rescored_overall, _, _ = build_results(score_state.to_response_data())
+                st.metric("Updated Overall Score", rescored_overall)
+                st.dataframe(rescored_df[['Score', 'Feedback']])
+                st.caption(f"Re-scored {len(rescored)} of {len(rescored_df)} categories; the rest were unchanged.")
+
+            # --- Improve All Sections ---
+            assemble_final = False
+            if st.button("Improve All Sections"):
+                section_requests = [
+                    (section, score_state.section_text(section.lower().replace(' ', '_')), st.session_state.get(f"user_{section}", ""))
+                    for section in df_results.index
+                ]
+                # Categories without their own section are only drafted when the user wrote something for them
+                section_requests = [request for request in section_requests if request[1].strip() or request[2].strip()]
+                st.session_state['current_improve_job'] = submit_improve_all(section_requests).job_id
+
+            improve_job = get_job_queue().get(st.session_state.get('current_improve_job'))
+            if improve_job is not None:
+                wait_for_job(improve_job, "Improving all sections...")
+                del st.session_state['current_improve_job']
+                improved_sections = improve_job.result or {}
+                if improve_job.error:
+                    st.error(f"Could not improve the sections: {improve_job.error}")
+                for section, improved_text in improved_sections.items():
+                    if improved_text is not None:
+                        st.session_state[f"improved_{section}"] = improved_text
+                failed = [section for section, improved_text in improved_sections.items() if improved_text is None]
+                if failed:
+                    st.warning(f"Could not improve: {', '.join(failed)}. The original text is used for these sections.")
+                assemble_final = True
+
+            # --- Compile Final Brief ---
+            if st.button("Generate Final Brief") or assemble_final:
+                # Sections that were never improved fall back to their original text;
+                # categories with neither are left out rather than padded.
+                final_sections = [
+                    (section, st.session_state.get(f"improved_{section}") or score_state.section_text(section.lower().replace(' ', '_')))
+                    for section in df_results.index
+                ]
+                pipeline.final_sections = [(section, text) for section, text in final_sections if text.strip()]
+
+            if pipeline.final_sections:
+                # Exports are cached by section contents, so reruns reuse the rendered document.
+                export_format = st.radio(
+                    "Download format", list(EXPORT_FORMAT_LABELS), format_func=EXPORT_FORMAT_LABELS.get, horizontal=True
+                )
+                mime, extension = EXPORT_FORMATS[export_format]
+                st.download_button(
+                    label=f"Download Improved Brief ({EXPORT_FORMAT_LABELS[export_format]})",
+                    data=export_brief(pipeline.final_sections, export_format),
+                    file_name=f"improved_brief{extension}",
+                    mime=mime,
+                )
+
+        except Exception as e:
+            st.error(f"An error occurred: {e}")
+
+finish_run()
 
 add_footer()
\ No newline at end of file
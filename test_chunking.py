@@ -0,0 +1,50 @@
+from ai_analysis import CATEGORY_FIELDS
+from chunking import merge_chunk_analyses
+
+
+def chunk_analysis(breakdown, gaps=()):
+    return {"overall_score": 0, "breakdown": breakdown, "gap_analysis": list(gaps)}
+
+
+OPENING = chunk_analysis({
+    "clarity_of_objectives": {"score": 80, "feedback": "Clear targets.", "keywords": ["growth", "Sales"]},
+    "channel_strategy": {"score": 0, "feedback": "Not covered.", "recommended_channels": ["Email"]},
+    "key_performance_indicators": {"score": 60, "feedback": "KPIs named.", "extracted_kpis": ["CTR"]},
+}, gaps=["No budget is given."])
+MIDDLE = chunk_analysis({
+    "clarity_of_objectives": {"score": 40, "feedback": "Vague deadline.", "keywords": ["sales", "launch"]},
+    "channel_strategy": {"score": 70, "feedback": "Channels justified.", "recommended_channels": ["TikTok"]},
+    "key_performance_indicators": {"score": 0, "feedback": "Not covered.", "extracted_kpis": []},
+}, gaps=["No  budget is given.", "No competitors are named."])
+# Scores may come back as strings, and a chunk may leave categories out entirely.
+CLOSING = chunk_analysis({
+    "strategic_alignment": {"score": "50", "feedback": "Linked to revenue.", "alignment_issues": ["None"]},
+})
+
+
+def test_scores_are_weighted_means_over_the_chunks_that_cover_the_category():
+    merged = merge_chunk_analyses([OPENING, MIDDLE, CLOSING], [300, 100, 100])
+    scores = {category: details["score"] for category, details in merged["breakdown"].items()}
+
+    assert scores == {
+        "clarity_of_objectives": 70,
+        "strategic_alignment": 50,
+        "target_audience_definition": 0,
+        "competitive_analysis": 0,
+        "channel_strategy": 70,
+        "key_performance_indicators": 60,
+    }
+    assert merged["overall_score"] == round(250 / 6)
+
+
+def test_feedback_comes_only_from_covering_chunks_and_lists_merge_without_duplicates():
+    merged = merge_chunk_analyses([OPENING, MIDDLE, CLOSING], [300, 100, 100])
+    breakdown = merged["breakdown"]
+
+    assert breakdown["clarity_of_objectives"]["feedback"] == "Clear targets. Vague deadline."
+    assert breakdown["channel_strategy"]["feedback"] == "Channels justified."
+    assert breakdown["clarity_of_objectives"]["keywords"] == ["growth", "Sales", "launch"]
+    assert breakdown["channel_strategy"]["recommended_channels"] == ["Email", "TikTok"]
+    assert merged["gap_analysis"] == ["No budget is given.", "No competitors are named."]
+    for category, fields in CATEGORY_FIELDS.items():
+        assert set(breakdown[category]) == {"score", "feedback", *fields}
@@ -0,0 +1,97 @@
+import pytest
+
+import json
+
+import ai_analysis
+import llm_client
+import model_router
+import pre_scorer
+from ai_analysis import generate_prompt, parse_response_outcome, validate_analysis
+
+CHEAP, STANDARD, STRONG = "gemini-1.5-flash-8b", "gemini-1.5-flash", "gemini-1.5-pro"
+BRIEF = "Objectives: grow sales by 20% in the UK by June. Audience: runners aged 25-40."
+
+
+@pytest.fixture
+def router():
+    router = model_router.ModelRouter(cascade=[CHEAP, STANDARD, STRONG], enabled=True, log_path=None)
+    model_router.set_router(router)
+    yield router
+    model_router.set_router(None)
+    llm_client.set_backend(None)
+
+
+def test_starting_tier_follows_prompt_size_and_operation(router):
+    assert router.plan("analyze", 100) == [CHEAP, STANDARD, STRONG]
+    assert router.plan("analyze", 5000) == [STANDARD, STRONG]
+    assert router.plan("analyze", 50000) == [STRONG]
+    assert router.plan("improve", 100) == [STANDARD, STRONG]
+
+
+def test_truncated_response_escalates_and_is_counted(router):
+    llm_client.set_backend(llm_client.FakeBackend(latency=0.01, failure_rates={CHEAP: 1.0}))
+
+    response_data, model_name = router.call(
+        "analyze", generate_prompt(BRIEF), parse=parse_response_outcome, check=validate_analysis
+    )
+
+    assert model_name == STANDARD
+    assert validate_analysis(response_data) is None
+    stats = router.stats()
+    cheap, standard = stats[("analyze", CHEAP)], stats[("analyze", STANDARD)]
+    assert (cheap["calls"], cheap["escalated"], standard["calls"], standard["escalated"]) == (1, 1, 1, 0)
+    assert standard["outcomes"] == {"ok": 1}
+    assert cheap["latency_seconds"] >= 0.01 and standard["latency_seconds"] >= 0.01
+    assert 0 < cheap["cost_usd"] < standard["cost_usd"]
+    assert ("analyze", STRONG) not in stats
+
+
+def test_unreliable_model_is_skipped_until_its_failures_expire(router, monkeypatch):
+    router.rules.min_samples = 2
+    for _ in range(2):
+        router.record("analyze", CHEAP, 0.1, 100, "{}", "missing breakdown", failed=True)
+    assert router.plan("analyze", 100) == [STANDARD, STRONG]
+
+    later = model_router.time.monotonic() + router.rules.window_seconds + 1
+    monkeypatch.setattr(model_router.time, "monotonic", lambda: later)
+    assert router.plan("analyze", 100) == [CHEAP, STANDARD, STRONG]
+
+
+class MemoryCache:
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def set(self, key, value):
+        self.entries[key] = value
+
+
+def test_response_failing_validation_on_every_tier_is_not_returned_or_cached(router, monkeypatch):
+    partial = json.dumps({"overall_score": 70, "breakdown": {"clarity_of_objectives": {"score": 70, "feedback": "ok"}}, "gap_analysis": []})
+    llm_client.set_backend(llm_client.FakeBackend(responder=lambda prompt, model_name: partial))
+    cache = MemoryCache()
+    monkeypatch.setattr(ai_analysis, "get_analysis_cache", lambda: cache)
+    monkeypatch.setattr(pre_scorer, "PRESCORE_MODE", "off")
+
+    with pytest.raises(model_router.NoAcceptableResponseError):
+        router.call("analyze", generate_prompt(BRIEF), parse=parse_response_outcome, check=validate_analysis)
+    assert ai_analysis.load_analysis(BRIEF) is None
+    assert cache.entries == {}
+    assert [route["calls"] for route in router.stats().values()] == [2, 2, 2]
+
+
+def test_escalated_stream_resets_and_replays_the_escalated_analysis(router, monkeypatch):
+    llm_client.set_backend(llm_client.FakeBackend(chunk_size=32, failure_rates={CHEAP: 1.0}))
+    monkeypatch.setattr(ai_analysis, "get_analysis_cache", lambda: MemoryCache())
+
+    events = list(ai_analysis.stream_analysis(BRIEF))
+
+    kinds = [kind for kind, _, _ in events]
+    reset = kinds.index("reset")
+    assert 0 < reset and kinds.count("reset") == 1
+    replayed = events[reset + 1:]
+    response_data = replayed[-1][2]
+    assert response_data["model"] == STANDARD
+    assert replayed == list(ai_analysis.replay_analysis(response_data))
@@ -0,0 +1,101 @@
+import pytest
+
+import pre_scorer
+
+STRONG_BRIEF = """Spring Launch Brief
+
+Objectives
+Our goal is to increase Swift trainer sales by 20% in the UK by June 2025. We also aim to grow newsletter sign ups by 15% by the end of Q2 and to double repeat purchases within 12 months.
+
+Strategic Alignment
+The campaign supports our business goals of growing market share and revenue in the running category. Our brand positioning is the greener performance choice, and the long term company strategy is to lead sustainable sportswear. This commercial plan underpins our mission and vision.
+
+Target Audience
+Our target audience is urban runners aged 25-40 in the UK, mostly young adults and professionals. They are passionate about fitness and interested in sustainability, with a lifestyle built around weekend races. These customers buy online and in store.
+
+Competitive Analysis
+Our main competitors are Nike and Adidas. Unlike Nike, our Swift trainer is made from recycled materials and is cheaper than Adidas. Asics is the market leader in stability shoes.
+
+Channel Strategy
+We will use Instagram and TikTok because our audience spends most of its time there, and email to drive repeat purchases. Paid search supports the launch so that runners find Swift when they compare shoes. Out of home posters near parks reach runners where they train.
+
+KPIs
+We will track conversion rate with a target of 3%, return on ad spend of 4x, click-through rate above 1.5% and engagement rate of 6% on Instagram.
+"""
+
+_head, _tail = STRONG_BRIEF.split("Competitive Analysis\n")
+# Every category is well covered except a one-line competitive section.
+WEAK_COMPETITION_BRIEF = (
+    _head + "Competitive Analysis\nThe competition is still being reviewed.\n\nChannel Strategy\n"
+    + _tail.split("Channel Strategy\n")[1]
+)
+
+VAGUE_BRIEF = "Campaign Notes\n\n" + " ".join([
+    "We want to improve how people see the company over the coming period and make the launch feel fresh for everyone involved.",
+    "The team will share creative ideas in the next workshop and talk about customers and what they might like to see from us.",
+] * 3) + "\n\nWe will use social media and a newsletter.\n"
+
+
+@pytest.fixture
+def prescore_on(monkeypatch):
+    monkeypatch.setattr(pre_scorer, "PRESCORE_MODE", "on")
+
+
+def test_short_brief_is_skipped():
+    result = pre_scorer.pre_score("Objectives: grow sales by 20% in the UK by June. Audience: runners aged 25-40.")
+
+    assert result.decision == "skip"
+    assert result.llm_categories == []
+
+
+def test_brief_with_one_weak_section_is_shortened_to_that_category():
+    result = pre_scorer.pre_score(WEAK_COMPETITION_BRIEF)
+
+    assert result.decision == "shorten"
+    assert result.llm_categories == ["competitive_analysis"]
+
+
+def test_brief_without_well_covered_categories_gets_the_full_analysis():
+    result = pre_scorer.pre_score(VAGUE_BRIEF)
+
+    assert result.decision == "full"
+    assert result.confident == []
+    assert len(result.llm_categories) == len(pre_scorer.CATEGORY_FIELDS)
+
+
+def test_brands_own_product_is_not_a_competitor():
+    competitors = pre_scorer.pre_score(STRONG_BRIEF).response_data["breakdown"]["competitive_analysis"]
+
+    assert competitors["competitors_mentioned"] == ["Nike", "Adidas", "Asics"]
+
+
+def test_routing_is_off_by_default(monkeypatch):
+    monkeypatch.setattr(pre_scorer, "request_category_analysis", pytest.fail)
+
+    assert pre_scorer.route_analysis(WEAK_COMPETITION_BRIEF) is None
+
+
+def test_shortened_route_merges_model_scores_for_the_uncertain_categories(prescore_on, monkeypatch):
+    requested = []
+
+    def request_category_analysis(excerpts):
+        requested.append(excerpts)
+        return {"competitive_analysis": {"score": "40", "feedback": "Name the competitors."}}
+
+    monkeypatch.setattr(pre_scorer, "request_category_analysis", request_category_analysis)
+    result = pre_scorer.pre_score(WEAK_COMPETITION_BRIEF)
+
+    response_data = pre_scorer.route_analysis(WEAK_COMPETITION_BRIEF, result)
+
+    assert list(requested[0]) == ["competitive_analysis"]
+    assert "still being reviewed" in requested[0]["competitive_analysis"]
+    assert response_data["breakdown"]["competitive_analysis"]["score"] == 40
+    scores = [details["score"] for details in response_data["breakdown"].values()]
+    assert response_data["overall_score"] == round(sum(scores) / len(scores))
+    assert response_data["pre_score"]["decision"] == "shorten"
+
+
+def test_shortened_route_falls_back_to_full_analysis_when_a_category_is_missing(prescore_on, monkeypatch):
+    monkeypatch.setattr(pre_scorer, "request_category_analysis", lambda excerpts: {})
+
+    assert pre_scorer.route_analysis(WEAK_COMPETITION_BRIEF) is None
@@ -0,0 +1,65 @@
+import json
+
+from stream_parser import AnalysisStreamParser
+
+RESPONSE = json.dumps({
+    "overall_score": 72,
+    "breakdown": {
+        "clarity_of_objectives": {"score": 80, "feedback": 'Targets like "20% by June" are {clear}.', "keywords": ["growth"]},
+        "channel_strategy": {"score": 55, "feedback": "Say why [TikTok] \\ reaches runners.", "recommended_channels": []},
+    },
+    "gap_analysis": ["No KPIs are defined.", "Budget is missing"],
+}, indent=2)
+
+EXPECTED = [
+    ("overall_score", None, 72),
+    ("category", "clarity_of_objectives",
+     {"score": 80, "feedback": 'Targets like "20% by June" are {clear}.', "keywords": ["growth"]}),
+    ("category", "channel_strategy", {"score": 55, "feedback": "Say why [TikTok] \\ reaches runners.", "recommended_channels": []}),
+    ("gap_analysis", None, ["No KPIs are defined.", "Budget is missing"]),
+]
+
+
+def feed_all(chunks):
+    parser = AnalysisStreamParser()
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    return parser, events
+
+
+def test_single_chunk_yields_every_part_in_order():
+    _, events = feed_all([RESPONSE])
+
+    assert events == EXPECTED
+
+
+def test_chunks_split_inside_strings_escapes_and_numbers_give_the_same_events():
+    for size in (1, 2, 3, 7, 64):
+        chunks = [RESPONSE[start:start + size] for start in range(0, len(RESPONSE), size)]
+
+        parser, events = feed_all(chunks)
+
+        assert events == EXPECTED
+        assert parser.text == RESPONSE
+
+
+def test_each_part_is_emitted_as_soon_as_it_closes():
+    cut = RESPONSE.index('"channel_strategy"')
+
+    parser, events = feed_all([RESPONSE[:cut]])
+
+    assert events == EXPECTED[:2]
+    assert parser.feed(RESPONSE[cut:]) == EXPECTED[2:]
+
+
+def test_truncated_response_only_yields_completed_parts():
+    _, events = feed_all([RESPONSE[:RESPONSE.index("Say why")]])
+
+    assert events == EXPECTED[:2]
+
+
+def test_code_fence_before_the_json_is_ignored():
+    _, events = feed_all(["```json\n", RESPONSE[:40], RESPONSE[40:], "\n```"])
+
+    assert events == EXPECTED
@@ -1,27 +1,188 @@
-import docx
-import PyPDF2
 import io
-import streamlit as st
+import itertools
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from instrumentation import timed
+from text_normalization import strip_repeated_page_lines
 
+# python-docx and PyPDF2 are imported inside the functions that need them,
+# so only the parser for the uploaded format is ever loaded.
+
+# --- Extraction Limits ---
+MAX_FILE_BYTES = 20 * 1024 * 1024
+MAX_PDF_PAGES = 150
+# PDFs with at least this many pages are split across a process pool.
+PARALLEL_PAGE_THRESHOLD = 24
+PAGES_PER_TASK = 8
+# Forking a process that already runs Streamlit's or the job queue's threads can
+# deadlock on locks held by those threads, so workers start from a clean interpreter.
+_POOL_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+class ExtractionLimitError(ValueError):
+    """Raised when a document exceeds the configured byte or page limits."""
+
+
+def _check_size(file_bytes, max_bytes):
+    if max_bytes is not None and len(file_bytes) > max_bytes:
+        raise ExtractionLimitError(
+            f"File is {len(file_bytes) / 1024 / 1024:.1f} MB, the limit is {max_bytes / 1024 / 1024:.0f} MB."
+        )
+
+# --- DOCX ---
+def _table_rows(table):
+    for row in table.rows:
+        cells = []
+        for cell in row.cells:
+            cell_text = cell.text.strip()
+            # Merged cells are returned once per grid column; keep a single copy.
+            if cell_text and (not cells or cells[-1] != cell_text):
+                cells.append(cell_text)
+        if cells:
+            yield " | ".join(cells)
+
+
+def _iter_block_items(parent, container):
+    """Yields paragraphs and tables of a body, header or footer in document order."""
+    from docx.oxml.ns import qn
+    from docx.table import Table
+    from docx.text.paragraph import Paragraph
+
+    for child in container.iterchildren():
+        if child.tag == qn("w:p"):
+            yield Paragraph(child, parent)
+        elif child.tag == qn("w:tbl"):
+            yield Table(child, parent)
+
+
+def _block_text(block):
+    from docx.table import Table
+
+    if isinstance(block, Table):
+        return "\n".join(_table_rows(block))
+    return block.text
+
+
+def iter_docx_blocks(file_bytes, max_bytes=MAX_FILE_BYTES):
+    """Yields the text of a DOCX block by block: section headers first, then body paragraphs and tables."""
+    import docx
+
+    _check_size(file_bytes, max_bytes)
+    doc = docx.Document(io.BytesIO(file_bytes))
+
+    seen_headers = set()
+    for section in doc.sections:
+        header = section.header
+        if header.is_linked_to_previous:
+            continue
+        for block in _iter_block_items(header, header._element):
+            block_text = _block_text(block)
+            if block_text.strip() and block_text not in seen_headers:
+                seen_headers.add(block_text)
+                yield block_text
+
+    for block in _iter_block_items(doc, doc.element.body):
+        yield _block_text(block)
+
+
+@timed("extract.docx")
 def extract_text_from_docx(file_bytes):
     try:
-        doc = docx.Document(io.BytesIO(file_bytes))
-        text = []
-        for paragraph in doc.paragraphs:
-            text.append(paragraph.text)
-        return '\n'.join(text)
+        return '\n'.join(iter_docx_blocks(file_bytes))
     except Exception as e:
-        st.error(f"Error extracting text from DOCX: {e}")
+        print(f"Warning: error extracting text from DOCX: {e}")
         return None
 
+# --- PDF ---
+_worker_reader = None
+
+
+def _init_pdf_worker(file_bytes):
+    import PyPDF2
+
+    global _worker_reader
+    _worker_reader = PyPDF2.PdfReader(io.BytesIO(file_bytes))
+
+
+def _extract_page_range(page_range):
+    start, stop = page_range
+    return [_worker_reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def iter_pdf_pages(file_bytes, max_pages=MAX_PDF_PAGES, max_bytes=MAX_FILE_BYTES, parallel=True):
+    """Yields the text of a PDF page by page, in order.
+
+    Documents with more than ``PARALLEL_PAGE_THRESHOLD`` pages are extracted across a
+    process pool in batches of ``PAGES_PER_TASK`` pages; results are still yielded in
+    page order and only a handful of batches are held in memory at once.
+    """
+    import PyPDF2
+
+    _check_size(file_bytes, max_bytes)
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_bytes))
+    page_count = len(pdf_reader.pages)
+    if max_pages is not None and page_count > max_pages:
+        raise ExtractionLimitError(f"PDF has {page_count} pages, the limit is {max_pages}.")
+
+    if not parallel or page_count < PARALLEL_PAGE_THRESHOLD:
+        for page in pdf_reader.pages:
+            yield page.extract_text() or ""
+        return
+
+    page_ranges = [
+        (start, min(start + PAGES_PER_TASK, page_count)) for start in range(0, page_count, PAGES_PER_TASK)
+    ]
+    workers = min(len(page_ranges), os.cpu_count() or 1)
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context(_POOL_START_METHOD),
+        initializer=_init_pdf_worker, initargs=(file_bytes,),
+    ) as executor:
+        # Keep a bounded window of batches in flight so memory does not grow with page count.
+        pending = deque()
+        remaining = iter(page_ranges)
+        for page_range in itertools.islice(remaining, workers * 2):
+            pending.append(executor.submit(_extract_page_range, page_range))
+        while pending:
+            page_texts = pending.popleft().result()
+            for page_range in itertools.islice(remaining, 1):
+                pending.append(executor.submit(_extract_page_range, page_range))
+            yield from page_texts
+
+
+def pdf_text(file_bytes):
+    """Joins the pages of a PDF, dropping running headers and footers repeated across pages."""
+    return '\n'.join(strip_repeated_page_lines(list(iter_pdf_pages(file_bytes))))
+
+
+@timed("extract.pdf")
 def extract_text_from_pdf(file_bytes):
     try:
-        pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_bytes))
-        text = ""
-        for page_num in range(len(pdf_reader.pages)):
-            page = pdf_reader.pages[page_num]
-            text += page.extract_text()
-        return text
+        return pdf_text(file_bytes)
     except Exception as e:
-        st.error(f"Error extracting text from PDF: {e}")
-        return None
\ No newline at end of file
+        print(f"Warning: error extracting text from PDF: {e}")
+        return None
+
+# --- Any Supported Format ---
+SUPPORTED_EXTENSIONS = (".docx", ".pdf")
+
+
+class UnsupportedFormatError(ValueError):
+    """Raised for files that are neither DOCX nor PDF."""
+
+
+@timed("extract")
+def extract_text(file_bytes, file_name):
+    """Extracts the text of a DOCX or PDF brief, chosen by file name.
+
+    Unlike the per-format helpers this raises instead of returning None, so callers
+    can report why extraction failed: UnsupportedFormatError, ExtractionLimitError
+    or the parser's own error.
+    """
+    lowered = file_name.lower()
+    if lowered.endswith(".docx"):
+        return '\n'.join(iter_docx_blocks(file_bytes))
+    if lowered.endswith(".pdf"):
+        return pdf_text(file_bytes)
+    raise UnsupportedFormatError(f"Unsupported file type: {file_name}. Upload a DOCX or PDF file.")
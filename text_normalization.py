@@ -0,0 +1,141 @@
+import argparse
+import re
+import unicodedata
+from collections import Counter
+
+# Rough English average; good enough for budgets and before/after comparisons.
+CHARS_PER_TOKEN = 4
+
+# --- Header/Footer Detection ---
+# A line counts as page furniture when it sits near the top or bottom of at least
+# this share of pages (and of MIN_REPEATED_PAGES pages).
+REPEATED_LINE_SHARE = 0.5
+MIN_REPEATED_PAGES = 3
+PAGE_EDGE_LINES = 3
+# On short pages the edge window shrinks to this share of the page's lines (at least
+# one at each edge), so a page's body is never treated as its header or footer.
+MAX_EDGE_SHARE = 0.25
+MAX_FURNITURE_CHARS = 120
+
+# Only explicit "Page 3", "Page 3 of 10" or "3 of 10" lines; a bare number may be a KPI value.
+_PAGE_NUMBER_LINE = re.compile(r"^(page\s+\d{1,3}(\s+of\s+\d{1,3})?|\d{1,3}\s+of\s+\d{1,3})$", re.I)
+# Stock markings with no content of their own; other notices are only dropped as repeated page furniture.
+_BOILERPLATE_LINE = re.compile(
+    r"^(strictly\s+|private\s+and\s+|proprietary\s+and\s+)?confidential\.?$|^internal use only\.?$"
+    r"|^all rights reserved\.?$",
+    re.I,
+)
+_INLINE_SPACE = re.compile(r"[ \t\f\v\u00a0\u2000-\u200b\u202f\u205f\u3000]+")
+_BLANK_LINES = re.compile(r"\n{3,}")
+_DIGITS = re.compile(r"\d+")
+_PAGE_WORD = re.compile(r"\bpage\b", re.I)
+
+
+def estimate_tokens(text):
+    return max(1, round(len(text) / CHARS_PER_TOKEN))
+
+
+def _line_signature(line):
+    signature = " ".join(line.lower().split())
+    # Digits are masked in page-numbered lines so "Acme | Page 3" and "Acme | Page 4" match.
+    return _DIGITS.sub("#", signature) if _PAGE_WORD.search(signature) else signature
+
+
+def _edge_indices(lines):
+    filled = [i for i, line in enumerate(lines) if line.strip()]
+    edge = min(PAGE_EDGE_LINES, max(1, int(len(filled) * MAX_EDGE_SHARE)))
+    return set(filled[:edge] + filled[-edge:])
+
+
+def strip_repeated_page_lines(pages):
+    """Removes running headers and footers from per-page text.
+
+    Short lines near the top or bottom of a page that recur on most pages are
+    dropped everywhere they appear at a page edge; body text is never touched.
+    """
+    if len(pages) < MIN_REPEATED_PAGES:
+        return pages
+    split_pages = [page.splitlines() for page in pages]
+    counts = Counter()
+    for lines in split_pages:
+        counts.update({
+            _line_signature(lines[i]) for i in _edge_indices(lines) if len(lines[i].strip()) <= MAX_FURNITURE_CHARS
+        })
+    threshold = max(MIN_REPEATED_PAGES, REPEATED_LINE_SHARE * len(pages))
+    furniture = {signature for signature, count in counts.items() if count >= threshold}
+    if not furniture:
+        return pages
+
+    stripped = []
+    for lines in split_pages:
+        edges = _edge_indices(lines)
+        stripped.append("\n".join(
+            line for i, line in enumerate(lines) if i not in edges or _line_signature(line) not in furniture
+        ))
+    return stripped
+
+
+# --- Whitespace and Boilerplate ---
+def normalize_text(text):
+    """Normalizes extracted brief text for prompting.
+
+    Applies NFKC (PDF ligatures, full-width characters), collapses runs of spaces
+    and blank lines, and drops lines that are only an explicit page number
+    ("Page 3 of 10") or a bare confidentiality marking.
+    """
+    text = unicodedata.normalize("NFKC", text).replace("\r\n", "\n").replace("\r", "\n")
+    lines = []
+    for line in text.split("\n"):
+        line = _INLINE_SPACE.sub(" ", line).strip()
+        if line and (_PAGE_NUMBER_LINE.match(line) or _BOILERPLATE_LINE.match(line)):
+            continue
+        lines.append(line)
+    return _BLANK_LINES.sub("\n\n", "\n".join(lines)).strip()
+
+
+# --- Report ---
+def compaction_report(file_bytes, file_name):
+    """Token counts for one brief: raw extracted text and prompt versus the compacted versions."""
+    from ai_analysis import generate_prompt, generate_verbose_prompt
+    from text_extraction import extract_text, iter_docx_blocks, iter_pdf_pages
+
+    if file_name.lower().endswith(".pdf"):
+        raw_text = "\n".join(iter_pdf_pages(file_bytes))
+    else:
+        raw_text = "\n".join(iter_docx_blocks(file_bytes))
+    text = extract_text(file_bytes, file_name)
+    before = estimate_tokens(generate_verbose_prompt(raw_text))
+    after = estimate_tokens(generate_prompt(text, count=False))
+    return {
+        "file_name": file_name,
+        "raw_text_tokens": estimate_tokens(raw_text),
+        "text_tokens": estimate_tokens(normalize_text(text)),
+        "prompt_tokens_before": before,
+        "prompt_tokens_after": after,
+        "reduction": 1 - after / before,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report prompt tokens before and after compaction.")
+    parser.add_argument("inputs", nargs="+", help="DOCX/PDF briefs.")
+    args = parser.parse_args(argv)
+
+    total_before = total_after = 0
+    for path in args.inputs:
+        with open(path, "rb") as f:
+            report = compaction_report(f.read(), path)
+        total_before += report["prompt_tokens_before"]
+        total_after += report["prompt_tokens_after"]
+        print(
+            f"{path}: text {report['raw_text_tokens']} -> {report['text_tokens']} tokens, "
+            f"prompt {report['prompt_tokens_before']} -> {report['prompt_tokens_after']} tokens "
+            f"({report['reduction']:.0%} fewer)"
+        )
+    if len(args.inputs) > 1:
+        print(f"total: prompt {total_before} -> {total_after} tokens ({1 - total_after / total_before:.0%} fewer)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())